@@ -0,0 +1,75 @@
+# Measures how long a fresh interpreter takes to import tea and declare variables and a
+# study design, and checks it against a budget. Heavy dependencies (scipy, statsmodels, z3)
+# should only be imported once an analysis needs them.
+#
+# Usage: python benchmarks/import_time.py [--runs N] [--budget SECONDS]
+# Prints the measurements as JSON and exits with status 1 if the median is over the budget.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BUDGET = 1.0 # seconds
+HEAVY_MODULES = ['scipy.stats', 'statsmodels.api', 'sklearn', 'z3']
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import tea
+imported = time.perf_counter()
+tea.define_variables([
+    {'name': 'condition', 'data type': 'nominal', 'categories': ['a', 'b']},
+    {'name': 'score', 'data type': 'ratio'}
+])
+tea.define_study_design({
+    'study type': 'experiment',
+    'independent variables': 'condition',
+    'dependent variables': 'score',
+    'between subjects': 'condition'
+})
+declared = time.perf_counter()
+print(json.dumps({
+    'import': imported - start,
+    'declare': declared - imported,
+    'heavy_modules': [m for m in %r if m in sys.modules]
+}))
+""" % (HEAVY_MODULES,)
+
+# @returns dict of timings (seconds) and the heavy modules imported, for one fresh interpreter
+def measure_once():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([ROOT] + ([env['PYTHONPATH']] if 'PYTHONPATH' in env else []))
+    output = subprocess.run([sys.executable, '-c', SCRIPT], env=env, cwd=ROOT, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def measure(runs: int, budget: float):
+    samples = [measure_once() for _ in range(runs)]
+    import_times = [s['import'] + s['declare'] for s in samples]
+
+    return {
+        'benchmark': 'import_time',
+        'runs': runs,
+        'budget': budget,
+        'median': statistics.median(import_times),
+        'min': min(import_times),
+        'max': max(import_times),
+        'heavy_modules': sorted({m for s in samples for m in s['heavy_modules']})
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time importing tea and declaring an analysis')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=BUDGET)
+    args = parser.parse_args(argv)
+
+    result = measure(args.runs, args.budget)
+    print(json.dumps(result, indent=2))
+
+    return 0 if result['median'] <= args.budget and not result['heavy_modules'] else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
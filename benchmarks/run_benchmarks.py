@@ -0,0 +1,139 @@
+# Offline benchmarks of hypothesize() on synthetic data (see synthetic.py).
+# For each configuration (rows, number of groups, data types, paired or not), every
+# hypothesis is run from cold caches, and the time spent in each stage is recorded through
+# tea.instrumentation, e.g.:
+#   load              parsing the dataset
+#   synthesize_tests  selecting the tests (includes z3_check and verify_prop)
+#   z3_check          one query of the z3 solver
+#   verify_prop       checking properties of the data (normality, equal variance, ...)
+#   execute_test      running the selected tests
+#   format            formatting the ResultData
+#   hypothesize       the whole hypothesize() call
+# Each stage reports the number of calls and the median over repeats of the total seconds.
+# Counters (e.g., cache hits) are reported from the first repeat.
+# Tests that raised are listed in failed_tests (their time is still counted).
+# Peak memory (tracemalloc) is measured in a separate run so it does not skew the timings.
+#
+# Usage: python benchmarks/run_benchmarks.py --rows 1000 100000 --categories 2 4 --dtypes ratio,ordinal --paired both
+# Prints (or writes with --output) the results as JSON.
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import tea
+import tea.instrumentation as instrumentation
+from tea.runtimeDataStructures.datasetCache import dataset_cache
+from tea.runtimeDataStructures.testResult import TestFailure
+from tea.z3_solver.synthesisCache import synthesis_cache
+from synthetic import generate
+
+def make_session(case: dict):
+    session = tea.Session()
+    session.data(case['path'], key=case['key'])
+    session.define_variables(case['variables'])
+    session.define_study_design(case['design'])
+    with contextlib.redirect_stdout(io.StringIO()):
+        session.assume({'Type I (False Positive) Error Rate': 0.05})
+    return session
+
+# Runs every hypothesis of @param case from cold caches
+# @returns (instrumentation summary, names of the tests that raised) of the run
+def run_case(case: dict):
+    dataset_cache.clear()
+    synthesis_cache.clear()
+    session = make_session(case)
+
+    failed_tests = []
+    with instrumentation.collect() as collector, contextlib.redirect_stdout(io.StringIO()):
+        for vars, prediction in case['hypotheses']:
+            result = session.hypothesize(vars, prediction)
+            failed_tests += [test for test, r in result.test_to_results.items() if isinstance(r, TestFailure)]
+    return collector.summary(), failed_tests
+
+def peak_memory(case: dict):
+    dataset_cache.clear()
+    synthesis_cache.clear()
+    session = make_session(case)
+
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            for vars, prediction in case['hypotheses']:
+                session.hypothesize(vars, prediction)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+# @returns dict of results for one configuration
+def benchmark(directory, rows: int, categories: int, dtypes: list, paired: bool, repeat: int):
+    path = os.path.join(directory, f"synthetic_{rows}_{categories}_{'-'.join(dtypes)}_{'paired' if paired else 'unpaired'}.csv")
+    case = generate(path, rows=rows, categories=categories, dtypes=dtypes, paired=paired)
+
+    run_case(case) # Warm up: first use of the lazily imported modules, z3 catalog
+    runs = [run_case(case) for _ in range(repeat)]
+    summaries = [summary for summary, _ in runs]
+
+    stages = {}
+    for stage in summaries[0]['stages']:
+        stages[stage] = {
+            'calls': summaries[0]['stages'][stage]['count'],
+            'seconds': statistics.median(s['stages'].get(stage, {'seconds': 0.0})['seconds'] for s in summaries)
+        }
+
+    return {
+        'rows': rows,
+        'categories': categories,
+        'dtypes': dtypes,
+        'paired': paired,
+        'hypotheses': len(case['hypotheses']),
+        'repeat': repeat,
+        'stages': stages,
+        'counters': summaries[0]['counters'],
+        'failed_tests': runs[0][1],
+        'peak_memory_bytes': peak_memory(case)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark hypothesize() on synthetic data')
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 100000])
+    parser.add_argument('--categories', type=int, nargs='+', default=[2, 4])
+    parser.add_argument('--dtypes', nargs='+', default=['ratio,ordinal,nominal'], help="comma separated data types of the outcomes, e.g., ratio,ordinal")
+    parser.add_argument('--paired', choices=['yes', 'no', 'both'], default='both')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', default='-', help="file to write the JSON results to ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    paired = {'yes': [True], 'no': [False], 'both': [False, True]}[args.paired]
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for rows in args.rows:
+            for categories in args.categories:
+                for dtypes in args.dtypes:
+                    for p in paired:
+                        results.append(benchmark(directory, rows, categories, dtypes.split(','), p, args.repeat))
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results
+    }
+    output = json.dumps(report, indent=2)
+    if args.output == '-':
+        print(output)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+# Generates synthetic datasets (and the tea declarations to analyze them) for benchmarks,
+# so that benchmarks run offline and scale to any number of rows.
+import numpy as np
+import pandas as pd
+
+DTYPES = ['ratio', 'interval', 'ordinal', 'nominal']
+ORDINAL_CATEGORIES = ['very low', 'low', 'medium', 'high', 'very high']
+NOMINAL_CATEGORIES = ['no', 'yes']
+
+# Writes a CSV with a nominal 'group' variable of @param categories groups, and one outcome
+# per data type in @param dtypes (e.g., ['ratio', 'ordinal']) that differs a little between groups.
+# @param rows is the number of rows. If @param paired, each participant has one row per group
+# (within subjects), otherwise one row in total (between subjects).
+# @returns dict with the path, participant id column, variables, study design and
+# hypotheses (list of (vars, prediction)) to pass to tea
+def generate(path, rows: int=1000, categories: int=2, dtypes: list=None, paired: bool=False, seed: int=0):
+    dtypes = ['ratio'] if dtypes is None else list(dtypes)
+    for dtype in dtypes:
+        if dtype not in DTYPES:
+            raise ValueError(f"Cannot generate {dtype} data, only: {DTYPES}")
+    if categories < 2:
+        raise ValueError(f"Need at least two groups to compare: {categories}")
+
+    rng = np.random.default_rng(seed)
+    groups = [f"g{i}" for i in range(categories)]
+
+    if paired:
+        num_participants = max(1, rows // categories)
+        pid = np.repeat(np.arange(num_participants), categories)
+        group = np.tile(np.arange(categories), num_participants)
+        participant_effect = rng.normal(0, 1, num_participants)[pid]
+    else:
+        pid = np.arange(rows)
+        group = rng.integers(0, categories, rows)
+        participant_effect = 0
+
+    columns = {'pid': pid, 'group': np.array(groups)[group]}
+    variables = [{'name': 'group', 'data type': 'nominal', 'categories': groups}]
+    for dtype in dtypes:
+        latent = rng.normal(0, 1, len(pid)) + participant_effect + 0.2 * group
+        outcome = f"y_{dtype}"
+        if dtype == 'ratio':
+            columns[outcome] = np.exp(2 + 0.1 * latent) # positive, slightly skewed
+            variables.append({'name': outcome, 'data type': 'ratio'})
+        elif dtype == 'interval':
+            columns[outcome] = 50 + 10 * latent
+            variables.append({'name': outcome, 'data type': 'interval'})
+        elif dtype == 'ordinal':
+            levels = np.clip(np.round(latent + 2), 0, len(ORDINAL_CATEGORIES) - 1).astype(int)
+            columns[outcome] = np.array(ORDINAL_CATEGORIES)[levels]
+            variables.append({'name': outcome, 'data type': 'ordinal', 'categories': ORDINAL_CATEGORIES})
+        else:
+            columns[outcome] = np.array(NOMINAL_CATEGORIES)[(latent > 0).astype(int)]
+            variables.append({'name': outcome, 'data type': 'nominal', 'categories': NOMINAL_CATEGORIES})
+
+    pd.DataFrame(columns).to_csv(path, index=False)
+
+    outcomes = [v['name'] for v in variables[1:]]
+    design = {
+        'study type': 'experiment',
+        'independent variables': 'group',
+        'dependent variables': outcomes,
+        ('within subjects' if paired else 'between subjects'): 'group'
+    }
+
+    hypotheses = []
+    for v in variables[1:]:
+        prediction = None
+        if categories == 2 and v['data type'] in ['ratio', 'interval']:
+            prediction = ['group:g1 > g0']
+        hypotheses.append((['group', v['name']], prediction))
+
+    return {
+        'path': str(path),
+        'key': 'pid',
+        'variables': variables,
+        'design': design,
+        'hypotheses': hypotheses
+    }
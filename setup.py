@@ -14,20 +14,23 @@ setuptools.setup(name='tealang',
       packages=setuptools.find_packages(),
       install_requires=[
           'attrs',
-          'pandas',
-          'scipy',
+          'numpy>=1.22.4', # the oldest numpy scipy 1.13 supports (np.random.SeedSequence needs 1.17)
+          'pandas>=1.1', # Series.to_numpy(na_value=...) and sort_values(ignore_index=True)
+          'scipy>=1.13', # stats.shapiro(axis=...) and NaN propagation
           'scikit-learn',
           'statsmodels',
-          'bootstrapped',
           'pipfile',
           'requests',
           'z3-solver',
           'urllib3'
       ],
+      extras_require={
+          'columnar': ['pyarrow'] # Parquet and Feather/Arrow datasets
+      },
       classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: Apache License 2.0",
         "Operating System :: OS Independent",
     ],
-    python_requires='>=3.7',
+    python_requires='>=3.9',
 )
\ No newline at end of file
@@ -4,6 +4,16 @@ from tea.api import (
                     define_study_design, 
                     assume,
                     hypothesize,
+                    hypothesize_many,
+                    relate_all,
+                    relate_outcomes,
                     download_data,
-                    divine_properties
-                )
\ No newline at end of file
+                    convert,
+                    divine_properties,
+                    clear_cache,
+                    set_cache_budget,
+                    set_bootstrap_options,
+                    set_executor
+                )
+from tea.session import Session
+from tea.instrumentation import add_hook, remove_hook, collect, Collector
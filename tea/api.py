@@ -1,210 +1,92 @@
-from .build import (load_data, load_data_from_url, const,
-                    ordinal, isordinal,
-                    nominal, isnominal,
-                    ratio, isratio,
-                    interval, isinterval, isnumeric,
-                    select, compare, relate, predict,
-                    get_var_from_list
-                   )
-from .evaluate import evaluate
+from .build import load_data_from_url, convert_data
+from .session import Session
+from tea.runtimeDataStructures.datasetCache import dataset_cache
 import tea.helpers
 import tea.runtimeDataStructures
 import tea.z3_solver
-from tea.z3_solver.solver import set_mode
 
 from typing import Dict
 from .global_vals import *
 
-# Set at start of programs
-# Used across functions
-dataset_path = ''
-dataset_obj = None
-dataset_id = None
-vars_objs = []
-study_design = None
-assumptions = None
+# Session used by the functions below. 
+# Use a Session of your own (tea.Session()) to run several analyses at once.
+__default_session__ = Session()
 
-# For variables dictionary
-var_name = 'name'
-var_dtype = 'data type'
-var_categories = 'categories'
-var_drange = 'range'
-
-# Assumptions
-# Stats properties
-assumptions = {}
-alpha = 0.01
-
-all_results = {} # Used for multiple comparison correction
-
-# For solver
-MODE = 'strict'
+def default_session(): 
+    """A helper for accessing the session the functional API works on"""
+    global __default_session__
+    return __default_session__
 
 ## For testing purposes
 def download_data(url, name): 
     return load_data_from_url(url, name)
 
+# Converts the CSV file at @param path to a columnar file ('parquet', 'feather' or 'npy') once, 
+# @returns path of the columnar file to pass to data() instead of the CSV file
+def convert(path, format: str='parquet', name: str=None): 
+    return convert_data(path, format, name)
 
-# @sets global dataset_path and dataaset_obj (of type Dataset)
-def data(file, key=None): 
-    global dataset_path, dataset_obj, dataset_id
+# Drops all datasets cached by previous hypothesize() calls
+def clear_cache(): 
+    dataset_cache.clear()
 
-    dataset_path = file
-    dataset_id = key
+# @param max_bytes is the memory budget for cached datasets. 
+# Least recently used datasets are evicted once the budget is exceeded. 0 disables caching.
+def set_cache_budget(max_bytes: int): 
+    dataset_cache.set_budget(max_bytes)
 
-def define_variables(vars: Dict[str, str]):
-    global vars_objs
+# Configures the bootstrap that is run when no other test applies
+# @param iterations is the number of resamples (default 10000)
+# @param workers is the number of processes to resample in (default 1)
+# @param seed makes resampling reproducible (default None)
+def set_bootstrap_options(iterations: int=None, workers: int=None, seed: int=None): 
+    default_session().set_bootstrap_options(iterations, workers, seed)
 
-    # reset the variables
-    vars_objs = []
 
-    for var in vars: 
-        name = var['name']
+# Runs the tests selected for each hypothesis on a 'thread' or 'process' pool of @param workers, 
+# or one after another if @param kind is None (default)
+def set_executor(kind: str=None, workers: int=None): 
+    default_session().set_executor(kind, workers)
 
-        if (var[var_dtype] == 'nominal'): 
-            categories = var[var_categories]
-            v_obj = nominal(name, categories)
-        elif (var[var_dtype] == 'ordinal'): 
-            categories = var[var_categories]
-            v_obj = ordinal(name, categories)
-        elif (var[var_dtype] == 'interval'): 
-            drange=None
-            if var_drange in var: 
-                drange = var[var_drange]
-            v_obj = interval(name, drange)
-        else: 
-            assert(var[var_dtype] == 'ratio')
-            drange = var[var_drange] if var_drange in var else None
-            v_obj = interval(name, drange)
 
-        vars_objs.append(v_obj)
+# @sets dataset of the default session
+# @param float_dtype is the dtype interval and ratio columns are loaded as ('float64' or 'float32')
+def data(file, key=None, float_dtype='float64', streaming=False, chunksize=None): 
+    default_session().data(file, key, float_dtype, streaming, chunksize)
 
+def define_variables(vars: Dict[str, str]):
+    default_session().define_variables(vars)
 
 def define_study_design(design: Dict[str, str]): 
-    global study_design, dataset_id, uid, alpha
-    global btw_subj, within_subj
-
-    # Check that variables are only assigned EITHER between OR within but NOT BOTH: 
-    btw_vars = design[btw_subj] if btw_subj in design else None
-    within_vars = design[within_subj] if within_subj in design else None
-
-    if btw_vars: 
-        for b in btw_vars: 
-            if within_vars:
-                for w in within_vars: 
-                    if b == w: 
-                        raise ValueError(f"{b} CANNOT be a between subjects variable AND a within subjects variable. Can only be one or the other.")
-                    
-    study_design = design
-
-    # dataset_id = design[uid] if uid in design else None
-    
+    default_session().define_study_design(design)
 
 def assume(user_assumptions: Dict[str, str], mode=None): 
-    global alpha, alpha_keywords
-    global assumptions
-    global MODE
-
-    if alpha_keywords[0] in user_assumptions:
-        if alpha_keywords[1] in user_assumptions:
-            assert (float(user_assumptions[alpha_keywords[0]]) == float(user_assumptions[alpha_keywords[1]]))
-    
-    for keyword in alpha_keywords:
-        if keyword in user_assumptions:
-            alpha = float(user_assumptions[keyword])
-
-    assumptions = user_assumptions
-    assumptions[alpha_keywords[1]] = alpha
-
-    # Set MODE for dealing with assumptions
-    if mode and mode == 'relaxed': 
-        MODE = mode
-        log(f"\nRunning under {MODE.upper()} mode.\n")
-        log(f"This means that user assertions will be checked. Should they fail, Tea will issue a warning but proceed as if user's assertions were true.")
-    else: 
-        assert (mode == None or mode == 'strict')
-        MODE = 'strict'
-        log(f"\nRunning under {MODE.upper()} mode.\n")
-        log(f"This means that user assertions will be checked. Should they fail, Tea will override user assertions.\n")
+    default_session().assume(user_assumptions, mode)
     
 def hypothesize(vars: list, prediction: list=None): 
-    global dataset_path, vars_objs, study_design, dataset_obj, dataset_id
-    global assumptions, all_results
-    global MODE
-
-    assert(dataset_path)
-    assert(vars_objs)
-    assert(study_design)
-
-    dataset_obj = load_data(dataset_path, vars_objs, dataset_id)
-
-    v_objs = []
-    for v in vars: 
-        v_objs.append(get_var_from_list(v, vars_objs)) # may want to use Dataset instance method instead
-    
-    # Create and get back handle to AST node
-    relationship = relate(v_objs, prediction)
-    # Interpret AST node, Returns ResultData object <-- this may need to change
-    set_mode(MODE)
-    result = evaluate(dataset_obj, relationship, assumptions, study_design)
-    
-    print(f"\n{result}")
-    return result
-
-
-    # Use assumptions and hypotheses for interpretation/reporting back to user
-    # Make result human_readable
-    # output = translate(result)
-
-    # Give user output
-    # return output
-
-## TODO: Add relate and compare methods
+    return default_session().hypothesize(vars, prediction)
+
+# @param hypotheses is a list of (vars, prediction) pairs, each as passed to hypothesize
+# @returns list of ResultData, one per hypothesis, in the same order
+def hypothesize_many(hypotheses: list): 
+    return default_session().hypothesize_many(hypotheses)
+
+# @param vars are the names of the (interval, ratio or ordinal) variables to correlate pairwise
+# @param correction adjusts the p-values for the number of pairs: 'bonferroni', 'holm' or 'fdr_bh' (default None)
+# @returns CorrelationMatrix with the coefficient and p-value of every pair of @param vars
+def relate_all(vars: list, correction: str=None): 
+    return default_session().relate_all(vars, correction)
+
+# @param x is the name of the (nominal or ordinal) variable whose groups are compared
+# @param outcomes are the names of the (interval, ratio or ordinal) variables to compare them on
+# @param correction adjusts the p-values of each test for the number of outcomes: 'bonferroni', 'holm' or 'fdr_bh' (default None)
+# @returns pandas DataFrame with the result of each test of each outcome
+def relate_outcomes(x: str, outcomes: list, correction: str=None): 
+    return default_session().relate_outcomes(x, outcomes, correction)
 
 # @param vars that user would like to relate
 # @param stats_tests contains all the tests that the user would like
 # @return properties that must be true in order to satisfy
 # as many of the tests as possible
 def divine_properties(vars:list, tests:list):
-    global study_design
-
-    v_objs = []
-    for v in vars: 
-        v_objs.append(get_var_from_list(v, vars_objs)) # may want to use Dataset instance method instead
-    
-    relationship = relate(v_objs)
-
-    # What kind of study are we analyzing?
-    study_type = determine_study_type(vars, study_design)
-
-    combined_data = None
-    # Do we have a Bivariate analysis?
-    if len(vars) == 2: 
-        combined_data = BivariateData(vars, study_type, alpha=float(assumptions['alpha'])) 
-    else: # Do we have a Multivariate analysis?
-        combined_data = MultivariateData(vars, study_type, alpha=float(assumptions['alpha']))
-
-    # test_to_properties, test_to_broken_properties = which_props(['mannwhitney_u', 'students_t'])
-    test_to_properties, test_to_broken_properties = which_props(tests, vars)
-    
-
-    all_properties_are_satisfied = True
-    for val in test_to_broken_properties.values():
-        if val:
-            all_properties_are_satisfied = False
-            break
-
-    if all_properties_are_satisfied:
-        print(f"\nProperties for {tests[0]} and {tests[1]} are complementary.")
-    else:
-        print(f"\nProperties for {tests[0]} and {tests[1]} conflict.")
-
-    # print(ps)
-    import pprint
-    pp = pprint.PrettyPrinter()
-
-    # print("\nProperties for student's t test and Mann Whitney u test are complementary.")
-    print("\nProperties:")
-    pp.pprint(test_to_properties)
-    print("\nProperties that could not be satisfied:")
-    pp.pprint(test_to_broken_properties)
+    default_session().divine_properties(vars, tests)
@@ -1,4 +1,6 @@
 from tea.runtimeDataStructures.dataset import Dataset
+from tea.runtimeDataStructures.datasetCache import dataset_cache
+import tea.instrumentation as instrumentation
 from tea.ast import (  Variable, DataType, Literal,
                     Relate, Relationship
                 )
@@ -60,12 +62,24 @@ def iscategorical(var: Variable):
     return (isnominal(var) or isordinal(var))
 
 # @param pid is the name of the column with participant ids
-def load_data(source_name: str, vars: list, pid: str):
-    return Dataset(source_name, vars, pid)
+# @param float_dtype is the dtype for interval and ratio columns ('float64' or 'float32')
+# @param chunksize is the number of rows to read at a time, without loading the whole file (see streamingDataset.py). 
+# None (default) loads the whole file.
+# Parsed datasets are cached (see datasetCache.py), so loading the same unchanged file 
+# with the same declarations returns the same Dataset object
+def load_data(source_name: str, vars: list, pid: str, float_dtype: str='float64', chunksize: int=None):
+    with instrumentation.stage('load', source=source_name) as attributes:
+        dataset = dataset_cache.get(source_name, vars, pid, float_dtype, chunksize)
+        attributes['rows'] = dataset.num_rows()
+    return dataset
 
 def load_data_from_url(url: str, name: str):
     return Dataset.load(url, name)
 
+# @param format is 'parquet', 'feather' or 'npy' (see Dataset.convert)
+def convert_data(source_name: str, format: str='parquet', name: str=None):
+    return Dataset.convert(source_name, format, name)
+
 def select(var: Variable, op: str, other: Literal): 
     if (op == '=='):
         return var.subset_equals(other)
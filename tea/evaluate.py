@@ -8,23 +8,30 @@ from tea.runtimeDataStructures.varData import VarData
 from tea.runtimeDataStructures.bivariateData import BivariateData
 from tea.runtimeDataStructures.multivariateData import MultivariateData
 from tea.runtimeDataStructures.resultData import ResultData
-from tea.helpers.evaluateHelperMethods import determine_study_type, assign_roles, add_paired_property, execute_test
-from tea.z3_solver.solver import synthesize_tests
+from tea.helpers.evaluateHelperMethods import determine_study_type, assign_roles, add_paired_property, execute_tests, filter_data
+from tea.helpers.lazyImport import lazy_import
+import tea.instrumentation as instrumentation
+solver = lazy_import('tea.z3_solver.solver') # z3 is imported on first use
 
 import attr
 from typing import Any
 from types import SimpleNamespace # allows for dot notation access for dictionaries
 from typing import Dict
 
-from scipy import stats # Stats library used
-import statsmodels.api as sm
-import statsmodels.formula.api as smf
 import numpy as np # Use some stats from numpy instead
 import pandas as pd
 
 
 # TODO: Pass participant_id as part of experimental design, not load_data
-def evaluate(dataset: Dataset, expr: Node, assumptions: Dict[str, str], design: Dict[str, str]=None):
+# @param mode is how failed assumptions are treated during test selection ('strict' or 'relaxed')
+# @param property_results is shared by evaluations that should not repeat property checks (see PropertyMemo)
+# @param executor is a concurrent.futures Executor to run the selected tests on, None to run them one after another
+# @param bootstrap_options configure the bootstrap (see bootstrap.make_options), the defaults if None
+def evaluate(dataset: Dataset, expr: Node, assumptions: Dict[str, str], design: Dict[str, str]=None, mode: str=None, property_results: dict=None, executor=None, bootstrap_options: dict=None):
+    with instrumentation.stage('evaluate', node=type(expr).__name__): 
+        return _evaluate(dataset, expr, assumptions, design, mode, property_results, executor, bootstrap_options)
+
+def _evaluate(dataset: Dataset, expr: Node, assumptions: Dict[str, str], design: Dict[str, str]=None, mode: str=None, property_results: dict=None, executor=None, bootstrap_options: dict=None):
     if isinstance(expr, Variable):
         # dataframe = dataset[expr.name] # I don't know if we want this. We may want to just store query (in metadata?) and
         # then use query to get raw data later....(for user, not interpreter?)
@@ -79,259 +86,16 @@ def evaluate(dataset: Dataset, expr: Node, assumptions: Dict[str, str], design:
         return VarData(metadata)
 
     elif isinstance(expr, LessThan):
-        lhs = evaluate(dataset, expr.lhs)
-        rhs = evaluate(dataset, expr.rhs)
-        assert isinstance(lhs, VarData)
-        assert isinstance(rhs, VarData)
-
-        dataframe = None
-        metadata = rhs.metadata
-        
-        if (not lhs.metadata):
-            raise ValueError('Malformed Relation. Filter on Variables must have variable as rhs')
-        elif (lhs.metadata['dtype'] is DataType.NOMINAL):
-            raise ValueError('Cannot compare nominal values with Less Than')
-        elif (lhs.metadata['dtype'] is DataType.ORDINAL):
-            # TODO May want to add a case should RHS and LHS both be variables
-            # assert (rhs.metadata is None) 
-            comparison = rhs.dataframe.iloc[0]
-            if (isinstance(comparison, str)):
-                categories = lhs.metadata['categories'] # OrderedDict
-                # Get raw Pandas Series indices for desired data
-                ids  = [i for i,x in enumerate(lhs.dataframe) if categories[x] < categories[comparison]]
-                # Get Pandas Series set indices for desired data
-                p_ids = [lhs.dataframe.index.values[i] for i in ids]
-                # Create new Pandas Series with only the desired data, using set indices
-                dataframe = pd.Series(lhs.dataframe, p_ids)
-                dataframe.index.name = dataset.pid_col_name
-                
-            elif (np.issubdtype(comparison, np.integer)):
-                categories = lhs.metadata['categories'] # OrderedDict
-                # Get raw Pandas Series indices for desired data
-                ids  = [i for i,x in enumerate(lhs.dataframe) if categories[x] < comparison]
-                # Get Pandas Series set indices for desired data
-                p_ids = [lhs.dataframe.index.values[i] for i in ids]
-                # Create new Pandas Series with only the desired data, using set indices
-                dataframe = pd.Series(lhs.dataframe, p_ids)
-                dataframe.index.name = dataset.pid_col_name                
-
-            else: 
-                raise ValueError(f"Cannot compare ORDINAL variables to {type(rhs.dataframe.iloc[0])}")
-
-
-        elif (lhs.metadata['dtype'] is DataType.INTERVAL or lhs.metadata['dtype'] is DataType.RATIO):
-            comparison = rhs.dataframe.iloc[0]
-             # Get raw Pandas Series indices for desired data
-            ids  = [i for i,x in enumerate(lhs.dataframe) if x < comparison]
-            # Get Pandas Series set indices for desired data
-            p_ids = [lhs.dataframe.index.values[i] for i in ids]
-            # Create new Pandas Series with only the desired data, using set indices
-            dataframe = pd.Series(lhs.dataframe, p_ids)
-            dataframe.index.name = dataset.pid_col_name   
-
-        else:
-            raise Exception(f"Invalid Less Than Operation:{lhs} < {rhs}")
-
-        if (isinstance(expr.rhs, Literal)):
-            metadata['query'] = " < \'\'" # override lhs metadata for query
-        elif (isinstance(expr.rhs, Variable)): 
-            metadata['query'] = f" < {rhs.metadata['var_name']}"
-        else: 
-            raise ValueError(f"Not implemented for {rhs}")
-        return VarData(metadata)
+        return filter_data(dataset, expr, '<')
 
     elif isinstance(expr, LessThanEqual):
-        lhs = evaluate(dataset, expr.lhs)
-        rhs = evaluate(dataset, expr.rhs)
-        assert isinstance(lhs, VarData)
-        assert isinstance(rhs, VarData)
-
-
-        dataframe = None
-        metadata = rhs.metadata
-        
-        if (not lhs.metadata):
-            raise ValueError('Malformed Relation. Filter on Variables must have variable as rhs')
-        elif (lhs.metadata['dtype'] is DataType.NOMINAL):
-            raise ValueError('Cannot compare nominal values with Less Than')
-        elif (lhs.metadata['dtype'] is DataType.ORDINAL):
-            # TODO May want to add a case should RHS and LHS both be variables
-            # assert (rhs.metadata is None)
-            comparison = rhs.dataframe.iloc[0]
-            if (isinstance(comparison, str)):
-                categories = lhs.metadata['categories'] # OrderedDict
-                # Get raw Pandas Series indices for desired data
-                ids  = [i for i,x in enumerate(lhs.dataframe) if categories[x] <= categories[comparison]]
-                # Get Pandas Series set indices for desired data
-                p_ids = [lhs.dataframe.index.values[i] for i in ids]
-                # Create new Pandas Series with only the desired data, using set indices
-                dataframe = pd.Series(lhs.dataframe, p_ids)
-                dataframe.index.name = dataset.pid_col_name
-                
-            elif (np.issubdtype(comparison, np.integer)):
-                categories = lhs.metadata['categories'] # OrderedDict
-                # Get raw Pandas Series indices for desired data
-                ids  = [i for i,x in enumerate(lhs.dataframe) if categories[x] <= comparison]
-                # Get Pandas Series set indices for desired data
-                p_ids = [lhs.dataframe.index.values[i] for i in ids]
-                # Create new Pandas Series with only the desired data, using set indices
-                dataframe = pd.Series(lhs.dataframe, p_ids)
-                dataframe.index.name = dataset.pid_col_name                
-
-            else: 
-                raise ValueError(f"Cannot compare ORDINAL variables to {type(rhs.dataframe.iloc[0])}")
-
-
-        elif (lhs.metadata['dtype'] is DataType.INTERVAL or lhs.metadata['dtype'] is DataType.RATIO):
-            comparison = rhs.dataframe.iloc[0]
-             # Get raw Pandas Series indices for desired data
-            ids  = [i for i,x in enumerate(lhs.dataframe) if x <= comparison]
-            # Get Pandas Series set indices for desired data
-            p_ids = [lhs.dataframe.index.values[i] for i in ids]
-            # Create new Pandas Series with only the desired data, using set indices
-            dataframe = pd.Series(lhs.dataframe, p_ids)
-            dataframe.index.name = dataset.pid_col_name   
-
-        else:
-            raise Exception(f"Invalid Less Than Equal Operation:{lhs} <= {rhs}")
-
-
-        if (isinstance(expr.rhs, Literal)):
-            metadata['query'] = " <= \'\'" # override lhs metadata for query
-        elif (isinstance(expr.rhs, Variable)): 
-            metadata['query'] = f" <= {rhs.metadata['var_name']}"
-        else: 
-            raise ValueError(f"Not implemented for {rhs}")
-
-        return VarData(metadata)
+        return filter_data(dataset, expr, '<=')
     
     elif isinstance(expr, GreaterThan):
-        lhs = evaluate(dataset, expr.lhs)
-        rhs = evaluate(dataset, expr.rhs)
-        assert isinstance(lhs, VarData)
-        assert isinstance(rhs, VarData)
-
-
-        dataframe = None
-        metadata = rhs.metadata
-        
-        if (not lhs.metadata):
-            raise ValueError('Malformed Relation. Filter on Variables must have variable as rhs')
-        elif (lhs.metadata['dtype'] is DataType.NOMINAL):
-            raise ValueError('Cannot compare nominal values with Greater Than')
-        elif (lhs.metadata['dtype'] is DataType.ORDINAL):
-            # TODO May want to add a case should RHS and LHS both be variables
-            # assert (rhs.metadata is None) 
-            comparison = rhs.dataframe.iloc[0]
-            if (isinstance(comparison, str)):
-                categories = lhs.metadata['categories'] # OrderedDict
-                # Get raw Pandas Series indices for desired data
-                ids  = [i for i,x in enumerate(lhs.dataframe) if categories[x] > categories[comparison]]
-                # Get Pandas Series set indices for desired data
-                p_ids = [lhs.dataframe.index.values[i] for i in ids]
-                # Create new Pandas Series with only the desired data, using set indices
-                dataframe = pd.Series(lhs.dataframe, p_ids)
-                dataframe.index.name = dataset.pid_col_name
-                
-            elif (np.issubdtype(comparison, np.integer)):
-                categories = lhs.metadata['categories'] # OrderedDict
-                # Get raw Pandas Series indices for desired data
-                ids  = [i for i,x in enumerate(lhs.dataframe) if categories[x] > comparison]
-                # Get Pandas Series set indices for desired data
-                p_ids = [lhs.dataframe.index.values[i] for i in ids]
-                # Create new Pandas Series with only the desired data, using set indices
-                dataframe = pd.Series(lhs.dataframe, p_ids)
-                dataframe.index.name = dataset.pid_col_name                
-
-            else: 
-                raise ValueError(f"Cannot compare ORDINAL variables to {type(rhs.dataframe.iloc[0])}")
-
-
-        elif (lhs.metadata['dtype'] is DataType.INTERVAL or lhs.metadata['dtype'] is DataType.RATIO):
-            comparison = rhs.dataframe.iloc[0]
-             # Get raw Pandas Series indices for desired data
-            ids  = [i for i,x in enumerate(lhs.dataframe) if x > comparison]
-            # Get Pandas Series set indices for desired data
-            p_ids = [lhs.dataframe.index.values[i] for i in ids]
-            # Create new Pandas Series with only the desired data, using set indices
-            dataframe = pd.Series(lhs.dataframe, p_ids)
-            dataframe.index.name = dataset.pid_col_name   
-
-        else:
-            raise Exception(f"Invalid Greater Than Operation:{lhs} > {rhs}")
-
-        if (isinstance(expr.rhs, Literal)):
-            metadata['query'] = " > \'\'" # override lhs metadata for query
-        elif (isinstance(expr.rhs, Variable)): 
-            metadata['query'] = f" > {rhs.metadata['var_name']}"
-        else: 
-            raise ValueError(f"Not implemented for {rhs}")
-
-        return VarData(metadata) 
+        return filter_data(dataset, expr, '>')
    
     elif isinstance(expr, GreaterThanEqual):
-        lhs = evaluate(dataset, expr.lhs)
-        rhs = evaluate(dataset, expr.rhs)
-        assert isinstance(lhs, VarData)
-        assert isinstance(rhs, VarData)
-
-
-        dataframe = None
-        metadata = rhs.metadata
-        
-        if (not lhs.metadata):
-            raise ValueError('Malformed Relation. Filter on Variables must have variable as rhs')
-        elif (lhs.metadata['dtype'] is DataType.NOMINAL):
-            raise ValueError('Cannot compare nominal values with Greater Than Equal')
-        elif (lhs.metadata['dtype'] is DataType.ORDINAL):
-            # TODO May want to add a case should RHS and LHS both be variables
-            # assert (rhs.metadata is None) 
-            comparison = rhs.dataframe.iloc[0]
-            if (isinstance(comparison, str)):
-                categories = lhs.metadata['categories'] # OrderedDict
-                # Get raw Pandas Series indices for desired data
-                ids  = [i for i,x in enumerate(lhs.dataframe) if categories[x] >= categories[comparison]]
-                # Get Pandas Series set indices for desired data
-                p_ids = [lhs.dataframe.index.values[i] for i in ids]
-                # Create new Pandas Series with only the desired data, using set indices
-                dataframe = pd.Series(lhs.dataframe, p_ids)
-                dataframe.index.name = dataset.pid_col_name
-                
-            elif (np.issubdtype(comparison, np.integer)):
-                categories = lhs.metadata['categories'] # OrderedDict
-                # Get raw Pandas Series indices for desired data
-                ids  = [i for i,x in enumerate(lhs.dataframe) if categories[x] >= comparison]
-                # Get Pandas Series set indices for desired data
-                p_ids = [lhs.dataframe.index.values[i] for i in ids]
-                # Create new Pandas Series with only the desired data, using set indices
-                dataframe = pd.Series(lhs.dataframe, p_ids)
-                dataframe.index.name = dataset.pid_col_name                
-
-            else: 
-                raise ValueError(f"Cannot compare ORDINAL variables to {type(rhs.dataframe.iloc[0])}")
-
-
-        elif (lhs.metadata['dtype'] is DataType.INTERVAL or lhs.metadata['dtype'] is DataType.RATIO):
-            comparison = rhs.dataframe.iloc[0]
-             # Get raw Pandas Series indices for desired data
-            ids  = [i for i,x in enumerate(lhs.dataframe) if x >= comparison]
-            # Get Pandas Series set indices for desired data
-            p_ids = [lhs.dataframe.index.values[i] for i in ids]
-            # Create new Pandas Series with only the desired data, using set indices
-            dataframe = pd.Series(lhs.dataframe, p_ids)
-            dataframe.index.name = dataset.pid_col_name   
-
-        else:
-            raise Exception(f"Invalid Greater Than Equal Operation:{lhs} >= {rhs}")
-
-
-        if (isinstance(expr.rhs, Literal)):
-            metadata['query'] = " >= \'\'" # override lhs metadata for query
-        elif (isinstance(expr.rhs, Variable)): 
-            metadata['query'] = f" >= {rhs.metadata['var_name']}"
-        else: 
-            raise ValueError(f"Not implemented for {rhs}")
-        return VarData(metadata) 
+        return filter_data(dataset, expr, '>=')
 
     elif isinstance(expr, Relate):    
         vars = []
@@ -362,7 +126,8 @@ def evaluate(dataset: Dataset, expr: Node, assumptions: Dict[str, str], design:
         add_paired_property(dataset, combined_data, study_type, design) # check sample sizes are identical
 
         # Infer stats tests (mingled with)
-        tests = synthesize_tests(dataset, assumptions, combined_data)
+        bound_tests = solver.synthesize_tests(dataset, assumptions, combined_data, mode, property_results=property_results)
+        tests = [test.name for test in bound_tests]
         
     
         """"
@@ -388,16 +153,13 @@ def evaluate(dataset: Dataset, expr: Node, assumptions: Dict[str, str], design:
         """
         
         # Execute and store results from each valid test
-        results = {}
         if len(tests) == 0: 
             tests.append('bootstrap') # Default to bootstrap
 
-        for test in tests: 
-            test_result = execute_test(dataset, design, expr.predictions, combined_data, test)
-            results[test] = test_result
+        results = execute_tests(dataset, design, expr.predictions, combined_data, tests, executor, bootstrap_options)
         
         
-        res_data = ResultData(results, combined_data)
+        res_data = ResultData(results, combined_data, bound_tests)
 
         """
         # TODO: use a handle here to more generally/modularly support corrections, need a more generic data structure for this!
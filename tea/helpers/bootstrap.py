@@ -0,0 +1,94 @@
+import attr
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_OPTIONS = {
+    'iterations': 10000, # number of bootstrap resamples
+    'workers': 1, # number of processes; 1 runs in this process
+    'seed': None, # seed for reproducible resampling; None draws fresh entropy
+    'max_elements': 2 ** 22 # bound on resampled values held in memory per chunk (per worker)
+}
+
+# @returns copy of @param options (DEFAULT_OPTIONS by default) with @param iterations, workers, seed, 
+# max_elements overridden. Options that are not passed keep their values.
+# Options are held by each Session (see Session.set_bootstrap_options) and passed to bootstrap.
+def make_options(options: dict=None, iterations: int=None, workers: int=None, seed: int=None, max_elements: int=None):
+    options = dict(DEFAULT_OPTIONS if options is None else options)
+
+    if iterations is not None:
+        if iterations < 1:
+            raise ValueError(f"Bootstrap needs at least one iteration: {iterations}")
+        options['iterations'] = iterations
+    if workers is not None:
+        if workers < 1:
+            raise ValueError(f"Bootstrap needs at least one worker: {workers}")
+        options['workers'] = workers
+    if seed is not None:
+        options['seed'] = seed
+    if max_elements is not None:
+        if max_elements < 1:
+            raise ValueError(f"Bootstrap chunks need to hold at least one value: {max_elements}")
+        options['max_elements'] = max_elements
+
+    return options
+
+@attr.s(init=True)
+class BootstrapResult(object):
+    lower_bound = attr.ib()
+    value = attr.ib()
+    upper_bound = attr.ib()
+
+    def __attrs_post_init__(self):
+        if self.lower_bound > self.upper_bound:
+            self.lower_bound, self.upper_bound = self.upper_bound, self.lower_bound
+
+# @param values is a 1-D array of observations
+# @param stat_func computes the statistic along an axis, e.g., np.median(samples, axis=1)
+# @returns BootstrapResult with the pivotal (1 - @param alpha) confidence interval of @param stat_func
+# Resamples are drawn in chunks of at most max_elements values. Each chunk has its own random
+# stream spawned from @param seed, so results for a seed do not depend on the number of workers.
+# Options that are not passed are the DEFAULT_OPTIONS.
+def bootstrap(values, stat_func=np.median, alpha: float=0.05, iterations: int=None, seed: int=None, workers: int=None, max_elements: int=None):
+    iterations = DEFAULT_OPTIONS['iterations'] if iterations is None else iterations
+    seed = DEFAULT_OPTIONS['seed'] if seed is None else seed
+    workers = DEFAULT_OPTIONS['workers'] if workers is None else workers
+    max_elements = DEFAULT_OPTIONS['max_elements'] if max_elements is None else max_elements
+
+    values = np.asarray(values)
+    if values.ndim != 1 or len(values) == 0:
+        raise ValueError(f"Can only bootstrap a non-empty 1-D array of values, not shape {values.shape}")
+
+    distribution = bootstrap_distribution(values, stat_func, iterations, seed, workers, max_elements)
+    stat_val = stat_func(values[np.newaxis, :], axis=1)[0]
+
+    return _pivotal_interval(distribution, stat_val, alpha)
+
+# @returns array of @param iterations values of @param stat_func on resamples of @param values
+def bootstrap_distribution(values, stat_func, iterations: int, seed: int=None, workers: int=1, max_elements: int=2 ** 22):
+    values = np.asarray(values)
+    chunk_size = max(1, min(iterations, max_elements // len(values)))
+    sizes = [chunk_size] * (iterations // chunk_size)
+    if iterations % chunk_size:
+        sizes.append(iterations % chunk_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if workers > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(sizes))) as executor:
+            chunks = list(executor.map(_resample_chunk, [values] * len(sizes), [stat_func] * len(sizes), seeds, sizes))
+    else:
+        chunks = [_resample_chunk(values, stat_func, s, size) for s, size in zip(seeds, sizes)]
+
+    return np.concatenate(chunks)
+
+# @returns @param stat_func of @param size resamples of @param values
+def _resample_chunk(values, stat_func, seed, size: int):
+    rng = np.random.default_rng(seed)
+    indices = rng.integers(0, len(values), size=(size, len(values)))
+
+    return np.asarray(stat_func(values[indices], axis=1))
+
+def _pivotal_interval(distribution, stat_val, alpha: float):
+    low = 2 * stat_val - np.percentile(distribution, 100 * (1 - alpha / 2.))
+    high = 2 * stat_val - np.percentile(distribution, 100 * (alpha / 2.))
+
+    return BootstrapResult(low, stat_val, high)
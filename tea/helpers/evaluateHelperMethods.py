@@ -1,34 +1,38 @@
 # Tea
 from tea.global_vals import *
-from tea.ast import DataType, LessThan, GreaterThan
-from tea.runtimeDataStructures.dataset import Dataset
+from tea.ast import DataType, Variable, Literal, LessThan, GreaterThan
+from tea.runtimeDataStructures.dataset import Dataset, FullDataRequired
 from tea.runtimeDataStructures.varData import VarData
 from tea.runtimeDataStructures.combinedData import CombinedData
 from tea.runtimeDataStructures.bivariateData import BivariateData
 from tea.runtimeDataStructures.multivariateData import MultivariateData
-from tea.runtimeDataStructures.testResult import TestResult
+from tea.runtimeDataStructures.testResult import TestResult, TestFailure
+from tea.runtimeDataStructures.correlationMatrix import CorrelationMatrix
+from tea.runtimeDataStructures.datasetCache import dataset_cache
+from tea.runtimeDataStructures.streamingDataset import StreamingDataset
 
 # Stats
 from statistics import mean, stdev
 from math import sqrt
-from scipy import stats # Stats library used
-from sklearn import preprocessing # for creating interaction effects
-import statsmodels.api as sm
-import statsmodels.formula.api as smf
-from statsmodels.formula.api import ols
+from tea.helpers.lazyImport import lazy_import
+import tea.instrumentation as instrumentation
+# Imported on first use (see LazyModule)
+stats = lazy_import('scipy.stats') # Stats library used
 
 import pandas as pd
-from statsmodels.stats.anova import AnovaRM
-import bootstrapped.bootstrap as bs
-import bootstrapped.stats_functions as bs_stats
+import tea.helpers.bootstrap as bs
+import numpy as np
 
 # Other
 import attr
+import traceback
+from concurrent.futures import ProcessPoolExecutor
 from typing import Any, Dict, List
 from types import SimpleNamespace # allows for dot notation access for dictionaries
 from collections import namedtuple
 from enum import Enum
 import copy
+import itertools
 
 def determine_study_type(vars_data: list, design: Dict[str, str]):
     if design: 
@@ -141,7 +145,7 @@ def add_eq_variance_property(dataset, combined_data: CombinedData, study_type: s
             for x in xs: 
                 cat = [k for k,v in x.metadata[categories].items()]
                 for c in cat: 
-                    data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
+                    data = dataset.select_group(y.metadata[name], x.metadata[name], c)
                     grouped_data.append(data)
                 if isinstance(combined_data, BivariateData):
                     # Equal variance
@@ -211,7 +215,7 @@ def add_categories_normal(dataset, combined_data: CombinedData, study_type: str,
             for x in xs: 
                 cat = [k for k,v in x.metadata[categories].items()]
                 for c in cat: 
-                    data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
+                    data = dataset.select_group(y.metadata[name], x.metadata[name], c)
                     grouped_data_name =  str(x.metadata[name] + ':' + c)
                     grouped_data[grouped_data_name] = compute_distribution(data)
                 combined_data.properties[cat_distribution] = dict()
@@ -248,9 +252,45 @@ NormalTest = namedtuple('NormalTest', ('W', 'p_value'))
 def compute_normal_distribution(data):
     # norm_test = stats.normaltest(data, axis=0)
     # return (norm_test[0], norm_test[1])
+    if len(data) < 3: # Shapiro-Wilk needs three values, normality is unknown (as in compare_outcomes)
+        return NormalTest(np.nan, np.nan)
     w, p_value = stats.shapiro(data)
     return NormalTest(w, p_value)
     # TODO: may want to compute/find the best distribution if not normal
+
+# Shapiro-Wilk needs every value, so without the data (streaming mode) normality is checked with 
+# D'Agostino and Pearson's omnibus test (as stats.normaltest computes it), from the moments of group 
+# @param i of @param moments (GroupMoments)
+def compute_normal_distribution_from_moments(moments, i: int):
+    n = moments.counts[i]
+    if n < 8: 
+        raise FullDataRequired(f"Checking the normality of fewer than 8 values ({int(n)}) needs the full data")
+    m2 = moments.m2[i] / n
+    skewness = (moments.m3[i] / n) / m2 ** 1.5
+    kurtosis = (moments.m4[i] / n) / m2 ** 2
+
+    # Skewness test
+    y = skewness * np.sqrt(((n + 1) * (n + 3)) / (6.0 * (n - 2)))
+    beta2 = (3.0 * (n ** 2 + 27 * n - 70) * (n + 1) * (n + 3) / ((n - 2.0) * (n + 5) * (n + 7) * (n + 9)))
+    w2 = -1 + np.sqrt(2 * (beta2 - 1))
+    delta = 1 / np.sqrt(0.5 * np.log(w2))
+    alpha = np.sqrt(2.0 / (w2 - 1))
+    y = 1 if y == 0 else y
+    z_skewness = delta * np.log(y / alpha + np.sqrt((y / alpha) ** 2 + 1))
+
+    # Kurtosis test
+    expected = 3.0 * (n - 1) / (n + 1)
+    variance = 24.0 * n * (n - 2) * (n - 3) / ((n + 1) * (n + 1.) * (n + 3) * (n + 5))
+    x = (kurtosis - expected) / np.sqrt(variance)
+    sqrt_beta1 = 6.0 * (n * n - 5 * n + 2) / ((n + 7) * (n + 9)) * np.sqrt((6.0 * (n + 3) * (n + 5)) / (n * (n - 2) * (n - 3)))
+    a = 6.0 + 8.0 / sqrt_beta1 * (2.0 / sqrt_beta1 + np.sqrt(1 + 4.0 / (sqrt_beta1 ** 2)))
+    term1 = 1 - 2 / (9.0 * a)
+    denom = 1 + x * np.sqrt(2 / (a - 4.0))
+    term2 = np.sign(denom) * ((1 - 2.0 / a) / abs(denom)) ** (1 / 3.0) if denom != 0 else np.nan
+    z_kurtosis = (term1 - term2) / np.sqrt(2 / (9.0 * a))
+
+    k2 = z_skewness ** 2 + z_kurtosis ** 2
+    return NormalTest(k2, stats.chi2.sf(k2, 2))
  
 # @returns bootstrapped variance for @param data
 def compute_variance(data): 
@@ -266,11 +306,100 @@ def compute_eq_variance(groups_data):
     levene_test = stats.levene(*groups_data)
     return (levene_test[0], levene_test[1])
 
+# Levene's test from GroupStatistics of the absolute deviations from the group means 
+# (see StreamingDataset.deviation_statistics): a one-way ANOVA of the deviations. 
+# Centred on the means rather than the medians (as stats.levene(center='mean')), 
+# since medians cannot be merged across chunks.
+def compute_eq_variance_from_statistics(deviation_stats):
+    between_ss, within_ss, between_df, within_df = one_way_anova(deviation_stats)
+    w = (between_ss / between_df) / (within_ss / within_df)
+    return (w, stats.f.sf(w, between_df, within_df))
+
+# @returns (between groups sum of squares, within groups sum of squares, between groups dof, within groups dof) 
+# of a one-way ANOVA, from @param group_stats (GroupStatistics). Groups without values are left out.
+def one_way_anova(group_stats):
+    nonempty = group_stats.counts > 0
+    counts = group_stats.counts[nonempty]
+    means = group_stats.sums[nonempty] / counts
+    grand_mean = group_stats.sums.sum() / counts.sum()
+    between_ss = (counts * (means - grand_mean) ** 2).sum()
+    within_ss = group_stats.sums_of_squares.sum()
+    between_df = float(len(counts) - 1)
+    within_df = float(counts.sum() - len(counts))
+    return between_ss, within_ss, between_df, within_df
+
+# @returns type II ANOVA table (as statsmodels' anova_lm(typ=2) would compute it for the full factorial model) 
+# from @param cells (CellStatistics): one row per main effect and interaction, then the residual. 
+# The sum of squares of a term is how much adding it to all the terms that do not contain it reduces 
+# the residual sum of squares. The models are fit by weighted least squares on the cell means (weighted by 
+# the cell counts), whose design matrix has a row per cell rather than per value.
+def type2_anova(cells):
+    factors = range(len(cells.factors))
+    terms = [term for size in range(1, len(cells.factors) + 1) for term in itertools.combinations(factors, size)]
+    dummies = [np.eye(k)[cells.levels[:, f], 1:] for f, k in enumerate(cells.num_levels)] # treatment coding
+    weights = np.sqrt(cells.counts)
+
+    residuals = {} # set of terms -> (residual sum of squares, rank)
+    def fit(model): 
+        if model not in residuals: 
+            if len(model) == len(terms): 
+                residuals[model] = (cells.within_ss, len(cells.counts)) # saturated, fits the cell means
+            else: 
+                columns = [np.ones((len(cells.counts), 1))]
+                for term in model: 
+                    column = dummies[term[0]]
+                    for f in term[1:]: 
+                        column = (column[:, :, None] * dummies[f][:, None, :]).reshape(len(cells.counts), -1)
+                    columns.append(column)
+                design = np.hstack(columns) * weights[:, None]
+                coefs, _, rank, _ = np.linalg.lstsq(design, cells.means * weights, rcond=None)
+                deviations = cells.means * weights - design @ coefs
+                residuals[model] = (cells.within_ss + deviations @ deviations, rank)
+        return residuals[model]
+
+    residual_ss, rank = fit(frozenset(terms))
+    residual_df = float(cells.count() - rank)
+    rows = {}
+    for term in terms: 
+        without = frozenset(t for t in terms if not set(term) <= set(t))
+        ss_without, rank_without = fit(without)
+        ss_with, rank_with = fit(without | {term})
+        term_ss = ss_without - ss_with
+        term_df = float(rank_with - rank_without)
+        f_stat = (term_ss / term_df) / (residual_ss / residual_df) if term_df else np.nan
+        name = ':'.join(f"C({cells.factors[f]})" for f in term)
+        rows[name] = [term_ss, term_df, f_stat, stats.f.sf(f_stat, term_df, residual_df) if term_df else np.nan]
+    rows['Residual'] = [residual_ss, residual_df, np.nan, np.nan]
+
+    return pd.DataFrame.from_dict(rows, orient='index', columns=['sum_sq', 'df', 'F', 'PR(>F)'])
+
 # Queries dataset using var_data's query
 # @returns data for var_data according to its internally held query
 def get_data(dataset: Dataset, var: VarData):
+    if var.dataframe is not None: 
+        return var.dataframe
     return dataset.select(var.metadata[name], where=f"{var.metadata[query]}")
 
+# Evaluates comparison filters (LessThan, LessThanEqual, GreaterThan, GreaterThanEqual) 
+# @param op is one of '<', '<=', '>', '>='
+# @returns VarData for the lhs variable holding only the rows that satisfy the comparison
+def filter_data(dataset: Dataset, expr, op: str): 
+    if not isinstance(expr.lhs, Variable): 
+        raise ValueError('Malformed Relation. Filter on Variables must have variable as lhs')
+    if not isinstance(expr.rhs, Literal): 
+        # TODO May want to add a case should RHS and LHS both be variables
+        raise ValueError(f"Not implemented for {expr.rhs}")
+
+    metadata = dataset.get_variable_data(expr.lhs.name) # (dtype, categories)
+    if (metadata['dtype'] is DataType.NOMINAL): 
+        raise ValueError(f"Cannot compare nominal values with {op}")
+
+    metadata['var_name'] = expr.lhs.name
+    metadata['query'] = f" {op} \'{expr.rhs.value}\'"
+    dataframe = dataset.filter(expr.lhs.name, op, expr.rhs.value)
+    
+    return VarData(metadata, dataframe=dataframe)
+
 def is_normal(comp_data: CombinedData, alpha, data=None):
     if (data is not None): # raw data being checked for normality
         norm_test = compute_distribution(data)
@@ -306,8 +435,6 @@ def students_t(dataset, predictions, combined_data: BivariateData):
     ys = combined_data.get_explained_variables()
     x = xs[0]
     y = ys[0]
-    cat = [k for k,v in x.metadata[categories].items()]
-    data = []
 
     if predictions: 
         if isinstance(predictions[0], list): 
@@ -317,29 +444,19 @@ def students_t(dataset, predictions, combined_data: BivariateData):
     else: 
         prediction = None
     
-    lhs = None
-    rhs = None
-    for c in cat: 
-        cat_data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
-        if c == prediction.lhs.value:
-            lhs = cat_data
-        if c == prediction.rhs.value:
-            rhs = cat_data
-        data.append(cat_data)
+    group_stats = dataset.group_statistics(y.metadata[name], x.metadata[name])
+    lhs = prediction.lhs.value
+    rhs = prediction.rhs.value
 
-    t_stat, p_val = stats.ttest_ind(lhs, rhs, equal_var=True)
+    t_stat, p_val = stats.ttest_ind_from_stats(group_stats.mean(lhs), group_stats.stdev(lhs), group_stats.count(lhs), 
+                                                group_stats.mean(rhs), group_stats.stdev(rhs), group_stats.count(rhs), equal_var=True)
 
     group_descriptive_statistics = {
-        prediction.lhs.value: {
-            'mean': mean(lhs),
-            'stdev': stdev(lhs),
-        }, prediction.rhs.value: {
-            'mean': mean(rhs),
-            'stdev': stdev(rhs),
-        },
+        lhs: group_stats.descriptive_statistics(lhs), 
+        rhs: group_stats.descriptive_statistics(rhs)
     }
     
-    dof = len(lhs) + len(rhs) - 2 # Group1 + Group2 - 2
+    dof = group_stats.count(lhs) + group_stats.count(rhs) - 2 # Group1 + Group2 - 2
     test_result = TestResult( 
                         name = students_t_name,
                         test_statistic = t_stat,
@@ -373,7 +490,7 @@ def paired_students_t(dataset, predictions, combined_data: CombinedData):
         prediction = None
 
     for c in cat: 
-        cat_data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
+        cat_data = dataset.select_group(y.metadata[name], x.metadata[name], c)
         data.append(cat_data)
     
     t_stat, p_val = stats.ttest_rel(data[0], data[1])
@@ -399,7 +516,6 @@ def welchs_t(dataset, predictions, combined_data: BivariateData):
     x = xs[0]
     y = ys[0]
     cat = [k for k,v in x.metadata[categories].items()]
-    data = []
 
     if predictions:
         if isinstance(predictions[0], list):
@@ -409,24 +525,16 @@ def welchs_t(dataset, predictions, combined_data: BivariateData):
     else:
         prediction = None
 
-    lhs = None
-    rhs = None
-    for c in cat:
-        cat_data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
-        if c == prediction.lhs.value:
-            lhs = cat_data
-        if c == prediction.rhs.value:
-            rhs = cat_data
-        data.append(cat_data)
+    group_stats = dataset.group_statistics(y.metadata[name], x.metadata[name])
+    lhs = prediction.lhs.value
+    rhs = prediction.rhs.value
 
-    t_stat, p_val = stats.ttest_ind(lhs, rhs, equal_var=False)
+    t_stat, p_val = stats.ttest_ind_from_stats(group_stats.mean(lhs), group_stats.stdev(lhs), group_stats.count(lhs), 
+                                                group_stats.mean(rhs), group_stats.stdev(rhs), group_stats.count(rhs), equal_var=False)
     # dof = (len(data[0]) + len(data[1]))/2. - 1 # (Group1 + Group2)/2 - 1
     
     # TODO Maybe use Satterthaite-Welch adjustment 
-    if len(data[0]) < len(data[1]): 
-        dof = len(data[0]) - 1
-    else: 
-        dof = len(data[1]) - 1
+    dof = min(group_stats.count(cat[0]), group_stats.count(cat[1])) - 1
     test_result = TestResult( 
                         name = welchs_t_name,
                         test_statistic = t_stat,
@@ -453,11 +561,6 @@ def mannwhitney_u(dataset, predictions, combined_data: BivariateData):
     x = xs[0]
     y = ys[0]
     cat = [k for k,v in x.metadata[categories].items()]
-    data = []
-
-    for c in cat: 
-        cat_data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
-        data.append(cat_data)
     
     if predictions: 
         if isinstance(predictions[0], list): 
@@ -466,8 +569,22 @@ def mannwhitney_u(dataset, predictions, combined_data: BivariateData):
             prediction = predictions[0]
     else: 
         prediction = None
-    t_stat, p_val = stats.mannwhitneyu(data[0], data[1], alternative='two-sided')
-    dof = len(data[0]) # TODO This might not be correct
+
+    # U (of the first category) from the rank sums, as stats.mannwhitneyu(alternative='two-sided') computes it
+    ranks = dataset.ranks(y.metadata[name], x.metadata[name], cat[:2])
+    n1 = ranks.count(cat[0])
+    n2 = ranks.count(cat[1])
+    t_stat = ranks.u_statistic(cat[0], cat[1])
+    if (n1 <= 8 or n2 <= 8) and not ranks.tie_term: 
+        # Small samples without ties get the exact distribution, which is the same for ranks as for values
+        data = [ranks.ranks[ranks.codes == i] for i in range(2)]
+        t_stat, p_val = stats.mannwhitneyu(data[0], data[1], alternative='two-sided')
+    else: 
+        n = n1 + n2
+        sigma = np.sqrt(n1 * n2 / 12 * ((n + 1) - ranks.tie_term / (n * (n - 1))))
+        z = (max(t_stat, n1 * n2 - t_stat) - n1 * n2 / 2 - 0.5) / sigma # with continuity correction
+        p_val = min(2 * stats.norm.sf(z), 1.0)
+    dof = n1
     test_result = TestResult( 
                         name = mann_whitney_name,
                         test_statistic = t_stat,
@@ -492,7 +609,7 @@ def wilcoxon_signed_rank(dataset: Dataset, predictions, combined_data: CombinedD
     data = []
 
     for c in cat: 
-        cat_data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
+        cat_data = dataset.select_group(y.metadata[name], x.metadata[name], c)
         data.append(cat_data)
     
     if predictions: 
@@ -522,13 +639,6 @@ def wilcoxon_signed_rank(dataset: Dataset, predictions, combined_data: CombinedD
 def pearson_corr(dataset: Dataset, predictions, combined_data: CombinedData):
     assert(len(combined_data.vars) == 2)
     
-    data = []
-    for var in combined_data.vars: 
-        var_data = get_data(dataset, var)
-        data.append(var_data)
-
-    assert(len(data) == 2)
-    
     if predictions: 
         if isinstance(predictions[0], list): 
             prediction = predictions[0][0]
@@ -536,7 +646,22 @@ def pearson_corr(dataset: Dataset, predictions, combined_data: CombinedData):
             prediction = predictions[0]
     else: 
         prediction = None
-    t_stat, p_val = stats.pearsonr(data[0], data[1])
+
+    if dataset.streaming: 
+        # From the co-moments of the two variables, same p-value as stats.pearsonr
+        co_moments = dataset.co_moments(combined_data.vars[0].metadata[name], combined_data.vars[1].metadata[name])
+        t_stat = co_moments.correlation()
+        dof = co_moments.count - 2
+        t = t_stat * np.sqrt(dof / (1 - t_stat ** 2)) if abs(t_stat) < 1 else np.inf
+        p_val = 2 * stats.t.sf(abs(t), dof)
+    else: 
+        data = []
+        for var in combined_data.vars: 
+            var_data = get_data(dataset, var)
+            data.append(var_data)
+
+        assert(len(data) == 2)
+        t_stat, p_val = stats.pearsonr(data[0], data[1])
     dof = None
     test_result = TestResult( 
                         name = pearson_name,
@@ -548,24 +673,20 @@ def pearson_corr(dataset: Dataset, predictions, combined_data: CombinedData):
     return test_result
 
 
+# @returns the (cached) ranks of all rows of @param vars (see Dataset.ranks), or None if they cannot be 
+# used: a variable is filtered, or some rows are missing a value, so that the pairs would need re-ranking
+def _shared_ranks(dataset: Dataset, vars: list): 
+    if any(var.dataframe is not None or var.metadata.get(query) for var in vars): 
+        return None
+    ranks = [dataset.ranks(var.metadata[name]).ranks for var in vars]
+    if any(np.isnan(r).any() for r in ranks): 
+        return None
+    return ranks
+
 # https://docs.scipy.org/doc/scipy-0.14.0/reference/generated/scipy.stats.spearmanr.html
 # Parameters: a, b (b is optional) | axis (optional) 
 def spearman_corr(dataset: Dataset, predictions, combined_data: CombinedData):
     assert(len(combined_data.vars) == 2)
-    
-    data = []
-    for var in combined_data.vars: 
-        # TODO: Check that var is ordinal. If so, then assign all ordinal values numbers 
-        # Compare to without converting to numbers (in Evernote)
-        var_data = get_data(dataset, var)
-        if var.is_ordinal(): 
-            ordered_cat = var.metadata[categories]
-            num_var_data = [ordered_cat[v] for v in var_data]
-            var_data = num_var_data
-
-        data.append(var_data)
-    
-    assert(len(data) == 2)
 
     if predictions: 
         if isinstance(predictions[0], list): 
@@ -574,7 +695,29 @@ def spearman_corr(dataset: Dataset, predictions, combined_data: CombinedData):
             prediction = predictions[0]
     else: 
         prediction = None
-    t_stat, p_val = stats.spearmanr(data[0], data[1])
+
+    ranks = _shared_ranks(dataset, combined_data.vars)
+    if ranks is not None: 
+        # Pearson correlation of the ranks, same p-value as stats.spearmanr
+        t_stat = np.corrcoef(ranks[0], ranks[1])[0, 1]
+        dof = len(ranks[0]) - 2
+        t = t_stat * np.sqrt(dof / ((t_stat + 1.0) * (1.0 - t_stat))) if abs(t_stat) < 1 else np.inf
+        p_val = 2 * stats.t.sf(abs(t), dof)
+    else: 
+        data = []
+        for var in combined_data.vars: 
+            # TODO: Check that var is ordinal. If so, then assign all ordinal values numbers 
+            # Compare to without converting to numbers (in Evernote)
+            var_data = get_data(dataset, var)
+            if var.is_ordinal(): 
+                ordered_cat = var.metadata[categories]
+                num_var_data = [ordered_cat[v] for v in var_data]
+                var_data = num_var_data
+
+            data.append(var_data)
+        
+        assert(len(data) == 2)
+        t_stat, p_val = stats.spearmanr(data[0], data[1])
     dof = None
     test_result = TestResult( 
                         name = spearman_name,
@@ -590,10 +733,13 @@ def spearman_corr(dataset: Dataset, predictions, combined_data: CombinedData):
 def kendalltau_corr(dataset: Dataset, predictions, combined_data: CombinedData): 
     assert(len(combined_data.vars) == 2)
     
-    data = []
-    for var in combined_data.vars: 
-        var_data = get_data(dataset, var)
-        data.append(var_data)
+    # Tau only depends on the order of the values, so the (shared) ranks give the same result
+    data = _shared_ranks(dataset, combined_data.vars)
+    if data is None: 
+        data = []
+        for var in combined_data.vars: 
+            var_data = get_data(dataset, var)
+            data.append(var_data)
 
     assert(len(data) == 2)
     if predictions: 
@@ -615,6 +761,303 @@ def kendalltau_corr(dataset: Dataset, predictions, combined_data: CombinedData):
 
     return test_result
 
+# @returns (Pearson correlation, number of rows) of each pair of columns of @param values (numpy array 
+# with NaN for missing values), each pair over the rows in which both columns have values. 
+# All pairs are computed at once from products of the (masked) columns.
+def _pairwise_correlations(values): 
+    present = ~np.isnan(values)
+    weights = present.astype(np.float64)
+    centered = np.where(present, values - np.nanmean(values, axis=0), 0.0) # centered to avoid cancellation
+    counts = weights.T @ weights
+    sums = centered.T @ weights # sum of column i over the rows in which column j has a value
+    with np.errstate(invalid='ignore', divide='ignore'): 
+        covariances = centered.T @ centered - sums * sums.T / counts
+        squares = (centered ** 2).T @ weights - sums ** 2 / counts
+        correlations = covariances / np.sqrt(squares * squares.T)
+    return np.clip(correlations, -1.0, 1.0), counts
+
+# @returns p-values of correlations @param coefficients over @param counts rows (numpy arrays), 
+# from the t distribution as stats.pearsonr and stats.spearmanr compute them
+def _correlation_p_values(coefficients, counts): 
+    dof = counts - 2
+    with np.errstate(invalid='ignore', divide='ignore'): 
+        t = coefficients * np.sqrt(dof / ((1.0 - coefficients) * (1.0 + coefficients)))
+    return 2 * stats.t.sf(np.abs(t), dof)
+
+__p_value_corrections__ = ['bonferroni', 'holm', 'fdr_bh']
+
+# @returns @param p_values (numpy array) adjusted for testing all of them, with @param method one of 
+# 'bonferroni', 'holm' (step-down Bonferroni) or 'fdr_bh' (Benjamini-Hochberg false discovery rate). 
+# NaN p-values are left out (and stay NaN).
+def adjust_p_values(p_values, method: str): 
+    if method not in __p_value_corrections__: 
+        raise ValueError(f"Unknown multiple comparison correction: {method}. Use one of {__p_value_corrections__}")
+
+    adjusted = np.full(len(p_values), np.nan)
+    valid = np.flatnonzero(~np.isnan(p_values))
+    m = len(valid)
+    order = valid[np.argsort(p_values[valid], kind='stable')]
+    sorted_p = p_values[order]
+    if method == 'bonferroni': 
+        adjusted[order] = sorted_p * m
+    elif method == 'holm': 
+        adjusted[order] = np.maximum.accumulate(sorted_p * (m - np.arange(m)))
+    else: 
+        adjusted[order] = np.minimum.accumulate((sorted_p * m / np.arange(1, m + 1))[::-1])[::-1]
+
+    return np.minimum(adjusted, 1.0)
+
+# Correlations of every pair of @param var_names (interval, ratio or ordinal variables), 
+# for screening many variables without synthesizing tests for each pair. 
+# Normality is checked once per variable, and each pair is tested with Pearson's r if both variables 
+# are continuous and normal (as pearson_corr requires in the solver), and with Spearman's rho otherwise. 
+# @param correction adjusts the p-values for the number of pairs (see adjust_p_values), None for no adjustment
+# @returns CorrelationMatrix
+def correlation_matrix(dataset: Dataset, var_names: list, alpha: float, correction: str=None): 
+    if correction is not None and correction not in __p_value_corrections__: 
+        raise ValueError(f"Unknown multiple comparison correction: {correction}. Use one of {__p_value_corrections__}")
+    if len(set(var_names)) != len(var_names): 
+        raise ValueError(f"Variables to correlate are not unique: {var_names}")
+
+    vars = []
+    for var_name in var_names: 
+        var = dataset.get_variable(var_name)
+        if var is None: 
+            raise ValueError(f"Unknown variable: {var_name}")
+        if not (is_numeric(var.dtype) or is_ordinal(var.dtype)): 
+            raise ValueError(f"Can only correlate interval, ratio or ordinal variables: {var_name}")
+        vars.append(var)
+    num_vars = len(vars)
+
+    normality = {}
+    for var in vars: 
+        if not is_numeric(var.dtype): 
+            normality[var.name] = None
+        elif dataset.streaming: 
+            normality[var.name] = compute_normal_distribution_from_moments(dataset.group_moments(var.name), 0)
+        else: 
+            normality[var.name] = compute_normal_distribution(dataset.data[var.name])
+    normal = np.array([normality[var.name] is not None and normality[var.name][1] > alpha for var in vars])
+    pearson = normal[:, None] & normal[None, :]
+    spearman = ~pearson & ~np.eye(num_vars, dtype=bool)
+
+    if dataset.streaming: 
+        if spearman.any(): 
+            raise FullDataRequired("Spearman correlations (of ordinal or non-normal variables) need the ranks of the full data")
+        coefficients = np.eye(num_vars)
+        counts = np.diag([dataset.group_moments(var.name).counts[0] for var in vars]).astype(np.float64)
+        for i, j in zip(*np.triu_indices(num_vars, k=1)): 
+            co_moments = dataset.co_moments(vars[i].name, vars[j].name)
+            coefficients[i, j] = coefficients[j, i] = co_moments.correlation()
+            counts[i, j] = counts[j, i] = co_moments.count
+    else: 
+        # Ordinal variables are only ever ranked
+        values = np.column_stack([dataset.data[var.name].to_numpy(dtype=np.float64, na_value=np.nan) if is_numeric(var.dtype) else dataset.ranks(var.name).ranks for var in vars])
+        coefficients, counts = _pairwise_correlations(values)
+        if spearman.any(): 
+            ranks = np.column_stack([dataset.ranks(var.name).ranks for var in vars]) # shared with spearman_corr
+            coefficients = np.where(pearson, coefficients, _pairwise_correlations(ranks)[0])
+            # A column is ranked over all of its values, so pairs with missing values are ranked again over the rows both have
+            missing = np.isnan(ranks).any(axis=0)
+            for i, j in zip(*np.nonzero(np.triu(spearman) & (missing[:, None] | missing[None, :]))): 
+                both = ~np.isnan(ranks[:, i]) & ~np.isnan(ranks[:, j])
+                coefficients[i, j] = coefficients[j, i] = np.corrcoef(stats.rankdata(ranks[both, i]), stats.rankdata(ranks[both, j]))[0, 1]
+
+    np.fill_diagonal(coefficients, 1.0)
+    p_values = _correlation_p_values(coefficients, counts)
+    np.fill_diagonal(p_values, np.nan)
+    adjusted_p_values = p_values.copy()
+    if correction is not None: 
+        upper = np.triu_indices(num_vars, k=1)
+        adjusted_p_values[upper] = adjust_p_values(p_values[upper], correction)
+        adjusted_p_values[upper[1], upper[0]] = adjusted_p_values[upper]
+    tests = np.where(pearson, 'pearson_corr', 'spearman_corr').astype(object)
+    np.fill_diagonal(tests, None)
+
+    def labeled(matrix): 
+        return pd.DataFrame(matrix, index=list(var_names), columns=list(var_names))
+
+    return CorrelationMatrix(list(var_names), labeled(tests), labeled(coefficients), labeled(p_values), labeled(adjusted_p_values), 
+                             labeled(counts.astype(np.int64)), normality, correction, alpha)
+
+# @returns p-values of Levene's test (centered on the medians, as stats.levene) of each column of @param blocks 
+# (numpy arrays with the rows of each group), as compute_eq_variance computes them one column at a time
+def _column_levene(blocks): 
+    blocks = [block for block in blocks if len(block)]
+    deviations = [np.abs(block - np.median(block, axis=0)) for block in blocks]
+    counts = np.array([len(block) for block in blocks])[:, None]
+    means = np.stack([d.mean(axis=0) for d in deviations])
+    grand_mean = (counts * means).sum(axis=0) / counts.sum()
+    between_ss = (counts * (means - grand_mean) ** 2).sum(axis=0)
+    within_ss = sum(((d - m) ** 2).sum(axis=0) for d, m in zip(deviations, means))
+    between_df = len(blocks) - 1
+    within_df = counts.sum() - len(blocks)
+    with np.errstate(invalid='ignore', divide='ignore'): 
+        w = (between_ss / between_df) / (within_ss / within_df)
+    return stats.f.sf(w, between_df, within_df)
+
+__outcome_tests__ = ['students_t', 'welchs_t', 'mannwhitney_u', 'chi_square', 'fishers_exact', 'f_test', 'factorial_ANOVA', 'kruskall_wallis'] # in the order they are reported
+
+# Tests of the (independent) groups of the categorical variable @param x_name against each of @param y_names 
+# (interval, ratio or ordinal outcomes), for screening many outcomes without synthesizing tests for each. 
+# The rows are split into groups once, and the assumptions and test statistics of all outcomes are computed 
+# at once, column by column. Each outcome gets the tests the solver selects for a single outcome: 
+#   - students_t (two groups), f_test and factorial_ANOVA (which is the same with one factor) if the groups are 
+#     normal (Shapiro-Wilk) and of equal variance (Levene)
+#   - welchs_t (two groups) if the groups are normal
+#   - mannwhitney_u (two groups)
+#   - kruskall_wallis (continuous outcomes)
+#   - chi_square (if every count is at least 5) and fishers_exact (2 x 2 tables) of the contingency tables 
+#     of ordinal outcomes, which are categorical too. These are computed one (small) table at a time.
+# There are no predictions, so t statistics compare the first category to the second (in declared order) 
+# and p-values are two-sided. 
+# @param correction adjusts the p-values of each test for the number of outcomes it is run on 
+# (see adjust_p_values), None for no adjustment
+# @returns pandas DataFrame with a row for each outcome and test, in the order of @param y_names 
+# (and a row without a test for an outcome that no test applies to)
+def compare_outcomes(dataset: Dataset, x_name: str, y_names: list, alpha: float, correction: str=None): 
+    if correction is not None and correction not in __p_value_corrections__: 
+        raise ValueError(f"Unknown multiple comparison correction: {correction}. Use one of {__p_value_corrections__}")
+    if len(set(y_names)) != len(y_names): 
+        raise ValueError(f"Outcomes are not unique: {y_names}")
+    x = dataset.get_variable(x_name)
+    if x is None or not (is_nominal(x.dtype) or is_ordinal(x.dtype)): 
+        raise ValueError(f"Can only compare the groups of a nominal or ordinal variable: {x_name}")
+    ys = []
+    for y_name in y_names: 
+        y = dataset.get_variable(y_name)
+        if y is None or not (is_numeric(y.dtype) or is_ordinal(y.dtype)) or y_name == x_name: 
+            raise ValueError(f"Can only compare interval, ratio or ordinal outcomes: {y_name}")
+        ys.append(y)
+
+    index = dataset.group_index(x_name)
+    num_groups = len(index.categories)
+    if num_groups < 2: 
+        raise ValueError(f"Comparing outcomes needs at least two categories: {index.categories}")
+    continuous = np.array([is_numeric(y.dtype) for y in ys])
+    two_groups = num_groups == 2
+
+    # Ordinal outcomes are only ranked, by the position of their categories
+    def column(y): 
+        if is_numeric(y.dtype): 
+            return dataset.data[y.name].to_numpy(dtype=np.float64, na_value=np.nan)
+        codes = dataset.group_index(y.name).codes
+        return np.where(codes >= 0, codes, np.nan)
+
+    # Rows in order of their group (leaving out rows in no group), the rows of group g are values[offsets[g]:offsets[g+1]]
+    values = np.column_stack([column(y) for y in ys])[index.order[index.offsets[0]:]]
+    offsets = index.offsets - index.offsets[0]
+    blocks = [values[offsets[g]:offsets[g + 1]] for g in range(num_groups)]
+
+    # Group statistics of the non-missing values, one row per group
+    counts = np.stack([np.count_nonzero(~np.isnan(block), axis=0) for block in blocks]).astype(np.float64)
+    sums = np.stack([np.nansum(block, axis=0) for block in blocks])
+    with np.errstate(invalid='ignore', divide='ignore'): 
+        means = sums / counts
+        sums_of_squares = np.stack([np.nansum((block - mean) ** 2, axis=0) for block, mean in zip(blocks, means)])
+        stdevs = np.sqrt(sums_of_squares / (counts - 1))
+
+    # Assumptions, as has_groups_normal_distribution and has_equal_variance check them 
+    # (on the groups as selected, so a missing value makes the p-values NaN). 
+    # A NaN p-value (e.g., a group with fewer than 3 values) counts as not normal and not of equal variance.
+    normality_p_values = np.full(len(ys), np.nan) # lowest p-value of the groups
+    levene_p_values = np.full(len(ys), np.nan)
+    if continuous.any(): 
+        lowest = np.full(np.count_nonzero(continuous), np.inf)
+        for block in blocks: 
+            # np.minimum rather than np.fmin, so that a NaN p-value of any group is kept
+            lowest = np.minimum(lowest, stats.shapiro(block[:, continuous], axis=0).pvalue if len(block) >= 3 else np.nan)
+        normality_p_values[continuous] = lowest
+        levene_p_values[continuous] = _column_levene([block[:, continuous] for block in blocks])
+    groups_normal = continuous & (normality_p_values > alpha)
+    equal_variance = continuous & (levene_p_values > alpha)
+
+    # Rank sums of the groups, for the rank-based tests (ranks are cached per outcome, see Dataset.ranks)
+    rank_data = [dataset.ranks(y.name, x_name) for y in ys]
+    rank_sums = np.stack([r.rank_sums for r in rank_data], axis=1)
+    tie_term = np.array([r.tie_term for r in rank_data])
+
+    results = {} # test -> (outcomes it applies to, statistics, p-values, dofs)
+    if two_groups: 
+        t, p = stats.ttest_ind_from_stats(means[0], stdevs[0], counts[0], means[1], stdevs[1], counts[1], equal_var=True)
+        results['students_t'] = (groups_normal & equal_variance, t, p, counts[0] + counts[1] - 2)
+        t, p = stats.ttest_ind_from_stats(means[0], stdevs[0], counts[0], means[1], stdevs[1], counts[1], equal_var=False)
+        results['welchs_t'] = (groups_normal, t, p, np.minimum(counts[0], counts[1]) - 1)
+
+        # As mannwhitney_u: U of the first category, with the normal approximation (tie and continuity corrected)
+        n1, n2 = counts
+        n = n1 + n2
+        u = rank_sums[0] - n1 * (n1 + 1) / 2.0
+        with np.errstate(invalid='ignore', divide='ignore'): 
+            sigma = np.sqrt(n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1))))
+            z = (np.maximum(u, n1 * n2 - u) - n1 * n2 / 2 - 0.5) / sigma
+        p = np.minimum(2 * stats.norm.sf(z), 1.0)
+        # and the exact distribution for small samples without ties
+        for j in np.flatnonzero(((n1 <= 8) | (n2 <= 8)) & (tie_term == 0) & (n1 > 0) & (n2 > 0)): 
+            u[j], p[j] = stats.mannwhitneyu(blocks[0][:, j][~np.isnan(blocks[0][:, j])], blocks[1][:, j][~np.isnan(blocks[1][:, j])], alternative='two-sided')
+        results['mannwhitney_u'] = (np.ones(len(ys), dtype=bool), u, p, n1)
+
+    # As chi_square and fishers_exact
+    chi_square = (np.zeros(len(ys), dtype=bool), np.full(len(ys), np.nan), np.full(len(ys), np.nan), np.full(len(ys), np.nan))
+    fishers_exact = (np.zeros(len(ys), dtype=bool), np.full(len(ys), np.nan), np.full(len(ys), np.nan), np.full(len(ys), np.nan))
+    for j in np.flatnonzero(~continuous): 
+        contingency_table = dataset.contingency_table(x_name, y_names[j])
+        if min(contingency_table.shape) >= 2 and (contingency_table >= 5).all(): 
+            chi_square[0][j] = True
+            chi_square[1][j], chi_square[2][j] = stats.chi2_contingency(contingency_table, correction=False)[:2]
+        if contingency_table.shape == (2, 2): 
+            fishers_exact[0][j] = True
+            fishers_exact[1][j], fishers_exact[2][j] = stats.fisher_exact(contingency_table, alternative='two-sided')
+    results['chi_square'] = chi_square
+    results['fishers_exact'] = fishers_exact
+
+    # As f_test (see one_way_anova), leaving out groups without values
+    nonempty = counts > 0
+    num_nonempty = nonempty.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'): 
+        grand_mean = sums.sum(axis=0) / counts.sum(axis=0)
+        between_ss = np.where(nonempty, counts * (means - grand_mean) ** 2, 0.0).sum(axis=0)
+        between_df = num_nonempty - 1.0
+        within_df = counts.sum(axis=0) - num_nonempty
+        f = (between_ss / between_df) / (sums_of_squares.sum(axis=0) / within_df)
+    results['f_test'] = (groups_normal & equal_variance, f, stats.f.sf(f, between_df, within_df), between_df)
+    results['factorial_ANOVA'] = results['f_test']
+
+    # As kruskall_wallis, from the rank sums of the groups
+    n = counts.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'): 
+        h = 12.0 / (n * (n + 1)) * np.where(nonempty, rank_sums ** 2 / counts, 0.0).sum(axis=0) - 3 * (n + 1)
+        h /= 1 - tie_term / (n ** 3 - n)
+    results['kruskall_wallis'] = (continuous, h, stats.chi2.sf(h, num_nonempty - 1), counts[0])
+
+    tables = []
+    for test, (applies, statistics, p_values, dofs) in results.items(): 
+        adjusted_p_values = p_values[applies]
+        if correction is not None: 
+            adjusted_p_values = adjust_p_values(adjusted_p_values, correction)
+        tables.append(pd.DataFrame({
+            'outcome_order': np.flatnonzero(applies), 
+            'test_order': __outcome_tests__.index(test), 
+            'test': test, 
+            'test_statistic': statistics[applies], 
+            'p_value': p_values[applies], 
+            'adjusted_p_value': adjusted_p_values, 
+            'dof': dofs[applies]
+        }))
+    untested = np.flatnonzero(~np.any([applies for applies, _, _, _ in results.values()], axis=0))
+    tables.append(pd.DataFrame({'outcome_order': untested, 'test_order': len(__outcome_tests__), 'test': None}))
+
+    table = pd.concat(tables, ignore_index=True).sort_values(['outcome_order', 'test_order'], kind='stable', ignore_index=True)
+    outcomes = table['outcome_order'].to_numpy()
+    table.insert(0, 'outcome', np.asarray(y_names, dtype=object)[outcomes])
+    table['groups_normal'] = np.where(continuous[outcomes], groups_normal[outcomes], None)
+    table['equal_variance'] = np.where(continuous[outcomes], equal_variance[outcomes], None)
+    table['normality_p_value'] = normality_p_values[outcomes]
+    table['levene_p_value'] = levene_p_values[outcomes]
+    table['significant'] = table['adjusted_p_value'] < alpha
+
+    return table.drop(columns=['outcome_order', 'test_order'])
+
 def pointbiserial(dataset: Dataset, predictions, combined_data: CombinedData): 
     xs = combined_data.get_explanatory_variables()
     ys = combined_data.get_explained_variables()
@@ -627,7 +1070,7 @@ def pointbiserial(dataset: Dataset, predictions, combined_data: CombinedData):
     data = []
 
     for c in cat: 
-        cat_data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
+        cat_data = dataset.select_group(y.metadata[name], x.metadata[name], c)
         data.append(cat_data)
 
     if predictions: 
@@ -663,27 +1106,8 @@ def chi_square(dataset: Dataset, predictions, combined_data: CombinedData):
             x = xs[0]
             y = ys[0]
 
-            # Get the count for each category
-            x_cat = [k for k,v in x.metadata[categories].items()]
-            y_cat = [k for k,v in y.metadata[categories].items()]
-
-            contingency_table = []
-            contingency_table_key = [] # labels for the order in which data is stored in data array (define above)
-
-            for xc in x_cat: 
-                table_row = []
-                table_row_key = []
-                for yc in y_cat: 
-                    data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{xc}'", f"{y.metadata[name]} == '{yc}'"])
-                    table_row.append(len(data))
-
-                    x_y_key = str(x.metadata[name]) + ':' + str(xc) + ' by ' + str(y.metadata[name]) + ':' + str(yc)
-                    table_row_key.append(x_y_key)
-                
-                assert(len(table_row_key) == len(table_row))
-                assert(len(table_row) == len(y_cat))
-                contingency_table.append(table_row)
-                contingency_table_key.append(table_row_key)
+            # Get the count for each (x, y) pair of categories
+            contingency_table = dataset.contingency_table(x.metadata[name], y.metadata[name])
             
         else: 
             raise ValueError(f"Currently, chi square requires/only supports 1 explained variable, instead received: {len(ys)} -- {ys}")    
@@ -731,27 +1155,8 @@ def fishers_exact(dataset: Dataset, predictions, combined_data: CombinedData):
     x = xs[0]
     y = ys[0]
 
-    # Get the count for each category
-    x_cat = [k for k,v in x.metadata[categories].items()]
-    y_cat = [k for k,v in y.metadata[categories].items()]
-
-    contingency_table = []
-    contingency_table_key = [] # labels for the order in which data is stored in data array (define above)
-
-    for xc in x_cat: 
-        table_row = []
-        table_row_key = []
-        for yc in y_cat: 
-            data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{xc}'", f"{y.metadata[name]} == '{yc}'"])
-            table_row.append(len(data))
-
-            x_y_key = str(x.metadata[name]) + ':' + str(xc) + ' by ' + str(y.metadata[name]) + ':' + str(yc)
-            table_row_key.append(x_y_key)
-        
-        assert(len(table_row_key) == len(table_row))
-        assert(len(table_row) == len(y_cat))
-        contingency_table.append(table_row)
-        contingency_table_key.append(table_row_key)
+    # Get the count for each (x, y) pair of categories
+    contingency_table = dataset.contingency_table(x.metadata[name], y.metadata[name])
 
     # odds_ratio, p_value = stats.fisher_exact(contingency_table, alternative='two-sided')
     # return FishersResult(odds_ratio, p_value)
@@ -787,8 +1192,12 @@ def f_test(dataset: Dataset, predictions, combined_data: CombinedData):
     x = xs[0]
     y = ys[0]
     
-    formula = ols(f"{y.metadata[name]} ~ C({x.metadata[name]})", data=dataset.data)
-    model =formula.fit()
+    # One-way ANOVA table (as statsmodels' anova_lm would compute it) from the per-group sums of squares
+    group_stats = dataset.group_statistics(y.metadata[name], x.metadata[name])
+    between_ss, within_ss, between_df, within_df = one_way_anova(group_stats)
+    between_ms = between_ss / between_df
+    within_ms = within_ss / within_df
+    f_stat = between_ms / within_ms
     
 
     if predictions:
@@ -798,7 +1207,13 @@ def f_test(dataset: Dataset, predictions, combined_data: CombinedData):
             prediction = predictions[0]
     else: 
         prediction = None
-    result_df = sm.stats.anova_lm(model, type=2)
+    result_df = pd.DataFrame({
+                    'df': [between_df, within_df],
+                    'sum_sq': [between_ss, within_ss],
+                    'mean_sq': [between_ms, within_ms],
+                    'F': [f_stat, np.nan],
+                    'PR(>F)': [stats.f.sf(f_stat, between_df, within_df), np.nan]
+                }, index=[f"C({x.metadata[name]})", 'Residual'])
     # Need to inspect the result_df and return the appropriate test_statistic/p_value pair based on the prediction
     col_name = "C(" + x.metadata[name] + ")"
     for row_name in result_df.index: 
@@ -824,51 +1239,17 @@ def f_test(dataset: Dataset, predictions, combined_data: CombinedData):
 
 # Private function to prevent duplicate symmetric interactions
 # (e.g., ''A*B' is the same as 'B*A', both should not occur in ANOVA formula twice)
-def _is_interaction_unique(interactions, inter):
-    for existing_inter in interactions: 
-        variables = inter.split('*')
-        # Check if the varibles in inter already exist in another interaction
-        exists = [(v in existing_inter) for v in variables]
-        # If all of the variables in inter already exist, this means 
-        # the interaction is not unique!
-        return not all(exists)
-        
 def factorial_ANOVA(dataset: Dataset, predictions, combined_data: CombinedData): 
-
-    # Construct formula
     xs = combined_data.get_explanatory_variables()
     ys = combined_data.get_explained_variables()
     assert(len(ys) == 1)
 
     y = ys[0]
-    
-    formula = f"{y.metadata[name]} ~ "
-
-    for i in range(len(xs)): 
-        x = xs[i]
-        formula += f"C({x.metadata[name]})"
+    x = xs[-1]
 
-        if i < len(xs) - 1: 
-            formula += " + "
-    
-    
-    # Add the interactions
-    interactions = []
-    for i in range(len(xs)): 
-        x_i = xs[i]
-        inter = f"C({x_i.metadata[name]})" 
-        for j in range(len(xs)):
-            if i != j: 
-                x_j = xs[j]
-                inter += " * " + f"C({x_j.metadata[name]})"
-                interactions.append(inter)
-                
-                if _is_interaction_unique(interactions, inter):
-                    formula += " + " +  inter
-
-    ols_formula = ols(formula, data=dataset.data)
-    model = ols_formula.fit()
-    result_df = sm.stats.anova_lm(model, type=2)
+    # Full factorial model: all main effects and interactions of xs
+    cells = dataset.cell_statistics(y.metadata[name], [v.metadata[name] for v in xs])
+    result_df = type2_anova(cells)
     if predictions:
         if isinstance(predictions[0], list): 
             prediction = predictions[0][0]
@@ -899,7 +1280,6 @@ def factorial_ANOVA(dataset: Dataset, predictions, combined_data: CombinedData):
     return test_result
 
 def rm_one_way_anova(dataset: Dataset, predictions, design, combined_data: CombinedData): 
-    data = dataset.data
     xs = combined_data.get_explanatory_variables()
     ys = combined_data.get_explained_variables()
 
@@ -921,11 +1301,25 @@ def rm_one_way_anova(dataset: Dataset, predictions, design, combined_data: Combi
     else: 
         prediction = None
 
-    key = dataset.pid_col_name
-    aovrm2way = AnovaRM(data, depvar=y.metadata[name], subject=key, within=within_subjs, aggregate_func='mean')
-    # aovrm2way = AnovaRM(data, depvar=y.metadata[name], subject=dataset.pid_col_name, within=within_subjs, between=between_subjs) # apparently not implemented in statsmodels
-    res2way = aovrm2way.fit()
-    result_df = res2way.anova_table
+    if len(within_subjs) != 1: 
+        raise ValueError(f"Repeated measures one way ANOVA needs one within subjects variable: {within_subjs}")
+    # Same table as statsmodels' AnovaRM(aggregate_func='mean') computes, from the subject x condition matrix
+    # (between subjects variables are not implemented in AnovaRM either)
+    values = dataset.subject_pivot(y.metadata[name], within_subjs[0]).complete()
+    num_subjects, num_conditions = values.shape
+    grand_mean = values.mean()
+    condition_ss = num_subjects * ((values.mean(axis=0) - grand_mean) ** 2).sum()
+    residuals = values - values.mean(axis=1, keepdims=True) - values.mean(axis=0, keepdims=True) + grand_mean
+    error_ss = (residuals ** 2).sum()
+    num_df = float(num_conditions - 1)
+    den_df = float((num_conditions - 1) * (num_subjects - 1))
+    f_stat = (condition_ss / num_df) / (error_ss / den_df)
+    result_df = pd.DataFrame({
+                    'F Value': [f_stat],
+                    'Num DF': [num_df],
+                    'Den DF': [den_df],
+                    'Pr > F': [stats.f.sf(f_stat, num_df, den_df)]
+                }, index=[within_subjs[0]])
 
     col_name = x.metadata[name]
     for row_name in result_df.index: 
@@ -955,15 +1349,6 @@ def kruskall_wallis(dataset: Dataset, predictions, combined_data: CombinedData):
     assert (len(ys) == 1)
     y = ys[0]
 
-    data = []
-    for x in xs: 
-        if x.metadata[categories] is None: 
-            raise ValueError('')
-        cat = [k for k,v in x.metadata[categories].items()]
-        for c in cat: 
-            cat_data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
-            data.append(cat_data)
-    
     if predictions: 
         if isinstance(predictions[0], list): 
             prediction = predictions[0][0]
@@ -971,8 +1356,30 @@ def kruskall_wallis(dataset: Dataset, predictions, combined_data: CombinedData):
             prediction = predictions[0]
     else: 
         prediction = None
-    t_stat, p_val = stats.kruskal(*data)
-    dof = len(data[0]) # TODO This might not be correct
+
+    if len(xs) == 1: 
+        x = xs[0]
+        if x.metadata[categories] is None: 
+            raise ValueError('')
+        # H from the rank sums of the groups, as stats.kruskal computes it
+        ranks = dataset.ranks(y.metadata[name], x.metadata[name])
+        nonempty = ranks.counts > 0
+        n = ranks.count()
+        t_stat = 12.0 / (n * (n + 1)) * (ranks.rank_sums[nonempty] ** 2 / ranks.counts[nonempty]).sum() - 3 * (n + 1)
+        t_stat /= 1 - ranks.tie_term / (n ** 3 - n)
+        p_val = stats.chi2.sf(t_stat, np.count_nonzero(nonempty) - 1)
+        dof = ranks.counts[0] # TODO This might not be correct
+    else: 
+        data = []
+        for x in xs: 
+            if x.metadata[categories] is None: 
+                raise ValueError('')
+            cat = [k for k,v in x.metadata[categories].items()]
+            for c in cat: 
+                cat_data = dataset.select_group(y.metadata[name], x.metadata[name], c)
+                data.append(cat_data)
+        t_stat, p_val = stats.kruskal(*data)
+        dof = len(data[0]) # TODO This might not be correct
     test_result = TestResult( 
                         name = kruskall_wallis_name,
                         test_statistic = t_stat,
@@ -991,17 +1398,25 @@ def kruskall_wallis(dataset: Dataset, predictions, combined_data: CombinedData):
 def friedman(dataset: Dataset, predictions, combined_data: CombinedData): 
     xs = combined_data.get_explanatory_variables()
     ys = combined_data.get_explained_variables()
+    assert (len(xs) == 1)
     assert (len(ys) == 1)
+    x = xs[0]
     y = ys[0]
 
-    data = []
-    for x in xs: 
-        cat = [k for k,v in x.metadata[categories].items()]
-        for c in cat: 
-            cat_data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
-            data.append(cat_data)
-    
-    # return stats.friedmanchisquare(*data)
+    # Same statistic as stats.friedmanchisquare on the conditions, from the subject x condition matrix, 
+    # so that the values of a subject are paired by key rather than by position
+    values = dataset.subject_pivot(y.metadata[name], x.metadata[name]).complete()
+    num_subjects, num_conditions = values.shape
+    if num_conditions < 3: 
+        raise ValueError(f"Friedman test needs at least 3 conditions: {num_conditions}")
+    # Mid-ranks within each subject, and the number of values tied with each value
+    lowest = stats.rankdata(values, method='min', axis=1)
+    highest = stats.rankdata(values, method='max', axis=1)
+    rank_sums = ((lowest + highest) / 2.0).sum(axis=0)
+    tie_term = ((highest - lowest + 1) ** 2 - 1).sum() # sum of t^3 - t over the groups of t tied values
+    test_statistic = 12.0 / (num_subjects * num_conditions * (num_conditions + 1)) * (rank_sums ** 2).sum() - 3 * num_subjects * (num_conditions + 1)
+    test_statistic /= 1 - tie_term / (num_subjects * num_conditions * (num_conditions ** 2 - 1))
+    p_val = stats.chi2.sf(test_statistic, num_conditions - 1)
 
     if predictions: 
         if isinstance(predictions[0], list): 
@@ -1010,8 +1425,7 @@ def friedman(dataset: Dataset, predictions, combined_data: CombinedData):
             prediction = predictions[0]
     else: 
         prediction = None
-    test_statistic, p_val = stats.friedmanchisquare(*data)
-    dof = len(data[0]) # TODO This might not be correct
+    dof = num_subjects # TODO This might not be correct
     test_result = TestResult( 
                         name = "Kruskall Wallis Test",
                         test_statistic = test_statistic,
@@ -1031,7 +1445,8 @@ def linear_regression(iv: VarData, dv: VarData, predictions: list, comp_data: Co
     return stats.linregress(iv.dataframe, dv.dataframe)
     
 # def bootstrap(data):
-def bootstrap(dataset: Dataset, predictions, combined_data: CombinedData):
+# @param options configure the resampling (see bootstrap.make_options), the defaults if None
+def bootstrap(dataset: Dataset, predictions, combined_data: CombinedData, options: dict=None):
     calculations = {}
 
     xs = combined_data.get_explanatory_variables()
@@ -1045,8 +1460,8 @@ def bootstrap(dataset: Dataset, predictions, combined_data: CombinedData):
         for x in xs: 
             cat = [k for k,v in x.metadata[categories].items()]
             for c in cat: 
-                cat_data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
-                stat = bs.bootstrap(cat_data.to_numpy(), stat_func=bs_stats.median)
+                cat_data = dataset.select_group(y.metadata[name], x.metadata[name], c)
+                stat = bs.bootstrap(cat_data.to_numpy(), stat_func=np.median, **(options or {}))
                 calculations[c] = stat
         
     if predictions: 
@@ -1102,24 +1517,16 @@ def cohens(dataset, predictions, combined_data: CombinedData):
     ys = combined_data.get_explained_variables()
     x = xs[0]
     y = ys[0]
-    cat = [k for k,v in x.metadata[categories].items()]
-    data = []
 
     pred = None
     if predictions:
         pred = predictions[0][0]
     
-    lhs = None
-    rhs = None
-    for c in cat: 
-        cat_data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
-        if c == pred.lhs.value:
-            lhs = cat_data
-        if c == pred.rhs.value:
-            rhs = cat_data
-        data.append(cat_data)
+    group_stats = dataset.group_statistics(y.metadata[name], x.metadata[name])
+    lhs = pred.lhs.value
+    rhs = pred.rhs.value
     
-    cohens_d = (mean(lhs) - mean(rhs)) / (sqrt((stdev(lhs) ** 2 + stdev(rhs) ** 2) / 2))
+    cohens_d = float(group_stats.mean(lhs) - group_stats.mean(rhs)) / (sqrt((group_stats.variance(lhs) + group_stats.variance(rhs)) / 2))
     return cohens_d
 
 def vda(dataset, predictions, combined_data: CombinedData): 
@@ -1127,33 +1534,19 @@ def vda(dataset, predictions, combined_data: CombinedData):
     ys = combined_data.get_explained_variables()
     x = xs[0]
     y = ys[0]
-    cat = [k for k,v in x.metadata[categories].items()]
-    data = []
 
     pred = None
     if predictions:
         pred = predictions[0][0]
     
-    lhs = None
-    rhs = None
-    for c in cat: 
-        cat_data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
-        if c == pred.lhs.value:
-            lhs = cat_data
-        if c == pred.rhs.value:
-            rhs = cat_data
-        data.append(cat_data)
-
-    
-    m = len(lhs)
-    n = len(rhs)
-    concat = lhs.append(rhs)
-    r = stats.rankdata(concat)
-    r1 = sum(r[range(0,m)])
-  
     # Compute the measure
     # A = (r1/m - (m+1)/2)/n # formula (14) in Vargha and Delaney, 2000
-    A = (2*r1 - m*(m+1)) / (2*n*m) # equivalent formula to avoid accuracy errors
+    # where r1 - m(m+1)/2 is the Mann-Whitney U statistic of lhs (pairs with lhs > rhs, with ties counting half), 
+    # so the ranks are shared with mannwhitney_u
+    lhs = pred.lhs.value
+    rhs = pred.rhs.value
+    ranks = dataset.ranks(y.metadata[name], x.metadata[name], [lhs, rhs])
+    A = ranks.a12(lhs, rhs)
     return A
 
 __stat_test_to_function__ = {
@@ -1200,9 +1593,12 @@ def add_effect_size(dataset, predictions, combined_data, test_func, stat_result)
         added_effect_size = True
     if test_func in parametric_tests or test_func in nonparametric_tests: 
         # Calculate A12
-        a12 = vda(dataset, predictions, combined_data)
-        stat_result.add_effect_size('A12', a12)
-        added_effect_size = True
+        try: 
+            a12 = vda(dataset, predictions, combined_data)
+            stat_result.add_effect_size('A12', a12)
+            added_effect_size = True
+        except FullDataRequired as e: 
+            log(f"\nA12 is not computed: {e}")
 
     if added_effect_size:
         stat_result.add_effect_size_to_interpretation()
@@ -1210,13 +1606,30 @@ def add_effect_size(dataset, predictions, combined_data, test_func, stat_result)
 def add_dof(dataset, predictions, combined_data, test_func, stat_result): 
     import pdb; pdb.set_trace()
 
-def execute_test(dataset, design, predictions, combined_data: CombinedData, test):         
+# Tests that StreamingDataset's summaries are enough for, all other tests need the full data
+__streaming_tests__ = ['students_t', 'welchs_t', 'f_test', 'chi_square', 'fishers_exact', 'pearson_corr']
+
+# @returns whether @param test (name) can run on @param dataset
+def can_execute(dataset, test): 
+    return not dataset.streaming or test in __streaming_tests__
+
+# @param bootstrap_options configure the bootstrap test (see bootstrap.make_options), the defaults if None
+def execute_test(dataset, design, predictions, combined_data: CombinedData, test, bootstrap_options: dict=None):         
+    with instrumentation.stage('execute_test', test=test, rows=dataset.num_rows()): 
+        return _execute_test(dataset, design, predictions, combined_data, test, bootstrap_options)
+
+def _execute_test(dataset, design, predictions, combined_data: CombinedData, test, bootstrap_options: dict=None):         
+    if not can_execute(dataset, test): 
+        raise FullDataRequired(f"{test} needs the full data, streaming mode can only run: {', '.join(__streaming_tests__)}")
+
     # Get function handler
     test_func = lookup_function(test)
 
     # Execute the statistical test
     if test_func is rm_one_way_anova: 
         stat_result = test_func(dataset, predictions, design, combined_data)
+    elif test_func is bootstrap: 
+        stat_result = test_func(dataset, predictions, combined_data, bootstrap_options)
     else:
         stat_result = test_func(dataset, predictions, combined_data)
 
@@ -1229,6 +1642,89 @@ def execute_test(dataset, design, predictions, combined_data: CombinedData, test
     # Return results
     return stat_result
 
+# Executes @param tests (names of tests), on @param executor (a concurrent.futures Executor) if given
+# @returns dict from test name to TestResult, in the order of @param tests
+# A test that raises is reported as a TestFailure (with the error and its traceback) and does not 
+# affect the other tests, whether or not the tests run on an executor. Errors are no longer raised 
+# from execute_tests; look for TestFailures in the results instead.
+def execute_tests(dataset, design, predictions, combined_data: CombinedData, tests: list, executor=None, bootstrap_options: dict=None): 
+    if executor is None: 
+        results = {}
+        for test in tests: 
+            try: 
+                results[test] = execute_test(dataset, design, predictions, combined_data, test, bootstrap_options)
+            except Exception as e: 
+                results[test] = _test_failure(test, e)
+        return results
+
+    if isinstance(executor, ProcessPoolExecutor): 
+        return _execute_tests_in_processes(dataset, design, predictions, combined_data, tests, executor, bootstrap_options)
+
+    futures = [executor.submit(execute_test, dataset, design, predictions, combined_data, test, bootstrap_options) for test in tests]
+    results = {}
+    for test, future in zip(tests, futures): 
+        try: 
+            results[test] = future.result()
+        except Exception as e: 
+            results[test] = _test_failure(test, e)
+    return results
+
+# Worker processes load the dataset from its file through their own dataset_cache, rather than 
+# being sent the (pickled) Dataset with every test, so that it is read once per worker and the 
+# group indexes, ranks, etc. computed for one test are reused by the next ones. 
+# Instrumentation events of the workers are sent back and passed to the hooks of this process.
+def _execute_tests_in_processes(dataset, design, predictions, combined_data: CombinedData, tests: list, executor, bootstrap_options: dict): 
+    source = _dataset_source(dataset)
+    instrumented = instrumentation.enabled()
+    futures = [executor.submit(_execute_test_in_worker, source, design, predictions, combined_data, test, bootstrap_options, instrumented) for test in tests]
+    results = {}
+    for test, future in zip(tests, futures): 
+        try: 
+            result, error, formatted, events = future.result()
+        except Exception as e: # e.g., the worker died
+            results[test] = _test_failure(test, e)
+            continue
+
+        for event in events: 
+            instrumentation._emit(event)
+        if error is None: 
+            results[test] = result
+        else: 
+            log(f"\n{test} failed: {error!r}")
+            results[test] = TestFailure(test, error, formatted)
+    return results
+
+# @returns arguments of dataset_cache.get that load @param dataset, or @param dataset itself 
+# if it was not loaded from a file
+def _dataset_source(dataset): 
+    if not dataset.dfile: 
+        return dataset
+    chunksize = dataset.chunksize if isinstance(dataset, StreamingDataset) else None
+    return (dataset.dfile, dataset.variables, dataset.pid_col_name, dataset.float_dtype, chunksize)
+
+# Runs in a worker process
+# @returns result, error, formatted traceback of the error, and instrumentation events 
+# (if @param instrumented) of executing @param test
+def _execute_test_in_worker(source, design, predictions, combined_data: CombinedData, test, bootstrap_options: dict, instrumented: bool): 
+    collector = instrumentation.Collector()
+    if instrumented: 
+        instrumentation.add_hook(collector)
+    try: 
+        dataset = dataset_cache.get(*source) if isinstance(source, tuple) else source
+        result = execute_test(dataset, design, predictions, combined_data, test, bootstrap_options)
+    except Exception as e: 
+        return None, e, _format_exception(e), collector.events
+    finally: 
+        instrumentation.remove_hook(collector)
+    return result, None, None, collector.events
+
+def _test_failure(test, error: Exception): 
+    log(f"\n{test} failed: {error!r}")
+    return TestFailure(test, error, _format_exception(error))
+
+def _format_exception(error: Exception): 
+    return ''.join(traceback.format_exception(type(error), error, error.__traceback__))
+
 #
 # # Correct for multiple comparisons
 # def correct_multiple_comparison(res_data: ResultData, num_comparisons: int):
@@ -0,0 +1,30 @@
+import importlib
+
+# Stands in for a module that is only imported the first time one of its attributes is used.
+# Used for heavy dependencies (scipy, statsmodels, z3) so that importing tea and
+# declaring variables and the study design do not pay for them.
+class LazyModule(object):
+
+    def __init__(self, name: str):
+        self._lazy_name = name
+        self._lazy_module = None
+
+    def _load(self):
+        if self._lazy_module is None:
+            # import_module holds the import lock, so concurrent first uses import once
+            self._lazy_module = importlib.import_module(self._lazy_name)
+        return self._lazy_module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'imported' if self._lazy_module is not None else 'not imported'
+        return f"LazyModule({self._lazy_name}, {state})"
+
+# @returns LazyModule for the module @param name (e.g., 'scipy.stats')
+def lazy_import(name: str):
+    return LazyModule(name)
@@ -0,0 +1,131 @@
+from tea.global_vals import log
+
+import attr
+import contextlib
+import json
+import threading
+import time
+
+# Instrumentation of the runtime: how long each stage of an analysis takes (dataset load,
+# AST evaluation, z3 checks, property checks, test execution, result formatting) and counters
+# (e.g., cache hits). Events are passed to the registered hooks; nothing is recorded
+# while there are none.
+#
+# A hook is any callable that takes an Event, e.g., a Collector:
+#   with tea.instrumentation.collect() as collector:
+#       tea.hypothesize(['condition', 'score'], ['condition:b > a'])
+#   print(collector.to_json())
+
+@attr.s(init=True, frozen=True)
+class Event(object):
+    kind = attr.ib(type=str) # 'stage' or 'counter'
+    name = attr.ib(type=str) # e.g., 'execute_test' or 'dataset_cache.hit'
+    seconds = attr.ib(default=None) # duration of a stage
+    value = attr.ib(default=None) # increment of a counter
+    attributes = attr.ib(factory=dict) # e.g., {'test': 'students_t'}
+    thread = attr.ib(default=None) # name of the thread the event happened in
+
+    def to_dict(self):
+        return attr.asdict(self)
+
+# Hooks are replaced rather than modified, so events can be emitted while hooks are (un)registered
+__hooks__ = ()
+__hooks_lock__ = threading.Lock()
+
+# @param hook is called with every Event from now on (from the thread the event happened in)
+def add_hook(hook):
+    global __hooks__
+    with __hooks_lock__:
+        __hooks__ = __hooks__ + (hook,)
+
+def remove_hook(hook):
+    global __hooks__
+    with __hooks_lock__:
+        __hooks__ = tuple(h for h in __hooks__ if h != hook)
+
+def clear_hooks():
+    global __hooks__
+    with __hooks_lock__:
+        __hooks__ = ()
+
+def enabled():
+    return bool(__hooks__)
+
+# A hook that raises is logged and does not affect the analysis it observes (or hide its errors)
+def _emit(event: Event):
+    for hook in __hooks__:
+        try:
+            hook(event)
+        except Exception as e:
+            log(f"\nInstrumentation hook {hook!r} failed on {event.name}: {e!r}")
+
+# Times the body of the with statement as stage @param name with @param attributes.
+# Yields a dict of attributes that the body can add to (e.g., the number of rows loaded).
+@contextlib.contextmanager
+def stage(name: str, **attributes):
+    if not __hooks__:
+        yield attributes
+        return
+
+    start = time.perf_counter()
+    try:
+        yield attributes
+    finally:
+        _emit(Event('stage', name, seconds=time.perf_counter() - start, attributes=attributes, thread=threading.current_thread().name))
+
+# Adds @param value to counter @param name
+def count(name: str, value: int=1, **attributes):
+    if __hooks__:
+        _emit(Event('counter', name, value=value, attributes=attributes, thread=threading.current_thread().name))
+
+# Hook that keeps all events in memory, and summarizes them
+class Collector(object):
+
+    def __init__(self):
+        self.events = []
+        self._lock = threading.Lock()
+
+    def __call__(self, event: Event):
+        with self._lock:
+            self.events.append(event)
+
+    def clear(self):
+        with self._lock:
+            self.events = []
+
+    # @returns dict with, for each stage, the number of times it ran and the total and maximum
+    # seconds spent in it, and the total of each counter
+    def summary(self):
+        stages = {}
+        counters = {}
+        with self._lock:
+            events = list(self.events)
+
+        for event in events:
+            if event.kind == 'stage':
+                s = stages.setdefault(event.name, {'count': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+                s['count'] += 1
+                s['seconds'] += event.seconds
+                s['max_seconds'] = max(s['max_seconds'], event.seconds)
+            else:
+                counters[event.name] = counters.get(event.name, 0) + event.value
+
+        return {'stages': stages, 'counters': counters}
+
+    # @returns the summary and (if @param events) every event, as JSON
+    def to_json(self, events: bool=True, indent: int=None):
+        output = self.summary()
+        if events:
+            with self._lock:
+                output['events'] = [e.to_dict() for e in self.events]
+        return json.dumps(output, indent=indent, default=str)
+
+# Registers a new Collector for the duration of the with statement
+@contextlib.contextmanager
+def collect():
+    collector = Collector()
+    add_hook(collector)
+    try:
+        yield collector
+    finally:
+        remove_hook(collector)
@@ -0,0 +1,55 @@
+from tea.runtimeDataStructures.value import Value
+
+import attr
+import numpy as np
+import pandas as pd
+
+# Correlations of every pair of some variables (see relate_all), as matrices labeled by variable name.
+# Each pair is tested with Pearson's r if both variables are continuous and normally distributed,
+# and with Spearman's rho otherwise (the same rules test synthesis applies to a single pair).
+@attr.s(init=True, repr=False, str=False)
+class CorrelationMatrix(Value):
+    variables = attr.ib(type=list) # variable names, in the order they were given
+    tests = attr.ib() # pandas DataFrame with the test of each pair ('pearson_corr' or 'spearman_corr'), None on the diagonal
+    coefficients = attr.ib() # pandas DataFrames of floats, NaN on the diagonal of p_values
+    p_values = attr.ib()
+    adjusted_p_values = attr.ib() # p_values adjusted for the number of pairs (equal to p_values without correction)
+    counts = attr.ib() # pandas DataFrame with the number of rows in which both variables have values
+    normality = attr.ib(type=dict) # variable name -> NormalTest (W, p_value), None for ordinal variables
+    correction = attr.ib(type=str) # multiple comparison correction, None for none
+    alpha = attr.ib(type=float)
+
+    # @returns pandas DataFrame with one row per pair of variables,
+    # sorted by adjusted p-value (most significant first)
+    def pairs(self):
+        rows, cols = np.triu_indices(len(self.variables), k=1)
+        names = np.asarray(self.variables, dtype=object)
+        pairs = pd.DataFrame({
+            'x': names[rows],
+            'y': names[cols],
+            'test': self.tests.to_numpy()[rows, cols],
+            'coefficient': self.coefficients.to_numpy()[rows, cols],
+            'p_value': self.p_values.to_numpy()[rows, cols],
+            'adjusted_p_value': self.adjusted_p_values.to_numpy()[rows, cols],
+            'count': self.counts.to_numpy()[rows, cols]
+        })
+        pairs['significant'] = pairs['adjusted_p_value'] < self.alpha
+
+        return pairs.sort_values('adjusted_p_value', kind='stable', ignore_index=True)
+
+    def _pretty_print(self):
+        pairs = self.pairs()
+        significant = pairs[pairs['significant']]
+        output = f"\nCorrelations of {len(self.variables)} variables ({len(pairs)} pairs, "
+        output += f"{'no correction' if self.correction is None else self.correction + ' correction'}, alpha = {self.alpha}):\n"
+        output += f"{len(significant)} significant pairs\n"
+        if len(significant):
+            output += significant.drop(columns=['significant']).to_string(index=False) + "\n"
+
+        return output
+
+    def __repr__(self):
+        return self._pretty_print()
+
+    def __str__(self):
+        return self._pretty_print()
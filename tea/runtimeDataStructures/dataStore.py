@@ -0,0 +1,174 @@
+from tea.helpers.lazyImport import lazy_import
+requests = lazy_import('requests') # Only needed to download data
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from urllib.parse import urlparse
+
+CHUNK_SIZE = 2 ** 20 # bytes read and written at a time
+OBJECTS_DIR = 'sha256' # directory of the stored files, named by the SHA-256 of their content
+INDEX_FILE = 'index.json' # source (URL or local path) -> what was stored for it
+
+# Files downloaded or copied into a directory (~/.tea/data), stored by content:
+# each distinct content is stored once, as sha256/<hash><extension>, and <name> links to it.
+# Files are streamed in chunks of CHUNK_SIZE bytes, never held in memory.
+# The index remembers the hash stored for each source, so that:
+#   - an unchanged local file (same size and modification time) is not read again,
+#   - a URL is re-fetched with a conditional request (ETag, Last-Modified), and the server
+#     can answer that nothing changed,
+#   - a new download or copy whose content is already stored is discarded.
+class DataStore(object):
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self._lock = threading.Lock()
+
+    # Stores the file at @param source (URL or local path) as @param name
+    # @returns path of @param name in the store
+    def add(self, source: str, name: str):
+        os.makedirs(self.root / OBJECTS_DIR, exist_ok=True)
+        extension = os.path.splitext(name)[1]
+
+        if urlparse(str(source)).scheme not in ['', 'file']:
+            digest = self._download(str(source), extension)
+        else:
+            digest = self._copy(str(source), extension)
+
+        path = self.root / name
+        self._link(self.object_path(digest, extension), path)
+        return path
+
+    # @returns path of the stored file with @param digest
+    def object_path(self, digest: str, extension: str=''):
+        return self.root / OBJECTS_DIR / (digest + extension)
+
+    # @returns SHA-256 of the content of the local file at @param source, 
+    # without reading it again if it is unchanged (same size and modification time) since it was last hashed
+    def digest(self, source: str):
+        source, stat = self._local_path(source)
+        entry = self._index().get(source)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['sha256']
+
+        return self._hash(source, stat)
+
+    def _copy(self, source: str, extension: str):
+        source, stat = self._local_path(source)
+        entry = self._index().get(source)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns and os.path.exists(self.object_path(entry['sha256'], extension)):
+            return entry['sha256']
+
+        # Hash first, so that content that is already stored is not copied
+        digest = self._hash(source, stat)
+        if not os.path.exists(self.object_path(digest, extension)):
+            with open(source, 'rb') as f:
+                self._write(iter(lambda: f.read(CHUNK_SIZE), b''), digest, extension)
+
+        return digest
+
+    # @returns absolute path and os.stat of the local file at @param source (path or file: URL)
+    def _local_path(self, source: str):
+        source = str(source)
+        if urlparse(source).scheme == 'file':
+            source = urlparse(source).path
+        source = os.path.abspath(source)
+        return source, os.stat(source)
+
+    # Hashes the file at @param source and remembers the hash in the index
+    # @returns hash of the content
+    def _hash(self, source: str, stat):
+        sha256 = hashlib.sha256()
+        with open(source, 'rb') as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                sha256.update(chunk)
+        digest = sha256.hexdigest()
+
+        os.makedirs(self.root, exist_ok=True)
+        self._update_index(source, {'sha256': digest, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns})
+        return digest
+
+    def _download(self, url: str, extension: str):
+        entry = self._index().get(url)
+        headers = {}
+        if entry and os.path.exists(self.object_path(entry['sha256'], extension)):
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        with requests.get(url, headers=headers, stream=True) as response:
+            if response.status_code == 304: # Not Modified
+                return entry['sha256']
+            response.raise_for_status()
+
+            digest = self._write(response.iter_content(chunk_size=CHUNK_SIZE), None, extension)
+            self._update_index(url, {
+                'sha256': digest,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')
+            })
+        return digest
+
+    # Writes @param chunks to the store, hashing them on the way.
+    # If @param digest is known, it is checked against the content.
+    # @returns hash of the content
+    def _write(self, chunks, digest: str, extension: str):
+        sha256 = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.root / OBJECTS_DIR, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    sha256.update(chunk)
+                    f.write(chunk)
+
+            if digest is not None and sha256.hexdigest() != digest:
+                raise ValueError(f"Content changed while it was being stored: {digest}")
+            digest = sha256.hexdigest()
+
+            if os.path.exists(self.object_path(digest, extension)):
+                os.remove(tmp_path) # Already stored
+            else:
+                os.replace(tmp_path, self.object_path(digest, extension))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        return digest
+
+    # Points @param path at @param target, with a hard link if possible
+    def _link(self, target: Path, path: Path):
+        if os.path.exists(path) and os.path.samefile(target, path):
+            return
+
+        tmp_path = Path(str(path) + '.tmp')
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            os.link(target, tmp_path)
+        except OSError:
+            # e.g., the file system does not support hard links
+            shutil.copyfile(target, tmp_path)
+        os.replace(tmp_path, path)
+
+    def _index(self):
+        try:
+            with open(self.root / INDEX_FILE) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _update_index(self, source: str, entry: dict):
+        with self._lock:
+            index = self._index()
+            index[source] = entry
+
+            fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(index, f, indent=2)
+            os.replace(tmp_path, self.root / INDEX_FILE)
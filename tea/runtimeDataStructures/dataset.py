@@ -1,65 +1,481 @@
+from tea.ast import DataType
+
 import attr
+import numpy as np
 import pandas as pd
+from pandas.api.types import CategoricalDtype
 import os
-import csv
+import json
+import shutil
 from typing import Dict
 from pathlib import Path
-from urllib.parse import urlparse
-import requests
+from urllib.parse import quote, unquote
+from tea.runtimeDataStructures.dataStore import DataStore
 
 BASE_PATH = os.getcwd()
 
+# File extension -> format of columnar files. 
+# A directory is read as a NumPy column store: one <column>.npy file per column 
+# (see _write_npy_columns).
+__columnar_formats__ = {
+    '.parquet': 'parquet', 
+    '.pq': 'parquet', 
+    '.feather': 'feather', 
+    '.arrow': 'feather', 
+    '.ipc': 'feather'
+}
+# Format -> suffix of the files Dataset.convert writes
+__format_suffixes__ = {
+    'parquet': '.parquet', 
+    'feather': '.feather', 
+    'npy': '_npy'
+}
+NPY_COLUMNS_FILE = 'columns.json' # column names of a NumPy column store, in order
+
+# Raised when a computation needs every row of the data in memory, but only summaries of it 
+# are available (see streamingDataset.py)
+class FullDataRequired(Exception): 
+    pass
+
 def _dir_exists(path):
     return os.path.isdir(path) and os.path.exists(path)
 
+# @returns 'csv', 'parquet', 'feather' or 'npy', the format of the data at @param path
+def _data_format(path):
+    if os.path.isdir(path): 
+        return 'npy'
+    return __columnar_formats__.get(os.path.splitext(str(path))[1].lower(), 'csv')
+
+# pyarrow is optional, it is only needed for Parquet and Feather/Arrow files
+def _pyarrow(path):
+    try: 
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError: 
+        raise ImportError(f"Parquet and Feather/Arrow files need pyarrow (pip install pyarrow): {path}")
+    return pyarrow
+
+# @returns @param column as a categorical with text categories, as pandas parses categories from CSV
+def _text_categorical(column: pd.Series): 
+    if not isinstance(column.dtype, CategoricalDtype): 
+        column = column.astype('category')
+    categories = column.cat.categories
+    if not all(isinstance(c, str) for c in categories): 
+        column = column.cat.rename_categories([str(c) for c in categories])
+    return column
+
+def _tea_data_path(): 
+    tea_path = Path.home() / '.tea'
+    if not _dir_exists(tea_path):
+        os.mkdir(tea_path)
+    data_path = tea_path / 'data'
+    if not _dir_exists(data_path):
+        os.mkdir(data_path)
+    return data_path
+
+# @returns contents of the JSON file at @param path, None if it does not exist or cannot be parsed
+def _read_json(path): 
+    try: 
+        with open(path) as f: 
+            return json.load(f)
+    except (FileNotFoundError, ValueError): 
+        return None
+
+# @returns bytes held by the numpy arrays and pandas objects in @param value (e.g., a GroupIndex 
+# or a tuple of them), counting each array in @param seen (ids) only once
+def _nbytes(value, seen: set): 
+    if id(value) in seen: 
+        return 0
+    seen.add(id(value))
+    if isinstance(value, np.ndarray): 
+        return value.nbytes
+    if isinstance(value, (pd.Series, pd.DataFrame)): 
+        return int(np.sum(value.memory_usage(index=True, deep=True)))
+    if isinstance(value, (tuple, list)): 
+        return sum(_nbytes(v, seen) for v in value)
+    if attr.has(type(value)): 
+        return sum(_nbytes(getattr(value, a.name), seen) for a in attr.fields(type(value)))
+    return 0
+
+# @returns @param names that are in @param columns (all of them if @param columns is None), in order
+def _project(names: list, columns: set): 
+    return [n for n in names if columns is None or n in columns]
+
+# Reads @param columns (None for all) of a Parquet file. 
+# The file is memory-mapped and only the row groups of the projected columns are decoded.
+def _read_parquet(path, columns: set=None): 
+    pa = _pyarrow(path)
+    parquet_file = pa.parquet.ParquetFile(path, memory_map=True)
+    return parquet_file.read(columns=_project(parquet_file.schema_arrow.names, columns)).to_pandas()
+
+# Reads @param columns (None for all) of a Feather (version 2) / Arrow IPC file. 
+# The file is memory-mapped, so uncompressed columns that are not projected are never read.
+def _read_feather(path, columns: set=None): 
+    pa = _pyarrow(path)
+    with pa.memory_map(str(path)) as source: 
+        table = pa.ipc.open_file(source).read_all()
+        table = table.select(_project(table.column_names, columns))
+        return table.to_pandas()
+
+# @returns dict from each of @param columns (None for all) of a NumPy column store to its 
+# memory-mapped values, in column order
+def _npy_columns(path, columns: set=None): 
+    index = os.path.join(path, NPY_COLUMNS_FILE)
+    if os.path.exists(index): 
+        with open(index) as f: 
+            names = json.load(f)
+    else: 
+        names = sorted(unquote(f[:-len('.npy')]) for f in os.listdir(path) if f.endswith('.npy'))
+
+    data = {}
+    for name in _project(names, columns): 
+        # Plain ndarray view of the memory-mapped file, so that pandas does not propagate np.memmap
+        data[name] = np.asarray(np.load(os.path.join(path, quote(name, safe='') + '.npy'), mmap_mode='r'))
+    return data
+
+# Reads @param columns (None for all) of a NumPy column store. Each column is memory-mapped.
+def _read_npy_columns(path, columns: set=None): 
+    return pd.DataFrame(_npy_columns(path, columns), copy=False)
+
+# Writes @param data as a NumPy column store in directory @param path.
+# Numeric and boolean columns are stored as they are, other columns as fixed-width 
+# strings (missing values as empty strings) so that every column can be memory-mapped.
+def _write_npy_columns(data: pd.DataFrame, path): 
+    os.mkdir(path)
+    for name in data.columns: 
+        column = data[name]
+        if pd.api.types.is_numeric_dtype(column.dtype): 
+            values = column.to_numpy()
+        else: 
+            values = np.array(['' if pd.isna(v) else str(v) for v in column], dtype=str)
+        np.save(os.path.join(path, quote(str(name), safe='') + '.npy'), values)
+
+    with open(os.path.join(path, NPY_COLUMNS_FILE), 'w') as f: 
+        json.dump([str(name) for name in data.columns], f)
+
+# Rows of a Dataset grouped by the categories of one categorical variable.
+# Rows are (stably) sorted by category so that each group is a contiguous 
+# block: rows order[offsets[i]:offsets[i+1]] belong to categories[i].
+# Rows whose value is missing or not a declared category come first and belong to no group.
+@attr.s(init=True, repr=False)
+class GroupIndex(object): 
+    categories = attr.ib(type=list) # declared categories, in declared order
+    codes = attr.ib() # numpy array of category position per row, -1 for rows in no group
+    order = attr.ib() # numpy array of row positions sorted by group
+    offsets = attr.ib() # numpy array of len(categories) + 1 group boundaries into order
+    positions = attr.ib(type=dict) # category -> position in categories
+
+    @classmethod
+    def from_column(cls, column: pd.Series, categories: list):
+        if isinstance(column.dtype, CategoricalDtype) and list(column.cat.categories) == categories: 
+            codes = column.cat.codes.to_numpy()
+        else: 
+            codes = pd.Categorical(column, categories=categories).codes
+        
+        order = np.argsort(codes, kind='stable')
+        counts = np.bincount(codes[codes >= 0], minlength=len(categories))
+        offsets = np.concatenate([[0], np.cumsum(counts)]) + np.count_nonzero(codes < 0)
+        positions = {c: i for i, c in enumerate(categories)}
+
+        return cls(categories, codes, order, offsets, positions)
+    
+    def bounds(self, category): 
+        if category not in self.positions: 
+            raise ValueError(f"{category} is not one of the categories: {self.categories}")
+        i = self.positions[category]
+        return (self.offsets[i], self.offsets[i+1])
+
+# Sufficient statistics of a numeric column for each group (declared category) of a categorical
+# column, computed in one vectorized pass and shared by t-tests, ANOVA, effect sizes, and
+# descriptive statistics. Missing values of the numeric column are not counted.
+@attr.s(init=True, repr=False)
+class GroupStatistics(object): 
+    categories = attr.ib(type=list) # declared categories, in declared order
+    positions = attr.ib(type=dict) # category -> position in categories
+    counts = attr.ib() # numpy arrays with one entry per category
+    sums = attr.ib()
+    sums_of_squares = attr.ib() # sum of squared deviations from the group mean
+    mins = attr.ib()
+    maxs = attr.ib()
+    _codes = attr.ib() # category position of each non-missing value, None if only the summaries are known
+    _values = attr.ib() # non-missing values, None if only the summaries are known
+    _sorted = attr.ib(default=None) # non-missing values sorted within each group, computed lazily
+
+    @classmethod
+    def from_column(cls, column: pd.Series, index: GroupIndex): 
+        values = column.to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = (index.codes >= 0) & ~np.isnan(values)
+        codes = index.codes[valid]
+        values = values[valid]
+        num_groups = len(index.categories)
+
+        counts = np.bincount(codes, minlength=num_groups)
+        sums = np.bincount(codes, weights=values, minlength=num_groups)
+        with np.errstate(invalid='ignore', divide='ignore'): 
+            means = sums / counts
+        # Deviations from the group mean rather than raw squares to avoid cancellation
+        sums_of_squares = np.bincount(codes, weights=(values - means[codes]) ** 2, minlength=num_groups)
+        mins = np.full(num_groups, np.nan)
+        maxs = np.full(num_groups, np.nan)
+        np.fmin.at(mins, codes, values)
+        np.fmax.at(maxs, codes, values)
+
+        return cls(index.categories, index.positions, counts, sums, sums_of_squares, mins, maxs, codes, values)
+
+    def _position(self, category): 
+        if category not in self.positions: 
+            raise ValueError(f"{category} is not one of the categories: {self.categories}")
+        return self.positions[category]
+
+    def count(self, category): 
+        return int(self.counts[self._position(category)])
+
+    def mean(self, category): 
+        i = self._position(category)
+        return self.sums[i] / self.counts[i] if self.counts[i] else np.nan
+
+    # @returns variance of @param category with @param ddof delta degrees of freedom (sample variance by default)
+    def variance(self, category, ddof: int=1): 
+        i = self._position(category)
+        return self.sums_of_squares[i] / (self.counts[i] - ddof) if self.counts[i] > ddof else np.nan
+
+    def stdev(self, category, ddof: int=1): 
+        return np.sqrt(self.variance(category, ddof))
+
+    def min(self, category): 
+        return self.mins[self._position(category)]
+
+    def max(self, category): 
+        return self.maxs[self._position(category)]
+
+    # @returns numpy array of the values of @param category in ascending order
+    def sorted_values(self, category): 
+        if self._values is None: 
+            raise FullDataRequired(f"The values of {category} are not available, only their summaries")
+        if self._sorted is None: 
+            self._sorted = self._values[np.lexsort((self._values, self._codes))]
+        i = self._position(category)
+        start = self.counts[:i].sum()
+        return self._sorted[start:start + self.counts[i]]
+
+    def descriptive_statistics(self, category): 
+        return {
+            'mean': self.mean(category), 
+            'stdev': self.stdev(category)
+        }
+
+# Sufficient statistics of a numeric column for each cell (combination of categories) of some categorical 
+# columns, computed in one vectorized pass. Only cells with values are kept, and each factor's levels are the 
+# categories that occur in them (in declared order), like a model formula would see them. 
+# Rows with a missing value in any of the columns are left out.
+@attr.s(init=True, repr=False)
+class CellStatistics(object): 
+    factors = attr.ib(type=list) # names of the categorical columns
+    levels = attr.ib() # numpy array with one row per cell and the level (position in the factor's levels) of each factor
+    num_levels = attr.ib(type=list) # number of levels of each factor
+    counts = attr.ib() # numpy arrays with one entry per cell
+    means = attr.ib()
+    within_ss = attr.ib(type=float) # sum of squared deviations from the cell means
+
+    @classmethod
+    def from_column(cls, column: pd.Series, factors: list, indexes: list): 
+        values = column.to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = ~np.isnan(values)
+        for index in indexes: 
+            valid &= index.codes >= 0
+        values = values[valid]
+        codes = np.stack([index.codes[valid].astype(np.int64) for index in indexes], axis=1)
+
+        shape = [len(index.categories) for index in indexes]
+        cell_ids, first, cells = np.unique(np.ravel_multi_index(codes.T, shape), return_index=True, return_inverse=True)
+        counts = np.bincount(cells)
+        means = np.bincount(cells, weights=values) / counts
+        within_ss = float(((values - means[cells]) ** 2).sum())
+
+        levels = np.empty((len(cell_ids), len(indexes)), dtype=np.intp)
+        num_levels = []
+        for i in range(len(indexes)): 
+            observed, levels[:, i] = np.unique(codes[first, i], return_inverse=True)
+            num_levels.append(len(observed))
+
+        return cls(factors, levels, num_levels, counts, means, within_ss)
+
+    # @returns number of values
+    def count(self): 
+        return int(self.counts.sum())
+
+# Values of a numeric column for each subject (participant id) and condition (category of a within-subjects 
+# variable), built in one vectorized pass and shared by the repeated measures tests. Several values of a subject 
+# in a condition are averaged. Conditions are the categories that occur, in declared order.
+@attr.s(init=True, repr=False)
+class SubjectPivot(object): 
+    subjects = attr.ib() # numpy array of subject ids, in order of appearance
+    categories = attr.ib(type=list) # conditions
+    values = attr.ib() # numpy array with one row per subject and one column per condition, NaN for missing cells
+    counts = attr.ib() # numpy array with the number of values in each cell
+
+    @classmethod
+    def from_columns(cls, key: pd.Series, column: pd.Series, index: GroupIndex): 
+        values = column.to_numpy(dtype=np.float64, na_value=np.nan)
+        subject_codes, subjects = pd.factorize(key)
+        valid = (subject_codes >= 0) & (index.codes >= 0) & ~np.isnan(values)
+        present = np.flatnonzero(np.bincount(index.codes[valid], minlength=len(index.categories)))
+        positions = np.full(len(index.categories), -1, dtype=np.intp)
+        positions[present] = np.arange(len(present))
+
+        shape = (len(subjects), len(present))
+        cells = subject_codes[valid] * shape[1] + positions[index.codes[valid]]
+        counts = np.bincount(cells, minlength=shape[0] * shape[1]).reshape(shape)
+        sums = np.bincount(cells, weights=values[valid], minlength=shape[0] * shape[1]).reshape(shape)
+        with np.errstate(invalid='ignore', divide='ignore'): 
+            means = sums / counts
+
+        return cls(np.asarray(subjects), [index.categories[i] for i in present], means, counts)
+
+    # @returns values as a matrix without missing cells
+    # Raises ValueError listing the missing cells otherwise
+    def complete(self): 
+        missing = np.argwhere(self.counts == 0)
+        if len(missing): 
+            examples = ', '.join(f"{self.subjects[i]} in {self.categories[j]}" for i, j in missing[:5])
+            raise ValueError(f"{len(missing)} subject/condition cells have no values (e.g., {examples}), but repeated measures need every subject in every condition")
+        return self.values
+
+# Mid-ranks (ties get the mean of the ranks they span) of the non-missing values of a column, 
+# pooled over some groups (declared categories) of a categorical column, or over all rows. 
+# Computed with one sort and shared by the rank-based tests (Mann-Whitney U, Kruskal-Wallis, 
+# Spearman, Kendall) and the A12 effect size.
+@attr.s(init=True, repr=False)
+class RankData(object): 
+    categories = attr.ib(type=list) # groups that are ranked together, None for all rows
+    ranks = attr.ib() # numpy array with the rank of each row, NaN for rows that are not ranked
+    codes = attr.ib() # numpy array with the position in categories of each row, -1 for rows that are not ranked
+    counts = attr.ib() # numpy arrays with one entry per category (one entry in total if categories is None)
+    rank_sums = attr.ib()
+    tie_term = attr.ib(type=float) # sum of t^3 - t over the groups of t tied values, for tie corrections
+
+    # @param values is a numpy array of the values of each row, NaN for missing values
+    # @param codes is a numpy array of the group of each row, -1 for rows in no group
+    @classmethod
+    def from_values(cls, values, codes, categories: list): 
+        ranked = np.flatnonzero(~np.isnan(values) & (codes >= 0))
+        order = np.argsort(values[ranked], kind='stable')
+        sorted_values = values[ranked][order]
+        starts = np.flatnonzero(np.concatenate([[True], sorted_values[1:] != sorted_values[:-1]]))
+        sizes = np.diff(np.concatenate([starts, [len(sorted_values)]]))
+
+        ranks = np.full(len(values), np.nan)
+        ranks[ranked[order]] = np.repeat(starts + (sizes + 1) / 2.0, sizes)
+        codes = np.where(np.isnan(ranks), -1, codes)
+        num_groups = len(categories) if categories is not None else 1
+        counts = np.bincount(codes[ranked], minlength=num_groups)
+        rank_sums = np.bincount(codes[ranked], weights=ranks[ranked], minlength=num_groups)
+        tie_term = float((sizes.astype(np.float64) ** 3 - sizes).sum())
+
+        return cls(categories, ranks, codes, counts, rank_sums, tie_term)
+
+    def _position(self, category): 
+        if self.categories is None or category not in self.categories: 
+            raise ValueError(f"{category} is not one of the ranked categories: {self.categories}")
+        return self.categories.index(category)
+
+    # @returns number of ranked values
+    def count(self, category=None): 
+        return int(self.counts.sum()) if category is None else int(self.counts[self._position(category)])
+
+    def rank_sum(self, category): 
+        return self.rank_sums[self._position(category)]
+
+    # @returns Mann-Whitney U statistic of @param category against @param other (the other ranked group): 
+    # the number of pairs in which the value of @param category is greater, ties counting half
+    def u_statistic(self, category, other): 
+        assert(len(self.categories) == 2 and category != other)
+        n = self.count(category)
+        return self.rank_sum(category) - n * (n + 1) / 2.0
+
+    # @returns Vargha and Delaney's A12 of @param category against @param other, which is U / (n1 * n2)
+    def a12(self, category, other): 
+        return self.u_statistic(category, other) / (self.count(category) * self.count(other))
+
 @attr.s(hash=True)
 class Dataset(object): 
     dfile = attr.ib() # path name 
     variables = attr.ib() # list of Variable objects <-- TODO: may not need this in new implementation....
     pid_col_name = attr.ib() # name of column in pandas DataFrame that has participant ids
+    float_dtype = attr.ib(default='float64') # dtype used for INTERVAL and RATIO columns ('float64' or 'float32')
     row_pids = attr.ib(init=False) # list of unique participant ids
     data = attr.ib(init=False) # pandas DataFrame
+    # Lazily computed, see group_index and select_group
+    _group_indexes = attr.ib(init=False, factory=dict, repr=False, hash=False, cmp=False) # var name -> GroupIndex
+    _grouped_columns = attr.ib(init=False, factory=dict, repr=False, hash=False, cmp=False) # (group var name, col) -> column sorted by group
+    _contingency_tables = attr.ib(init=False, factory=dict, repr=False, hash=False, cmp=False) # (row var name, col var name) -> counts
+    _sorted_columns = attr.ib(init=False, factory=dict, repr=False, hash=False, cmp=False) # numeric col -> (col sorted by value, number of non-missing values)
+    _group_statistics = attr.ib(init=False, factory=dict, repr=False, hash=False, cmp=False) # (group var name, col) -> GroupStatistics
+    _ranks = attr.ib(init=False, factory=dict, repr=False, hash=False, cmp=False) # (col, group var name, categories) -> RankData
+    _cell_statistics = attr.ib(init=False, factory=dict, repr=False, hash=False, cmp=False) # (group var names, col) -> CellStatistics
+    _subject_pivots = attr.ib(init=False, factory=dict, repr=False, hash=False, cmp=False) # (key, within var name, col) -> SubjectPivot
+    streaming = False # all rows are in memory (see StreamingDataset)
     
+    # Downloads (URL) or copies (local file) @param path into ~/.tea/data as @param name. 
+    # Files are stored by content, so an identical file is not fetched or copied again (see dataStore.py).
+    # @returns path of the stored file
     @staticmethod
     def load(path, name):
-        home = Path.home()
-        tea_path = home / '.tea'
-        if not _dir_exists(tea_path):
-            os.mkdir(tea_path)
-        data_path = tea_path / 'data'
-        if not _dir_exists(data_path):
-            os.mkdir(data_path)
-        
-        url = urlparse(path)
         csv_name = name if '.csv' in name else str(name + '.csv')
-        csv_path = data_path / csv_name
+        return DataStore(_tea_data_path()).add(path, csv_name)
 
-        # URL
-        if url.scheme != '':
-            data = requests.get(path)
+    # Converts the CSV file at @param path to a columnar file of @param format
+    # ('parquet', 'feather' or 'npy'), stored as @param name (default: the name of the CSV file) 
+    # in ~/.tea/data. The conversion only happens once: a converted file is reused as long as 
+    # it was converted from the same content (SHA-256, see DataStore.digest), which it records 
+    # in a <converted file>.source.json file next to it.
+    # @returns path of the columnar file, to use in place of the CSV file
+    @staticmethod
+    def convert(path, format: str='parquet', name: str=None): 
+        if format not in __format_suffixes__: 
+            raise ValueError(f"Cannot convert to {format}, only to: {list(__format_suffixes__.keys())}")
+        if format != 'npy': 
+            _pyarrow(path)
 
-            with open(csv_path, 'w') as f:
-                writer = csv.writer(f)
-                reader = csv.reader(data.text.splitlines())
+        name = name if name else Path(path).stem
+        columnar_path = _tea_data_path() / (name + __format_suffixes__[format])
+        source_path = Path(str(columnar_path) + '.source.json')
+        source = {'sha256': DataStore(_tea_data_path()).digest(path)}
+        if os.path.exists(columnar_path) and _read_json(source_path) == source: 
+            return columnar_path
 
-                for row in reader:
-                    writer.writerow(row)
+        # Forget the old source first, so that an interrupted conversion is never reused
+        if os.path.exists(source_path): 
+            os.remove(source_path)
+        data = pd.read_csv(path)
+        # Write next to the destination first so that readers never see half a file
+        tmp_path = Path(str(columnar_path) + '.tmp')
+        if os.path.isdir(tmp_path): 
+            shutil.rmtree(tmp_path)
+        if format == 'npy': 
+            _write_npy_columns(data, tmp_path)
         else: 
-            with open(path, 'r') as readfile: 
-                reader = csv.reader(readfile)
-                with open(csv_path, 'w') as writefile:
-                    writer = csv.writer(writefile)
+            pa = _pyarrow(path)
+            table = pa.Table.from_pandas(data, preserve_index=False)
+            if format == 'parquet': 
+                pa.parquet.write_table(table, tmp_path)
+            else: 
+                # Uncompressed so that the columns can be memory-mapped
+                pa.feather.write_feather(table, tmp_path, compression='uncompressed')
 
-                    for row in reader:
-                        writer.writerow(row)
+        if os.path.isdir(columnar_path): 
+            shutil.rmtree(columnar_path)
+        os.replace(tmp_path, columnar_path)
+        with open(source_path, 'w') as f: 
+            json.dump(source, f)
 
-        return csv_path
-
-        
+        return columnar_path
 
     def __attrs_post_init__(self): 
         if self.dfile: 
-            self.data = pd.read_csv(self.dfile)
+            self.data = self._read_data()
 
         # if self.pid_col_name:
         #     # Reindex DataFrame indices to be pids
@@ -68,6 +484,108 @@ class Dataset(object):
             # Treat each row as a unique observation
 
     
+    # @returns dict from column name to the dtype it should be parsed as, based on the declared variables
+    def _column_dtypes(self):
+        dtypes = {}
+        for v in self.variables: 
+            if v.dtype is DataType.NOMINAL or v.dtype is DataType.ORDINAL: 
+                # pandas parses categories as text, declared categories are applied after reading
+                dtypes[v.name] = 'category'
+            else: 
+                assert(v.dtype is DataType.INTERVAL or v.dtype is DataType.RATIO)
+                dtypes[v.name] = self.float_dtype
+        
+        return dtypes
+
+    # @returns names of the declared variables and participant id column, None if no variables are declared
+    def _declared_columns(self): 
+        if not self.variables: 
+            return None
+
+        columns = {v.name for v in self.variables}
+        if self.pid_col_name: 
+            columns.add(self.pid_col_name)
+        return columns
+
+    # Reads the data file, which may be CSV, Parquet, Feather/Arrow or a NumPy column store
+    def _read_data(self): 
+        format = _data_format(self.dfile)
+        if format == 'csv': 
+            return self._read_csv()
+
+        columns = self._declared_columns()
+        if format == 'parquet': 
+            data = _read_parquet(self.dfile, columns)
+        elif format == 'feather': 
+            data = _read_feather(self.dfile, columns)
+        else: 
+            assert(format == 'npy')
+            data = _read_npy_columns(self.dfile, columns)
+
+        return self._apply_declarations(data)
+
+    # Gives the columns of @param data the same dtypes as if they were parsed from CSV
+    def _apply_declarations(self, data: pd.DataFrame): 
+        if self.variables: 
+            dtypes = self._column_dtypes()
+            for v in self.variables: 
+                if v.name not in data.columns: 
+                    continue
+                if dtypes[v.name] == 'category': 
+                    data[v.name] = self._declare_categories(_text_categorical(data[v.name]), v)
+                else: 
+                    data[v.name] = data[v.name].astype(dtypes[v.name])
+
+        return data
+
+    # Reads only the declared variables (and participant id column) from the CSV file
+    # Nominal and ordinal columns become pandas categoricals in declared category order, 
+    # interval and ratio columns become floats
+    def _read_csv(self): 
+        if not self.variables: 
+            return pd.read_csv(self.dfile)
+
+        dtypes = self._column_dtypes()
+        columns = set(dtypes.keys())
+        if self.pid_col_name: 
+            columns.add(self.pid_col_name)
+        
+        data = pd.read_csv(self.dfile, usecols=lambda col: col in columns, dtype=dtypes)
+
+        for v in self.variables: 
+            if v.name in data.columns and dtypes[v.name] == 'category': 
+                data[v.name] = self._declare_categories(data[v.name], v)
+        
+        return data
+
+    # @returns categorical @param column with exactly the categories declared for @param var 
+    # (in declared order). Values that are not declared categories become missing values.
+    @staticmethod
+    def _declare_categories(column, var): 
+        # The declared categories need not be strings (e.g., [0, 1]), so match them as text
+        # and then relabel with the declared values
+        declared = list(var.categories.keys())
+        column = column.cat.set_categories([str(c) for c in declared], ordered=(var.dtype is DataType.ORDINAL))
+        return column.cat.rename_categories(declared)
+
+    def num_rows(self): 
+        return len(self.data)
+
+    # @returns bytes held in memory by the data, and by the lazily computed group indexes, 
+    # statistics, ranks, etc. derived from it if @param derived
+    def memory_usage(self, derived: bool=True): 
+        size = int(self.data.memory_usage(index=True, deep=True).sum())
+        return size + self.derived_memory_usage() if derived else size
+
+    # @returns bytes held in memory by the values derived from the data (see memory_usage), 
+    # which grow as analyses use the Dataset
+    def derived_memory_usage(self): 
+        caches = [self._group_indexes, self._grouped_columns, self._contingency_tables, self._sorted_columns, 
+            self._group_statistics, self._ranks, self._cell_statistics, self._subject_pivots]
+        seen = set()
+        # list() so that entries added by other threads meanwhile do not break the iteration
+        return sum(_nbytes(value, seen) for cache in caches for value in list(cache.values()))
+
     def __getitem__(self, var_name: str):
         for v in self.variables: # checks that the Variable is known to the Dataset object
             if v.name == var_name: 
@@ -108,4 +626,177 @@ class Dataset(object):
         else: 
             res = df[col]
 
-        return res
\ No newline at end of file
+        return res
+
+    # @returns GroupIndex for the categorical variable @param var_name, computed once per Dataset
+    def group_index(self, var_name: str): 
+        if var_name not in self._group_indexes: 
+            var = self.get_variable(var_name)
+            if var is None or not var.categories: 
+                raise ValueError(f"Can only group by a declared categorical variable: {var_name}")
+            self._group_indexes[var_name] = GroupIndex.from_column(self.data[var_name], list(var.categories.keys()))
+        
+        return self._group_indexes[var_name]
+    
+    # @returns @param col with its rows sorted by the categories of @param group_var, computed once per pair
+    def _grouped_column(self, group_var: str, col: str): 
+        key = (group_var, col)
+        if key not in self._grouped_columns: 
+            self._grouped_columns[key] = self.data[col].take(self.group_index(group_var).order)
+        
+        return self._grouped_columns[key]
+
+    # @returns data in @param col for the rows where @param group_var == @param category 
+    # Same as select(col, where=[f"{group_var} == '{category}'"]) but without building 
+    # and parsing a query: the result is a (zero-copy) slice of @param col sorted by group.
+    def select_group(self, col: str, group_var: str, category):
+        start, end = self.group_index(group_var).bounds(category)
+        
+        return self._grouped_column(group_var, col).iloc[start:end]
+
+    # @returns dict from each category of @param group_var to the data in @param col for that category
+    def select_groups(self, col: str, group_var: str): 
+        index = self.group_index(group_var)
+
+        return {c: self.select_group(col, group_var, c) for c in index.categories}
+
+    # @returns contingency table of counts for the categorical variables @param row_var and @param col_var:
+    # a read-only numpy array with one row per category of row_var and one column per category of col_var
+    # (in declared order). Computed in a single pass over the category codes and cached per pair of variables.
+    def contingency_table(self, row_var: str, col_var: str): 
+        key = (row_var, col_var)
+        if key not in self._contingency_tables: 
+            row_index = self.group_index(row_var)
+            col_index = self.group_index(col_var)
+            num_rows = len(row_index.categories)
+            num_cols = len(col_index.categories)
+
+            in_table = (row_index.codes >= 0) & (col_index.codes >= 0)
+            cells = row_index.codes[in_table].astype(np.intp) * num_cols + col_index.codes[in_table]
+            table = np.bincount(cells, minlength=num_rows * num_cols).reshape(num_rows, num_cols)
+            table.flags.writeable = False
+            self._contingency_tables[key] = table
+        
+        return self._contingency_tables[key]
+
+    # @returns RankData of @param col (interval, ratio or ordinal) for the rows where @param group_var is one of 
+    # @param categories (all of its categories if None), or for all rows if @param group_var is None. 
+    # Ordinal values are ranked in declared category order. Computed once per column and group filter.
+    def ranks(self, col: str, group_var: str=None, categories: list=None): 
+        if group_var is not None and categories is not None: 
+            # In declared order, so that e.g. [a, b] and [b, a] share the ranks
+            declared = list(self.group_index(group_var).categories)
+            categories = sorted(categories, key=lambda c: declared.index(c) if c in declared else len(declared))
+            if categories == declared:
+                categories = None # all of them
+        key = (col, group_var, tuple(categories) if categories is not None else None)
+        if key not in self._ranks: 
+            var = self.get_variable(col)
+            if var is None or var.dtype is DataType.NOMINAL: 
+                raise ValueError(f"Can only rank interval, ratio or ordinal variables: {col}")
+            if var.dtype is DataType.ORDINAL: 
+                codes = self.group_index(col).codes
+                values = np.where(codes >= 0, codes, np.nan)
+            else: 
+                values = self.data[col].to_numpy(dtype=np.float64, na_value=np.nan)
+
+            if group_var is None: 
+                group_codes = np.zeros(len(values), dtype=np.intp)
+            else: 
+                index = self.group_index(group_var)
+                categories = list(index.categories) if categories is None else list(categories)
+                # Position of each row's category in categories, -1 if it is not one of them
+                # (the last entry is for rows in no group, whose code is -1)
+                positions = np.full(len(index.categories) + 1, -1, dtype=np.intp)
+                for i, c in enumerate(categories): 
+                    if c not in index.positions: 
+                        raise ValueError(f"{c} is not one of the categories: {index.categories}")
+                    positions[index.positions[c]] = i
+                group_codes = positions[index.codes]
+
+            self._ranks[key] = RankData.from_values(values, group_codes, categories if group_var is not None else None)
+
+        return self._ranks[key]
+
+    # @returns GroupStatistics of @param col for each category of @param group_var, computed once per pair
+    def group_statistics(self, col: str, group_var: str): 
+        key = (group_var, col)
+        if key not in self._group_statistics: 
+            self._group_statistics[key] = GroupStatistics.from_column(self.data[col], self.group_index(group_var))
+        
+        return self._group_statistics[key]
+
+    # @returns CellStatistics of @param col for each combination of categories of @param group_vars, 
+    # computed once per column and factors
+    def cell_statistics(self, col: str, group_vars: list): 
+        key = (tuple(group_vars), col)
+        if key not in self._cell_statistics: 
+            indexes = [self.group_index(group_var) for group_var in group_vars]
+            self._cell_statistics[key] = CellStatistics.from_column(self.data[col], list(group_vars), indexes)
+
+        return self._cell_statistics[key]
+
+    # @returns SubjectPivot of @param col for each participant (pid_col_name) and category of @param within_var, 
+    # computed once per key, within-subjects variable and column
+    def subject_pivot(self, col: str, within_var: str): 
+        if not self.pid_col_name: 
+            raise ValueError(f"Need a key (participant id column) to pair the values of {col} across {within_var}")
+        key = (self.pid_col_name, within_var, col)
+        if key not in self._subject_pivots: 
+            self._subject_pivots[key] = SubjectPivot.from_columns(self.data[self.pid_col_name], self.data[col], self.group_index(within_var))
+
+        return self._subject_pivots[key]
+
+    # @returns data in @param col for the rows where @param col @param op @param value, with @param op 
+    # one of '<', '<=', '>', '>='. Missing values never satisfy the comparison.
+    # Rows are kept in a precomputed order (declared category order for ordinal variables, 
+    # ascending value for interval/ratio variables) so that every such subset is a contiguous 
+    # block and the result is a (zero-copy) slice rather than a masked copy.
+    # Ordinal variables can be compared to a category or to a category's rank (starting at 1).
+    def filter(self, col: str, op: str, value): 
+        if op not in ['<', '<=', '>', '>=']: 
+            raise ValueError(f"Do not support the operator{op}")
+        var = self.get_variable(col)
+
+        if var.dtype is DataType.ORDINAL: 
+            index = self.group_index(col)
+            if isinstance(value, str): 
+                if value not in index.positions: 
+                    raise ValueError(f"{value} is not one of the categories: {index.categories}")
+                position = index.positions[value]
+            elif np.issubdtype(type(value), np.integer): 
+                position = value - 1 # ranks start at 1
+            else: 
+                raise ValueError(f"Cannot compare ORDINAL variables to {type(value)}")
+            
+            # Bounds on group positions, then on rows
+            num_groups = len(index.categories)
+            lo, hi = {'<': (0, position), '<=': (0, position + 1), '>': (position + 1, num_groups), '>=': (position, num_groups)}[op]
+            lo = min(max(lo, 0), num_groups)
+            hi = min(max(hi, lo), num_groups)
+
+            return self._grouped_column(col, col).iloc[index.offsets[lo]:index.offsets[hi]]
+
+        elif var.dtype is DataType.INTERVAL or var.dtype is DataType.RATIO: 
+            sorted_col, num_valid = self._sorted_column(col)
+            values = sorted_col.to_numpy()[:num_valid]
+            lo, hi = {
+                '<': (0, np.searchsorted(values, value, side='left')), 
+                '<=': (0, np.searchsorted(values, value, side='right')), 
+                '>': (np.searchsorted(values, value, side='right'), num_valid), 
+                '>=': (np.searchsorted(values, value, side='left'), num_valid)
+            }[op]
+
+            return sorted_col.iloc[lo:hi]
+        
+        else: 
+            raise ValueError(f"Cannot compare {var.dtype} values with {op}")
+
+    # @returns (@param col sorted by value with missing values last, number of non-missing values), computed once per col
+    def _sorted_column(self, col: str): 
+        if col not in self._sorted_columns: 
+            column = self.data[col]
+            order = np.argsort(column.to_numpy(), kind='stable') 
+            self._sorted_columns[col] = (column.take(order), int(column.notna().sum()))
+        
+        return self._sorted_columns[col]
@@ -0,0 +1,115 @@
+from tea.runtimeDataStructures.dataset import Dataset
+from tea.runtimeDataStructures.streamingDataset import StreamingDataset
+import tea.instrumentation as instrumentation
+
+import os
+import threading
+from collections import OrderedDict
+
+DEFAULT_BUDGET = 2 ** 30 # bytes (1 GiB)
+
+# Process-level cache of parsed Datasets so that repeated hypothesize() calls
+# against the same file do not re-read and re-parse it.
+# Entries are keyed by the file (absolute path, size, modification time) and by
+# everything that changes how the file is parsed (variable declarations, participant
+# id column, float dtype). Least recently used entries are evicted once the
+# in-memory size of the cached data exceeds the budget. The size of a Dataset includes
+# the indexes, statistics, ranks, etc. that analyses derive from it after it is cached,
+# so sizes are measured again whenever the cache is used.
+class DatasetCache(object):
+
+    def __init__(self, budget: int=DEFAULT_BUDGET):
+        self.budget = budget
+        self.size = 0 # bytes currently held
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict() # key -> (Dataset, size of the data in bytes, total size in bytes)
+        self._lock = threading.Lock()
+
+    # @param chunksize is the number of rows read at a time for a StreamingDataset, None to load a Dataset
+    def get(self, source_name: str, vars: list, pid: str, float_dtype: str='float64', chunksize: int=None):
+        key = self._key(source_name, vars, pid, float_dtype) + (chunksize,)
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                instrumentation.count('dataset_cache.hit')
+                dataset = self._entries[key][0]
+                self._resize()
+                return dataset
+            self.misses += 1
+        instrumentation.count('dataset_cache.miss')
+
+        if chunksize is None:
+            dataset = Dataset(source_name, vars, pid, float_dtype)
+        else:
+            dataset = StreamingDataset(source_name, vars, pid, float_dtype, chunksize)
+        self._add(key, dataset)
+
+        return dataset
+
+    def set_budget(self, budget: int):
+        if budget < 0:
+            raise ValueError(f"Cache budget must be a non-negative number of bytes: {budget}")
+
+        with self._lock:
+            self.budget = budget
+            self._resize()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _add(self, key, dataset: Dataset):
+        data_size = dataset.memory_usage(derived=False)
+
+        with self._lock:
+            # Do not let one dataset that is over budget flush everything else
+            if data_size > self.budget:
+                return
+            self._entries[key] = (dataset, data_size, data_size)
+            self._resize()
+
+    # Measures the values derived from each cached Dataset again, then evicts 
+    # least recently used entries until the cache is within budget.
+    # Assumes caller holds self._lock
+    def _resize(self):
+        for key, (dataset, data_size, _) in list(self._entries.items()):
+            self._entries[key] = (dataset, data_size, data_size + dataset.derived_memory_usage())
+        self.size = sum(size for _, _, size in self._entries.values())
+
+        while self.size > self.budget and self._entries:
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self.size -= size
+
+    @staticmethod
+    def _key(source_name: str, vars: list, pid: str, float_dtype: str):
+        path = os.path.abspath(source_name)
+        stat = os.stat(path)
+        files = (stat.st_size, stat.st_mtime_ns)
+        if os.path.isdir(path): 
+            # NumPy column store: rewriting a column file does not change the directory
+            files = tuple((entry.name, entry.stat().st_size, entry.stat().st_mtime_ns) for entry in sorted(os.scandir(path), key=lambda e: e.name))
+
+        return (path, files, _vars_key(vars), pid, float_dtype)
+
+# Variables are not hashable (categories are stored in an OrderedDict and DataType is an attrs class),
+# so build a hashable description of the declarations
+def _vars_key(vars: list):
+    key = []
+    for v in vars:
+        categories = tuple(v.categories.items()) if v.categories else None
+        drange = tuple(v.drange) if v.drange else None
+        key.append((v.name, v.dtype.name, categories, drange))
+
+    return tuple(key)
+
+# Cache shared by all analyses in this process
+dataset_cache = DatasetCache()
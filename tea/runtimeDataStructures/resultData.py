@@ -1,7 +1,8 @@
-from tea.z3_solver.solver import __ALL_TESTS__
 from tea.runtimeDataStructures.value import Value
 from tea.runtimeDataStructures.combinedData import CombinedData
+from tea.runtimeDataStructures.testResult import TestFailure
 from tea.global_vals import *
+import tea.instrumentation as instrumentation
 
 import attr
 
@@ -10,13 +11,13 @@ class ResultData(Value):
     test_to_results = attr.ib(type=dict)
     test_to_assumptions = attr.ib(type=dict)
 
-    def __init__(self, test_to_results, combined_data: CombinedData):
+    # @param tests is the list of BoundTests (from synthesize_tests) that were executed
+    def __init__(self, test_to_results, combined_data: CombinedData, tests: list=None):
         self.test_to_results = test_to_results
         self.test_to_assumptions = {}
-        for test in __ALL_TESTS__:
+        for test in (tests or []):
             if test.name in test_to_results:
                 test_assumptions = []
-                # TODO: The names get stale if hypothesize() is called multiple times in a row.
                 for applied_prop in test._properties:
                     assumption = f"{applied_prop.property.description}: "
 
@@ -27,8 +28,8 @@ class ResultData(Value):
                     elif applied_prop.property.name == "has_independent_observations" or applied_prop.property.name == "has_paired_observations":
                         assumption += combined_data.get_explanatory_variables()[0].metadata[name]
                     else:
-                        for stat_var in applied_prop.vars:
-                            assumption += f"{stat_var.name}, "
+                        for var_name in applied_prop.var_names:
+                            assumption += f"{var_name}, "
                         assumption = assumption[:-2]
 
                     if applied_prop.property_test_results is not None:
@@ -42,6 +43,10 @@ class ResultData(Value):
         return results
 
     def _pretty_print(self):
+        with instrumentation.stage('format', tests=len(self.test_to_results)): 
+            return self._format()
+
+    def _format(self):
         output = "\nResults:\n--------------"
         for test_name, results in self.test_to_results.items():
             output += f"\nTest: {test_name}\n"
@@ -51,7 +56,9 @@ class ResultData(Value):
             output += f"***Test assumptions:\n{test_assumptions}\n\n"
             output += "***Test results:\n"
 
-            if hasattr(results, '__dict__'):
+            if isinstance(results, TestFailure):
+                output += f"{str(results)}\n"
+            elif hasattr(results, '__dict__'):
                 # for prop, value in results.__dict__.items():
                 #     if value is None:
                 #         continue
@@ -0,0 +1,313 @@
+from tea.ast import DataType
+from tea.runtimeDataStructures.dataset import (
+                    Dataset, GroupStatistics, FullDataRequired,
+                    _data_format, _pyarrow, _project, _npy_columns
+                )
+
+import attr
+import itertools
+import threading
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHUNKSIZE = 100000 # rows read at a time
+
+# Central moments of a numeric column for each group of a categorical column, accumulated
+# chunk by chunk: the moments of two chunks merge into the moments of both
+# (Chan et al., 1979; Pebay, 2008), so any number of rows can be summarized in constant memory.
+@attr.s(init=True, repr=False)
+class GroupMoments(object):
+    counts = attr.ib() # numpy arrays with one entry per group
+    means = attr.ib()
+    m2 = attr.ib() # sums of squared, cubed and fourth powers of deviations from the group mean
+    m3 = attr.ib()
+    m4 = attr.ib()
+    mins = attr.ib()
+    maxs = attr.ib()
+
+    # @param codes is the group (0 to @param num_groups - 1) of each of the (non-missing) @param values
+    @classmethod
+    def from_values(cls, codes, values, num_groups: int):
+        counts = np.bincount(codes, minlength=num_groups).astype(np.float64)
+        sums = np.bincount(codes, weights=values, minlength=num_groups)
+        means = np.divide(sums, counts, out=np.zeros(num_groups), where=counts > 0)
+        deviations = values - means[codes]
+        squares = deviations ** 2
+        m2 = np.bincount(codes, weights=squares, minlength=num_groups)
+        m3 = np.bincount(codes, weights=squares * deviations, minlength=num_groups)
+        m4 = np.bincount(codes, weights=squares ** 2, minlength=num_groups)
+        mins = np.full(num_groups, np.nan)
+        maxs = np.full(num_groups, np.nan)
+        np.fmin.at(mins, codes, values)
+        np.fmax.at(maxs, codes, values)
+
+        return cls(counts, means, m2, m3, m4, mins, maxs)
+
+    # @returns GroupMoments of the values summarized by self and @param other
+    def merge(self, other):
+        na, nb = self.counts, other.counts
+        n = na + nb
+        safe_n = np.where(n > 0, n, 1)
+        delta = other.means - self.means
+        # Empty groups have zero means and moments, so the formulas reduce to the other side's moments
+        means = self.means + delta * nb / safe_n
+        m2 = self.m2 + other.m2 + delta ** 2 * na * nb / safe_n
+        m3 = (self.m3 + other.m3 + delta ** 3 * na * nb * (na - nb) / safe_n ** 2
+                + 3 * delta * (na * other.m2 - nb * self.m2) / safe_n)
+        m4 = (self.m4 + other.m4 + delta ** 4 * na * nb * (na ** 2 - na * nb + nb ** 2) / safe_n ** 3
+                + 6 * delta ** 2 * (na ** 2 * other.m2 + nb ** 2 * self.m2) / safe_n ** 2
+                + 4 * delta * (na * other.m3 - nb * self.m3) / safe_n)
+
+        return GroupMoments(n, means, m2, m3, m4, np.fmin(self.mins, other.mins), np.fmax(self.maxs, other.maxs))
+
+    # @returns GroupStatistics (without the values) of the groups, which are the @param categories
+    def to_group_statistics(self, categories: list):
+        positions = {c: i for i, c in enumerate(categories)}
+        return GroupStatistics(categories, positions, self.counts.astype(np.int64), self.means * self.counts, self.m2, self.mins, self.maxs, None, None)
+
+# Co-moment of two numeric columns over the rows where neither is missing, accumulated chunk by chunk
+@attr.s(init=True, repr=False)
+class CoMoments(object):
+    count = attr.ib(type=float)
+    means = attr.ib() # numpy arrays with one entry per column
+    m2 = attr.ib()
+    cross = attr.ib(type=float) # sum of the products of the deviations from the means
+
+    @classmethod
+    def from_values(cls, x, y):
+        count = float(len(x))
+        if not count:
+            return cls(0.0, np.zeros(2), np.zeros(2), 0.0)
+        means = np.array([x.mean(), y.mean()])
+        dx = x - means[0]
+        dy = y - means[1]
+        return cls(count, means, np.array([dx @ dx, dy @ dy]), float(dx @ dy))
+
+    def merge(self, other):
+        n = self.count + other.count
+        if not n:
+            return self
+        delta = other.means - self.means
+        means = self.means + delta * other.count / n
+        m2 = self.m2 + other.m2 + delta ** 2 * self.count * other.count / n
+        cross = self.cross + other.cross + delta[0] * delta[1] * self.count * other.count / n
+
+        return CoMoments(n, means, m2, cross)
+
+    # @returns Pearson correlation coefficient
+    def correlation(self):
+        return self.cross / np.sqrt(self.m2[0] * self.m2[1])
+
+# Dataset that is never loaded into memory. The file is read in chunks of @param chunksize rows
+# and summarized with mergeable statistics:
+#   - moments of each numeric variable, overall and for each group of each categorical variable
+#     (counts, means, variances, skewness, kurtosis, min, max)
+#   - contingency tables of each pair of categorical variables
+#   - co-moments of each pair of numeric variables
+# in one pass over the file, the first time a summary is needed. Levene's test needs the absolute
+# deviations from the group means, which takes a second pass (see deviation_statistics).
+#
+# Computations that need the individual rows (ranks, pairing, models, filters, ...)
+# raise FullDataRequired.
+@attr.s(hash=True)
+class StreamingDataset(Dataset):
+    chunksize = attr.ib(default=DEFAULT_CHUNKSIZE)
+    _rows = attr.ib(init=False, default=None, repr=False, hash=False, cmp=False) # number of rows, once read
+    _moments = attr.ib(init=False, default=None, repr=False, hash=False, cmp=False) # (group var name or None, col) -> GroupMoments
+    _deviations = attr.ib(init=False, default=None, repr=False, hash=False, cmp=False) # (group var name, col) -> GroupMoments of absolute deviations
+    _tables = attr.ib(init=False, default=None, repr=False, hash=False, cmp=False) # (row var name, col var name) -> counts
+    _co_moments = attr.ib(init=False, default=None, repr=False, hash=False, cmp=False) # (col, col) -> CoMoments
+    _lock = attr.ib(init=False, factory=threading.Lock, repr=False, hash=False, cmp=False) # only one pass at a time
+    streaming = True
+
+    def __attrs_post_init__(self):
+        if self.chunksize < 1:
+            raise ValueError(f"Chunks must have at least one row: {self.chunksize}")
+        self.data = None
+
+    # Locks cannot be pickled (e.g., to run tests in other processes)
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    # @returns number of rows, None until the file has been read
+    def num_rows(self):
+        return self._rows
+
+    # Only the summaries are held, which do not grow with the number of rows
+    def memory_usage(self, derived: bool=True):
+        return 0
+
+    def derived_memory_usage(self):
+        return 0
+
+    # @returns iterator over the declared columns of the file, as DataFrames of at most chunksize rows
+    # with the same dtypes as Dataset would read
+    def chunks(self):
+        format = _data_format(self.dfile)
+        columns = self._declared_columns()
+
+        if format == 'csv':
+            if columns is None:
+                chunks = pd.read_csv(self.dfile, chunksize=self.chunksize)
+            else:
+                chunks = pd.read_csv(self.dfile, usecols=lambda col: col in columns, dtype=self._column_dtypes(), chunksize=self.chunksize)
+        elif format == 'parquet':
+            parquet_file = _pyarrow(self.dfile).parquet.ParquetFile(self.dfile, memory_map=True)
+            names = _project(parquet_file.schema_arrow.names, columns)
+            chunks = (batch.to_pandas() for batch in parquet_file.iter_batches(batch_size=self.chunksize, columns=names))
+        elif format == 'feather':
+            chunks = self._feather_chunks(columns)
+        else:
+            assert(format == 'npy')
+            values = _npy_columns(self.dfile, columns)
+            num_rows = len(next(iter(values.values()))) if values else 0
+            chunks = (pd.DataFrame({name: v[start:start + self.chunksize] for name, v in values.items()}) for start in range(0, num_rows, self.chunksize))
+
+        for chunk in chunks:
+            yield self._apply_declarations(chunk)
+
+    def _feather_chunks(self, columns: set):
+        pa = _pyarrow(self.dfile)
+        with pa.memory_map(str(self.dfile)) as source:
+            reader = pa.ipc.open_file(source)
+            names = _project(reader.schema.names, columns)
+            for i in range(reader.num_record_batches):
+                batch = pa.Table.from_batches([reader.get_batch(i)]).select(names)
+                for start in range(0, batch.num_rows, self.chunksize):
+                    yield batch.slice(start, self.chunksize).to_pandas()
+
+    def _vars_of(self, dtypes: list):
+        # DataTypes are compared by identity, as elsewhere
+        return [v.name for v in self.variables if any(v.dtype is dtype for dtype in dtypes)]
+
+    # Reads the file once and computes every summary
+    def _scan(self):
+        categorical = self._vars_of([DataType.NOMINAL, DataType.ORDINAL])
+        numeric = self._vars_of([DataType.INTERVAL, DataType.RATIO])
+        num_groups = {v.name: len(v.categories) for v in self.variables if v.name in categorical}
+        rows = 0
+        moments = {}
+        tables = {}
+        co_moments = {}
+
+        def add(summaries, key, summary):
+            summaries[key] = summaries[key].merge(summary) if key in summaries else summary
+
+        for chunk in self.chunks():
+            rows += len(chunk)
+            codes = {g: chunk[g].cat.codes.to_numpy() for g in categorical if g in chunk.columns}
+            values = {y: chunk[y].to_numpy(dtype=np.float64, na_value=np.nan) for y in numeric if y in chunk.columns}
+
+            for y, v in values.items():
+                valid = ~np.isnan(v)
+                add(moments, (None, y), GroupMoments.from_values(np.zeros(np.count_nonzero(valid), dtype=np.intp), v[valid], 1))
+                for g, c in codes.items():
+                    in_group = valid & (c >= 0)
+                    add(moments, (g, y), GroupMoments.from_values(c[in_group], v[in_group], num_groups[g]))
+
+            for a, b in itertools.combinations(codes.keys(), 2):
+                in_table = (codes[a] >= 0) & (codes[b] >= 0)
+                cells = codes[a][in_table].astype(np.intp) * num_groups[b] + codes[b][in_table]
+                table = np.bincount(cells, minlength=num_groups[a] * num_groups[b]).reshape(num_groups[a], num_groups[b])
+                tables[(a, b)] = tables[(a, b)] + table if (a, b) in tables else table
+
+            for a, b in itertools.combinations(values.keys(), 2):
+                valid = ~np.isnan(values[a]) & ~np.isnan(values[b])
+                add(co_moments, (a, b), CoMoments.from_values(values[a][valid], values[b][valid]))
+
+        for table in tables.values():
+            table.flags.writeable = False
+        self._moments, self._tables, self._co_moments, self._rows = moments, tables, co_moments, rows
+
+    # Reads the file a second time for the absolute deviations of each numeric variable from its group means
+    def _scan_deviations(self):
+        means = {key: m.means for key, m in self._moments.items() if key[0] is not None}
+        deviations = {}
+
+        for chunk in self.chunks():
+            for (g, y), group_means in means.items():
+                codes = chunk[g].cat.codes.to_numpy()
+                values = chunk[y].to_numpy(dtype=np.float64, na_value=np.nan)
+                valid = ~np.isnan(values) & (codes >= 0)
+                summary = GroupMoments.from_values(codes[valid], np.abs(values[valid] - group_means[codes[valid]]), len(group_means))
+                deviations[(g, y)] = deviations[(g, y)].merge(summary) if (g, y) in deviations else summary
+
+        self._deviations = deviations
+
+    def _summaries(self):
+        with self._lock:
+            if self._moments is None:
+                self._scan()
+
+    def _summary(self, summaries: dict, key, description: str):
+        if key not in summaries:
+            raise ValueError(f"No summary of {description}, only declared variables are summarized")
+        return summaries[key]
+
+    # @returns GroupMoments of @param col for each category of @param group_var (for all rows if None)
+    def group_moments(self, col: str, group_var: str=None):
+        self._summaries()
+        return self._summary(self._moments, (group_var, col), f"{col} by {group_var}")
+
+    # @returns GroupStatistics (without the values) of @param col for each category of @param group_var
+    def group_statistics(self, col: str, group_var: str):
+        key = (group_var, col)
+        if key not in self._group_statistics:
+            categories = list(self.get_variable(group_var).categories.keys())
+            self._group_statistics[key] = self.group_moments(col, group_var).to_group_statistics(categories)
+
+        return self._group_statistics[key]
+
+    # @returns GroupStatistics of the absolute deviations of @param col from its mean in each category
+    # of @param group_var, on which Levene's test is a one-way ANOVA
+    def deviation_statistics(self, col: str, group_var: str):
+        self._summaries()
+        with self._lock:
+            if self._deviations is None:
+                self._scan_deviations()
+        categories = list(self.get_variable(group_var).categories.keys())
+        return self._summary(self._deviations, (group_var, col), f"{col} by {group_var}").to_group_statistics(categories)
+
+    def contingency_table(self, row_var: str, col_var: str):
+        self._summaries()
+        if (col_var, row_var) in self._tables:
+            return self._tables[(col_var, row_var)].T
+        return self._summary(self._tables, (row_var, col_var), f"{row_var} and {col_var}")
+
+    # @returns CoMoments of the numeric variables @param col and @param other_col
+    def co_moments(self, col: str, other_col: str):
+        self._summaries()
+        if (other_col, col) in self._co_moments:
+            return self._co_moments[(other_col, col)]
+        return self._summary(self._co_moments, (col, other_col), f"{col} and {other_col}")
+
+    # Everything that needs the rows themselves
+    def _full_data_required(self, description: str):
+        raise FullDataRequired(f"{description} needs the full data, which streaming mode does not load")
+
+    def __getitem__(self, var_name: str):
+        self._full_data_required(f"The data of {var_name}")
+
+    def select(self, col: str, where: list = None):
+        self._full_data_required(f"Selecting {col}")
+
+    def group_index(self, var_name: str):
+        self._full_data_required(f"Grouping by {var_name}")
+
+    def select_group(self, col: str, group_var: str, category):
+        self._full_data_required(f"Selecting {col} where {group_var} is {category}")
+
+    def select_groups(self, col: str, group_var: str):
+        self._full_data_required(f"Selecting {col} by {group_var}")
+
+    def filter(self, col: str, op: str, value):
+        self._full_data_required(f"Filtering {col} {op} {value}")
+
+    def ranks(self, col: str, group_var: str=None, categories: list=None):
+        self._full_data_required(f"Ranking {col}")
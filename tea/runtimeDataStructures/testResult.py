@@ -297,6 +297,18 @@ class TestResult(Value):
                 else False
 
 
+# Stands in for the TestResult of a test that raised an exception while being executed,
+# so that the results of the other tests are still reported
+@attr.s(init=True)
+class TestFailure(Value): 
+    name = attr.ib() # name of the test, e.g., 'students_t'
+    error = attr.ib(repr=False) # the exception
+    traceback = attr.ib(default=None, repr=False) # formatted traceback of the exception
+
+    def __str__(self): 
+        return f"{self.name} failed: {self.error!r}"
+
+
 class Significance(Enum): 
         not_significant = 0
         significantly_different = 1
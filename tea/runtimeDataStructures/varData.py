@@ -10,6 +10,7 @@ class VarData(Value):
     metadata = attr.ib()
     properties = attr.ib(default=dict())
     role = attr.ib(default=None)
+    dataframe = attr.ib(default=None, repr=False, cmp=False) # rows kept by a filter (e.g., x < 3), None if unfiltered
 
     def is_normal(self, alpha=0.05):
         global normal_distribution
@@ -0,0 +1,273 @@
+from .build import (load_data, nominal, ordinal, interval,
+                    relate, get_var_from_list
+                   )
+from .evaluate import evaluate
+from tea.helpers.evaluateHelperMethods import determine_study_type, correlation_matrix, compare_outcomes
+from tea.runtimeDataStructures.bivariateData import BivariateData
+from tea.runtimeDataStructures.multivariateData import MultivariateData
+from tea.runtimeDataStructures.streamingDataset import DEFAULT_CHUNKSIZE
+from tea.helpers.lazyImport import lazy_import
+import tea.helpers.bootstrap as bs
+import tea.instrumentation as instrumentation
+solver = lazy_import('tea.z3_solver.solver') # z3 is imported on first use
+
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Dict
+from .global_vals import *
+
+# For variables dictionary
+var_name = 'name'
+var_dtype = 'data type'
+var_categories = 'categories'
+var_drange = 'range'
+
+DEFAULT_ALPHA = 0.01
+DEFAULT_MODE = 'strict'
+
+# One analysis: the data, variables, study design and assumptions it is set up with,
+# and the settings (alpha, mode, bootstrap options) that test selection and execution use.
+# Sessions do not share any of this state, so analyses in different sessions can run
+# concurrently (e.g., one session per thread). Parsed datasets and test selections are
+# still shared through the process-level caches, which are safe to use from several threads.
+class Session(object):
+
+    def __init__(self):
+        self.dataset_path = ''
+        self.dataset_id = None
+        self.dataset_float_dtype = 'float64'
+        self.dataset_chunksize = None # rows read at a time in streaming mode, None to load the whole file
+        self.dataset_obj = None # Dataset used by the most recent hypothesize()
+        self.vars_objs = []
+        self.study_design = None
+        self.assumptions = {}
+        self.alpha = DEFAULT_ALPHA
+        self.mode = DEFAULT_MODE
+        self.executor = None # Executor the selected tests run on, None to run them one after another
+        self.bootstrap_options = bs.make_options() # see set_bootstrap_options
+
+    # @sets dataset_path (the Dataset is loaded by hypothesize)
+    # @param float_dtype is the dtype interval and ratio columns are loaded as ('float64' or 'float32')
+    # @param streaming reads the file in chunks of @param chunksize rows instead of loading it, for 
+    # data larger than memory. Only the tests that can be computed from summaries of the data 
+    # run (see streamingDataset.py), the others report that they need the full data.
+    def data(self, file, key=None, float_dtype='float64', streaming=False, chunksize=None):
+        if float_dtype not in ['float64', 'float32']:
+            raise ValueError(f"Interval and ratio data can only be loaded as float64 or float32, not: {float_dtype}")
+        if chunksize is not None and not streaming:
+            raise ValueError(f"Chunk size is only used in streaming mode: {chunksize}")
+
+        self.dataset_path = file
+        self.dataset_id = key
+        self.dataset_float_dtype = float_dtype
+        self.dataset_chunksize = (chunksize if chunksize else DEFAULT_CHUNKSIZE) if streaming else None
+
+    def define_variables(self, vars: Dict[str, str]):
+        # reset the variables
+        self.vars_objs = []
+
+        for var in vars:
+            name = var['name']
+
+            if (var[var_dtype] == 'nominal'):
+                categories = var[var_categories]
+                v_obj = nominal(name, categories)
+            elif (var[var_dtype] == 'ordinal'):
+                categories = var[var_categories]
+                v_obj = ordinal(name, categories)
+            elif (var[var_dtype] == 'interval'):
+                drange=None
+                if var_drange in var:
+                    drange = var[var_drange]
+                v_obj = interval(name, drange)
+            else:
+                assert(var[var_dtype] == 'ratio')
+                drange = var[var_drange] if var_drange in var else None
+                v_obj = interval(name, drange)
+
+            self.vars_objs.append(v_obj)
+
+    def define_study_design(self, design: Dict[str, str]):
+        # Check that variables are only assigned EITHER between OR within but NOT BOTH:
+        btw_vars = design[btw_subj] if btw_subj in design else None
+        within_vars = design[within_subj] if within_subj in design else None
+
+        if btw_vars:
+            for b in btw_vars:
+                if within_vars:
+                    for w in within_vars:
+                        if b == w:
+                            raise ValueError(f"{b} CANNOT be a between subjects variable AND a within subjects variable. Can only be one or the other.")
+
+        self.study_design = design
+
+    def assume(self, user_assumptions: Dict[str, str], mode=None):
+        if alpha_keywords[0] in user_assumptions:
+            if alpha_keywords[1] in user_assumptions:
+                assert (float(user_assumptions[alpha_keywords[0]]) == float(user_assumptions[alpha_keywords[1]]))
+
+        for keyword in alpha_keywords:
+            if keyword in user_assumptions:
+                self.alpha = float(user_assumptions[keyword])
+
+        self.assumptions = user_assumptions
+        self.assumptions[alpha_keywords[1]] = self.alpha
+
+        # Set mode for dealing with assumptions
+        if mode and mode == 'relaxed':
+            self.mode = mode
+            log(f"\nRunning under {self.mode.upper()} mode.\n")
+            log(f"This means that user assertions will be checked. Should they fail, Tea will issue a warning but proceed as if user's assertions were true.")
+        else:
+            assert (mode == None or mode == 'strict')
+            self.mode = 'strict'
+            log(f"\nRunning under {self.mode.upper()} mode.\n")
+            log(f"This means that user assertions will be checked. Should they fail, Tea will override user assertions.\n")
+
+    # @param kind is 'thread' or 'process' to run the tests selected for a hypothesis concurrently 
+    # on a pool of @param workers (default: number of CPUs), or None to run them one after another
+    # Results are reported in the same order either way, and a test that fails does not affect the others 
+    # (it is reported as a TestFailure, see execute_tests). Process workers load the dataset from its file 
+    # once each, rather than being sent it with every test.
+    def set_executor(self, kind: str=None, workers: int=None):
+        if kind not in [None, 'thread', 'process']:
+            raise ValueError(f"Tests can only be executed on a 'thread' or 'process' pool, not: {kind}")
+        if workers is not None and workers < 1:
+            raise ValueError(f"Executing tests needs at least one worker: {workers}")
+
+        self.close()
+        if kind == 'thread':
+            self.executor = ThreadPoolExecutor(max_workers=workers)
+        elif kind == 'process':
+            self.executor = ProcessPoolExecutor(max_workers=workers)
+
+    # Configures the bootstrap that is run when no other test applies
+    # @param iterations is the number of resamples (default 10000)
+    # @param workers is the number of processes to resample in (default 1)
+    # @param seed makes resampling reproducible (default None)
+    # Options that are not passed keep their current values.
+    def set_bootstrap_options(self, iterations: int=None, workers: int=None, seed: int=None):
+        self.bootstrap_options = bs.make_options(self.bootstrap_options, iterations=iterations, workers=workers, seed=seed)
+
+    # Shuts down the pool tests are executed on, if any
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def hypothesize(self, vars: list, prediction: list=None):
+        dataset = self._load_dataset()
+        
+        return self._hypothesize(dataset, vars, prediction)
+
+    # @param hypotheses is a list of (vars, prediction) pairs, each as passed to hypothesize
+    # @returns list of ResultData, one per hypothesis, in the same order
+    # The dataset is loaded once, and each property (normality, equal variance, ...) is 
+    # checked once across all the hypotheses that need it.
+    def hypothesize_many(self, hypotheses: list):
+        dataset = self._load_dataset()
+
+        property_results = {}
+        results = []
+        for vars, prediction in hypotheses:
+            results.append(self._hypothesize(dataset, vars, prediction, property_results))
+
+        return results
+
+    # @param vars are the names of the (interval, ratio or ordinal) variables to correlate pairwise
+    # @param correction adjusts the p-values for the number of pairs: 'bonferroni', 'holm' or 'fdr_bh' (default None)
+    # @returns CorrelationMatrix with the coefficient and p-value of every pair of @param vars
+    # Needs no study design. Tests are not synthesized for each pair: normality is checked once per variable, 
+    # and each pair gets Pearson's r or Spearman's rho by the rules the solver uses for them.
+    def relate_all(self, vars: list, correction: str=None):
+        dataset = self._read_dataset()
+
+        with instrumentation.stage('relate_all', vars=len(vars)):
+            return correlation_matrix(dataset, vars, self.alpha, correction)
+
+    # @param x is the name of the (nominal or ordinal) variable whose groups are compared
+    # @param outcomes are the names of the (interval, ratio or ordinal) variables to compare them on
+    # @param correction adjusts the p-values of each test for the number of outcomes: 'bonferroni', 'holm' or 'fdr_bh' (default None)
+    # @returns pandas DataFrame with the result of each test of each outcome
+    # Tests are not synthesized for each outcome: the groups are split once, and the tests the solver would 
+    # select for each outcome are computed for all outcomes at once (see compare_outcomes). 
+    # Only independent groups (between subjects) are supported.
+    def relate_outcomes(self, x: str, outcomes: list, correction: str=None):
+        within_vars = self.study_design.get(within_subj, []) if self.study_design else []
+        if x in ([within_vars] if isinstance(within_vars, str) else within_vars):
+            raise ValueError(f"Can only compare the outcomes of independent groups, not of the within subjects variable {x}")
+        dataset = self._read_dataset()
+
+        with instrumentation.stage('relate_outcomes', outcomes=len(outcomes)):
+            return compare_outcomes(dataset, x, outcomes, self.alpha, correction)
+
+    def _load_dataset(self):
+        assert(self.study_design)
+
+        return self._read_dataset()
+
+    def _read_dataset(self):
+        assert(self.dataset_path)
+        assert(self.vars_objs)
+
+        self.dataset_obj = load_data(self.dataset_path, self.vars_objs, self.dataset_id, self.dataset_float_dtype, self.dataset_chunksize)
+        return self.dataset_obj
+
+    def _hypothesize(self, dataset, vars: list, prediction: list=None, property_results: dict=None):
+        v_objs = []
+        for v in vars:
+            v_objs.append(get_var_from_list(v, self.vars_objs)) # may want to use Dataset instance method instead
+
+        with instrumentation.stage('hypothesize', vars=list(vars)):
+            # Create and get back handle to AST node
+            relationship = relate(v_objs, prediction)
+            # Interpret AST node, Returns ResultData object <-- this may need to change
+            result = evaluate(dataset, relationship, self.assumptions, self.study_design, self.mode, property_results, self.executor, self.bootstrap_options)
+
+        print(f"\n{result}")
+        return result
+
+    # @param vars that user would like to relate
+    # @param stats_tests contains all the tests that the user would like
+    # @return properties that must be true in order to satisfy
+    # as many of the tests as possible
+    def divine_properties(self, vars:list, tests:list):
+        v_objs = []
+        for v in vars:
+            v_objs.append(get_var_from_list(v, self.vars_objs)) # may want to use Dataset instance method instead
+
+        relationship = relate(v_objs)
+
+        # What kind of study are we analyzing?
+        study_type = determine_study_type(vars, self.study_design)
+
+        combined_data = None
+        # Do we have a Bivariate analysis?
+        if len(vars) == 2:
+            combined_data = BivariateData(vars, study_type, alpha=float(self.assumptions['alpha']))
+        else: # Do we have a Multivariate analysis?
+            combined_data = MultivariateData(vars, study_type, alpha=float(self.assumptions['alpha']))
+
+        # test_to_properties, test_to_broken_properties = which_props(['mannwhitney_u', 'students_t'])
+        test_to_properties, test_to_broken_properties = solver.which_props(tests, vars)
+
+
+        all_properties_are_satisfied = True
+        for val in test_to_broken_properties.values():
+            if val:
+                all_properties_are_satisfied = False
+                break
+
+        if all_properties_are_satisfied:
+            print(f"\nProperties for {tests[0]} and {tests[1]} are complementary.")
+        else:
+            print(f"\nProperties for {tests[0]} and {tests[1]} conflict.")
+
+        # print(ps)
+        import pprint
+        pp = pprint.PrettyPrinter()
+
+        # print("\nProperties for student's t test and Mann Whitney u test are complementary.")
+        print("\nProperties:")
+        pp.pprint(test_to_properties)
+        print("\nProperties that could not be satisfied:")
+        pp.pprint(test_to_broken_properties)
@@ -1,61 +1,34 @@
 from tea.global_vals import *
-from tea.runtimeDataStructures.dataset import Dataset
+from tea.runtimeDataStructures.dataset import Dataset, FullDataRequired
 from tea.runtimeDataStructures.varData import VarData
 from tea.runtimeDataStructures.combinedData import CombinedData
 from tea.runtimeDataStructures.bivariateData import BivariateData
-from tea.helpers.evaluateHelperMethods import get_data, compute_normal_distribution, compute_eq_variance
+from tea.helpers.evaluateHelperMethods import (
+                    get_data, compute_normal_distribution, compute_eq_variance, 
+                    compute_normal_distribution_from_moments, compute_eq_variance_from_statistics
+                )
+from tea.z3_solver.synthesisCache import SynthesisCache, synthesis_cache
+import tea.instrumentation as instrumentation
 
 import attr
+import threading
 import z3
 from typing import Dict, List
 
 # Prog -> List[StatisticalTest] -> Query
-alpha = 0.01 # Default
-MODE = 'strict' # Default
+# Alpha and mode are passed to each run (see synthesize_tests) rather than kept in module state, 
+# so that concurrent analyses with different settings do not interfere.
+
+# All z3 objects live in z3's main context, which is not thread safe. 
+# Held while creating z3 objects or solving, but not while verifying properties against the data, 
+# so that analyses can run their statistical checks from several threads at once.
+__z3_lock__ = threading.RLock()
 
 # Contains a map from z3 variables representing tests
 # back to the test objects allowing us to map back
 # from a model back to the tests.
 __test_map__ = {}
 
-#  A list of all tests in the system which we can use
-# to iterate over all tests.
-__ALL_TESTS__ = []
-
-def all_tests():
-    """A helper for accessing the global set of tests"""
-    global __ALL_TESTS__
-    return __ALL_TESTS__
-
-def reset_all_tests(): 
-    global __test_map__, __ALL_TESTS__ 
-    global pearson_corr, kendalltau_corr, pointbiserial_corr_a, pointbiserial_corr_b
-    global students_t, paired_students_t, welchs_t, mannwhitney_u
-    global chi_square, fishers_exact
-    global f_test, rm_one_way_anova, kruskall_wallis, friedman, factorial_ANOVA
-
-    pearson_corr = None
-    kendalltau_corr = None
-    spearman_corr = None
-    pointbiserial_corr_a = None
-    pointbiserial_corr_b = None
-    students_t = None
-    paired_students_t = None
-    welchs_t = None 
-    mannwhitney_u = None
-    wilcoxon_signed_rank = None
-    chi_square = None
-    fishers_exact = None
-    f_test = None    
-    rm_one_way_anova = None
-    kruskall_wallis = None
-    friedman = None
-    factorial_ANOVA = None
-    
-    __test_map__ = {}
-    __ALL_TESTS__ = []
-
-
 # Contains the global map from z3 variables which
 # represent properties applied to variables back
 # the properties that were applied.
@@ -88,10 +61,6 @@ def all_props():
 
 #     return selected_props
 
-def set_mode(mode): 
-    global MODE
-    MODE = mode
-
 @attr.s(hash=False, cmp=False, auto_attribs=True, init=False)
 class StatVar:
     name: str
@@ -123,7 +92,7 @@ class StatisticalTest:
     # each property needs to be mapped to variable
     # 
     def __init__(self, name, test_vars, test_properties=None, properties_for_vars=None):
-        global __test_map__, __ALL_TESTS__
+        global __test_map__
         self.name = name
         self.test_vars = test_vars
 
@@ -153,16 +122,13 @@ class StatisticalTest:
         # Create variable.
         self.__z3__ = z3.Bool(self.name)
 
+        # Apply properties to the test's variables once. 
+        # Tests are shared by all analyses with the same number of variables (see TestCatalog).
+        self._populate_properties()
+        self.__query__ = None
+
         # Populate global table.
         __test_map__[self.__z3__] = self
-        __ALL_TESTS__.append(self)
-
-    # Question: does this mean you can't consider two tests of the same type on different variables at once?
-    def apply(self, *test_vars):
-        if len(test_vars) != len(self.test_vars): 
-            import pdb; pdb.set_trace()
-        assert len(test_vars) == len(self.test_vars)
-        self.test_vars = test_vars
 
     def _populate_properties(self):
         # Populate all props
@@ -189,8 +155,8 @@ class StatisticalTest:
     def query(self):  # May want to change this....
         global __property_to_function__
 
-        self._populate_properties()  # Apply to specific instance of variables
-        # if self.__query__ is None:
+        if self.__query__ is not None:
+            return self.__query__
         conj = []
         for p in self._properties:  # combines Test and Var-specific properties
             # p.__z3__ = uninterpreted function
@@ -202,9 +168,8 @@ class StatisticalTest:
             # Add property to property to function map
             __property_to_function__[p.__z3__] = p.property.function
 
-        return conj
-        # self.__query__ = query
-        # return self.__query__
+        self.__query__ = conj
+        return self.__query__
 
     @staticmethod
     def get_by_z3_var(var):
@@ -220,22 +185,23 @@ class Property:
     description: str
     arity: int
 
-    def __init__(self, name, description, function=None, arity=1):
-        global __property_map__, __ALL_PROPERTIES__
+    # @param arity is the number of variables the property applies to, None for test-level properties 
+    # that apply to all the variables of a test, however many the analysis has
+    # @param statistical is True if whether the property holds depends on the data values 
+    # (e.g., normality), not just on variable declarations and the study design
+    def __init__(self, name, description, function=None, arity=1, statistical=False):
+        global __ALL_PROPERTIES__
 
         self.name = name
         self.description = description
         self.function = function
         self.arity = arity
-        args = []
-        for _ in range(self.arity):
-            args.append(z3.BoolSort())
-        args.append(z3.BoolSort())
-        self.__z3__ = z3.Function(self.name, *args)  # e.g. continuous(x)
+        self.statistical = statistical
+        self.__functions__ = {} # arity -> z3 function
+        self.__z3__ = self.z3_function(arity) if arity is not None else None
         self.__cache__ = {}
 
         # Populate global table.    
-        __property_map__[self.__z3__] = self
         __ALL_PROPERTIES__.append(self)
 
     def __str__(self):
@@ -250,8 +216,9 @@ class Property:
     def __hash__(self):
         return hash((self.arity, self.name, self.function))
 
+    # Assumes caller holds __z3_lock__
     def __call__(self, *var_names):
-        if len(var_names) != self.arity:
+        if self.arity is not None and len(var_names) != self.arity:
             raise Exception(f"{self.name} property has arity {self.arity} " \
                             f"found {len(var_names)} arguments")
         cached = self.__cache__.get(tuple(var_names))
@@ -259,20 +226,23 @@ class Property:
             return cached
         
         ap = AppliedProperty(self, var_names)
-        # self.__cache__[tuple(var_names)] = ap
+        self.__cache__[tuple(var_names)] = ap
         return ap
 
-    # Only used when the property must be changed depending on input data
-    def _update(self, arity):
-        self.arity = arity
-        self.reset()
-
-    def reset(self):
-        args = []
-        for _ in range(self.arity):
+    # @returns z3 function of the property applied to @param arity variables, e.g. continuous(x)
+    # A test-level property has one per number of variables, each shared by the TestCatalog for that number; 
+    # the Property itself does not change with the catalogs that are built.
+    # Assumes caller holds __z3_lock__ (or is importing this module)
+    def z3_function(self, arity: int):
+        global __property_map__
+        if arity not in self.__functions__: 
+            args = []
+            for _ in range(arity):
+                args.append(z3.BoolSort())
             args.append(z3.BoolSort())
-        args.append(z3.BoolSort())
-        self.__z3__ = z3.Function(self.name, *args)  # e.g. continuous(x)
+            self.__functions__[arity] = z3.Function(self.name, *args)
+            __property_map__[self.__functions__[arity]] = self
+        return self.__functions__[arity]
 
 class AppliedProperty:
     property: Property
@@ -289,12 +259,15 @@ class AppliedProperty:
             # self._name + tv.name
             z3_args.append(tv.__z3__)
         self._name = self.property.name  # continuous
+        # Literal that tracks this property when checking tests with assumptions (e.g. track:continuous(x0))
+        self._track_name = f"track:{self._name}({', '.join(tv.name for tv in pvars)})"
+        self.__track__ = z3.Bool(self._track_name)
         # Why is property fn a bool? Does this allow continuous(x) and not continuous(y)?
         # Answer: I think the undefined function is able to capture all functionality of
         # deciding the boolean property value for each variable, so the z3.Bool() for the
         # property name isn't necessary.
         # self.__var__ = z3.Bool(self._name)  # e.g. continuous
-        self.__z3__ = prop.__z3__(*z3_args)  # e.g. continuous(x)
+        self.__z3__ = prop.z3_function(len(pvars))(*z3_args)  # e.g. continuous(x)
 
         # _name needs to be unique to avoid overwriting same property for different variables.
         # But if it is unique, it makes it more difficult to look up from the z3 model.
@@ -306,8 +279,6 @@ class AppliedProperty:
         # TODO: When does __property_var_map__ need to be cleared?
         __property_var_map__[self._name].append(self.vars)
 
-        self.property_test_results = None
-
     def __str__(self):
         return f"property_for_var:{self._name}"
 
@@ -322,6 +293,44 @@ class AppliedProperty:
         global __property_var_map__
         return __property_var_map__.get(name)
 
+# An AppliedProperty (over catalog variables) bound to the variables of one analysis.
+# Holds the results of verifying the property for that analysis.
+@attr.s(init=True, cmp=False)
+class BoundProperty:
+    applied: AppliedProperty = attr.ib()
+    var_names: List[str] = attr.ib() # names of the variables the property applies to
+    property_test_results = attr.ib(default=None)
+
+    @property
+    def _name(self):
+        return self.applied._name
+
+    @property
+    def __z3__(self):
+        return self.applied.__z3__
+
+    # Defined last: shadows the property decorator in the rest of the class body
+    @property
+    def property(self):
+        return self.applied.property
+
+# A StatisticalTest (from a TestCatalog) bound to the variables of one analysis
+@attr.s(init=True, cmp=False)
+class BoundTest:
+    test: StatisticalTest = attr.ib()
+    _properties: List[BoundProperty] = attr.ib() # parallel to test._properties
+
+    @property
+    def name(self):
+        return self.test.name
+
+    @property
+    def __z3__(self):
+        return self.test.__z3__
+
+    def query(self):
+        return self.test.query()
+
 # Functions to verify properties
 def is_bivariate(dataset: Dataset, var_data: CombinedData, alpha):
     return len(var_data.vars) == 2
@@ -363,20 +372,9 @@ def greater_than_5_frequency(dataset: Dataset, var_data: CombinedData, alpha):
             y = ys[0]
 
             if x.is_categorical() and y.is_categorical(): 
-
-                # Get the count for each category
-                x_cat = [k for k,v in x.metadata[categories].items()]
-                y_cat = [k for k,v in y.metadata[categories].items()]
-
-                for xc in x_cat: 
-                    for yc in y_cat: 
-                        data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{xc}'", f"{y.metadata[name]} == '{yc}'"])                    
-
-                        # Check that the count is at least five for each of the (x,y) group pairs
-                        if (len(data) < 5): 
-                            return False
-                
-                return True
+                # Check that the count is at least five for each of the (x,y) group pairs
+                contingency_table = dataset.contingency_table(x.metadata[name], y.metadata[name])
+                return bool((contingency_table >= 5).all())
             else: 
                 return False
         else: 
@@ -386,18 +384,9 @@ def greater_than_5_frequency(dataset: Dataset, var_data: CombinedData, alpha):
         x1 = xs[1]
         
         if x0.is_categorical() and x1.is_categorical():
-            # Get the count for each category
-            x0_cat = [k for k,v in x0.metadata[categories].items()]
-            x1_cat = [k for k,v in x1.metadata[categories].items()]
-
-            for x0c in x0_cat: 
-                for x1c in x1_cat: 
-                    data = dataset.select(x1.metadata[name], where=[f"{x.metadata[name]} == '{xc}'", f"{x1.metadata[name]} == '{x1c}'"])                    
-
-                    # Check that the count is at least five for each of the (x,x1) group pairs
-                    if (len(data) < 5): 
-                        return False
-            return True
+            # Check that the count is at least five for each of the (x0,x1) group pairs
+            contingency_table = dataset.contingency_table(x0.metadata[name], x1.metadata[name])
+            return bool((contingency_table >= 5).all())
         else: 
             return False
 
@@ -423,13 +412,17 @@ def has_equal_variance(dataset: Dataset, var_data: CombinedData, alpha):
     if cat_xs and cont_ys: 
         for y in ys:
             for x in xs: 
-                cat = [k for k,v in x.metadata[categories].items()]
-                for c in cat: 
-                    data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
-                    grouped_data.append(data)
+                if dataset.streaming: 
+                    # Only summaries, Levene's test from the deviations from the group means
+                    deviation_stats = dataset.deviation_statistics(y.metadata[name], x.metadata[name])
+                else: 
+                    cat = [k for k,v in x.metadata[categories].items()]
+                    for c in cat: 
+                        data = dataset.select_group(y.metadata[name], x.metadata[name], c)
+                        grouped_data.append(data)
                 if isinstance(var_data, BivariateData):
                     # Equal variance
-                    eq_var = compute_eq_variance(grouped_data)
+                    eq_var = compute_eq_variance_from_statistics(deviation_stats) if dataset.streaming else compute_eq_variance(grouped_data)
                 # elif isinstance(var_data, MultivariateData):
                 #     var_data.properties[eq_variance + '::' + x.metadata[name] + ':' + y.metadata[name]] = compute_eq_variance(grouped_data)
                 else: 
@@ -472,14 +465,23 @@ def has_groups_normal_distribution(dataset, var_data, alpha):
     if cat_xs and cont_ys: 
         for y in ys:
             for x in xs: 
+                if dataset.streaming: 
+                    # Only summaries, normality from the moments of each group
+                    moments = dataset.group_moments(y.metadata[name], x.metadata[name])
+                    for i in range(len(moments.counts)): 
+                        result = compute_normal_distribution_from_moments(moments, i)
+                        if not (result[1] > alpha): # NaN (e.g., too few values) is not normal
+                            return False, result
+                    continue
+
                 cat = [k for k,v in x.metadata[categories].items()]
                 for c in cat: 
-                    data = dataset.select(y.metadata[name], where=[f"{x.metadata[name]} == '{c}'"])
+                    data = dataset.select_group(y.metadata[name], x.metadata[name], c)
                     grouped_data.append(data)
 
                 for group in grouped_data:
                     result = compute_normal_distribution(group)
-                    if (result[1] <= alpha):
+                    if not (result[1] > alpha): # NaN (e.g., too few or missing values) is not normal
                         return False, result
 
     return True, result
@@ -532,22 +534,26 @@ def has_normal_distribution(dataset, var_data, alpha):
 
     # Must be continuous to be normally distributed
     assert(is_continuous_var(dataset, var_data, alpha))
-    # Get data from datasest using var_data's query 
-    data = get_data(dataset, var_data[0])
-    norm_test_results = compute_normal_distribution(data)
+    if dataset.streaming and var_data[0].dataframe is None and not var_data[0].metadata.get(query): 
+        # Only summaries, normality from the moments of the variable
+        norm_test_results = compute_normal_distribution_from_moments(dataset.group_moments(var_data[0].metadata[name]), 0)
+    else: 
+        # Get data from datasest using var_data's query 
+        data = get_data(dataset, var_data[0])
+        norm_test_results = compute_normal_distribution(data)
 
     return (norm_test_results[1] > alpha), norm_test_results
 
 # Test properties
-bivariate = Property('is_bivariate', "Exactly two variables involved in analysis", is_bivariate)
+bivariate = Property('is_bivariate', "Exactly two variables involved in analysis", is_bivariate, arity=None)
 multivariate = Property('is_multivariate', "More than two variables involved in analysis", is_multivariate) # May not need this!
-one_x_variable = Property('has_one_x', "Exactly one explanatory variable", has_one_x)
-one_y_variable = Property('has_one_y', "Exactly one explained variable", has_one_y)
-paired_obs = Property('has_paired_observations', "Paired observations", has_paired_observations)
-independent_obs = Property('has_independent_observations', "Independent (not paired) observations", has_independent_observations)
-greater_than_5_freq = Property('greater_than_5_freq', "Has a large sample size", greater_than_5_frequency, arity=2)
+one_x_variable = Property('has_one_x', "Exactly one explanatory variable", has_one_x, arity=None)
+one_y_variable = Property('has_one_y', "Exactly one explained variable", has_one_y, arity=None)
+paired_obs = Property('has_paired_observations', "Paired observations", has_paired_observations, arity=None)
+independent_obs = Property('has_independent_observations', "Independent (not paired) observations", has_independent_observations, arity=None)
+greater_than_5_freq = Property('greater_than_5_freq', "Has a large sample size", greater_than_5_frequency, arity=2, statistical=True)
 
-test_props = [bivariate, one_x_variable, one_y_variable, paired_obs, independent_obs]
+test_props = [bivariate, one_x_variable, one_y_variable, paired_obs, independent_obs] # arity: all the variables of a test
 
 # Variable properties
 categorical = Property('is_categorical', "Variable is categorical", is_categorical_var)
@@ -559,9 +565,9 @@ three_or_more_categories = Property('has_three_or_more_categories', "Variable ha
 continuous = Property('is_continuous', "Continuous (not categorical) data", is_continuous_var)
 # We could create a disjunction of continuous \/ ordinal instead
 continuous_or_ordinal = Property('is_continuous_or_ordinal', "Continuous OR ORDINAL (not nominal) data", is_continuous_or_ordinal_var)
-groups_normal = Property('is_groups_normal', "Groups are normally distributed", has_groups_normal_distribution, arity=2)
-normal = Property('is_normal', "Normal distribution", has_normal_distribution)
-eq_variance = Property('has_equal_variance', "Equal variance", has_equal_variance, arity=2)
+groups_normal = Property('is_groups_normal', "Groups are normally distributed", has_groups_normal_distribution, arity=2, statistical=True)
+normal = Property('is_normal', "Normal distribution", has_normal_distribution, statistical=True)
+eq_variance = Property('has_equal_variance', "Equal variance", has_equal_variance, arity=2, statistical=True)
 
 
 # two_categories_eq_variance = Property('two_cat_eq_var', "Two groups have equal variance", 'variable', 2)
@@ -588,10 +594,6 @@ eq_variance = Property('has_equal_variance', "Equal variance", has_equal_varianc
 
 # two_categories_eq_variance = Property('two_cat_eq_var', "Two groups have equal variance", 2)
 
-def construct_test_axioms(solver):
-    solver.add(paired_obs.__z3__ != independent_obs.__z3__)
-    
-
 def construct_axioms(variables):  # List[StatVar]
     _axioms = []
     for var in variables:
@@ -619,51 +621,58 @@ def construct_axioms(variables):  # List[StatVar]
     return _axioms
 
 
-bivariate_constructed = False
-multivariate_constructed = False
-# Constructs all the tests once
-# TODO: Move to a separate file/location
-def construct_all_tests(combined_data: CombinedData): 
-    # global bivariate_constructed, multivariate_constructed
+# Catalogs of all the tests, one per number of variables in the analysis.
+# The tests (and the z3 expressions for their properties) are constructed once over
+# positional variables x0, ..., xn-1 and shared by every analysis with n variables.
+__test_catalogs__ = {}
+
+def test_catalog(num_vars: int): 
+    """A helper for accessing the catalog of tests for analyses with num_vars variables"""
+    global __test_catalogs__
+    with __z3_lock__: 
+        if num_vars not in __test_catalogs__: 
+            __test_catalogs__[num_vars] = TestCatalog(num_vars)
+        return __test_catalogs__[num_vars]
+
+class TestCatalog(object):
 
-    # if not bivariate_constructed: 
-    #     construct_bivariate_tests(combined_data)
-    #     bivariate_constructed = True
+    def __init__(self, num_vars: int):
+        self.variables = [StatVar('x' + str(i)) for i in range(num_vars)]
+        self._positions = {var: i for i, var in enumerate(self.variables)}
+        self.tests = construct_all_tests(self.variables)
 
-    # if not multivariate_constructed: 
-    #     construct_mutlivariate_tests(combined_data)
-    #     multivariate_constructed = True
+    # @returns list of BoundTests for an analysis of the variables @param var_names (in catalog order)
+    # Binding only maps positions to names; no z3 objects are created.
+    def bind(self, var_names: List[str]):
+        assert len(var_names) == len(self.variables)
+        bound_tests = []
+        for test in self.tests: 
+            bound_props = [self.bind_property(prop, var_names) for prop in test._properties]
+            bound_tests.append(BoundTest(test, bound_props))
 
-    construct_bivariate_tests(combined_data)
-    construct_mutlivariate_tests(combined_data)
+        return bound_tests
+
+    # @returns BoundProperty for @param prop (an AppliedProperty over catalog variables)
+    def bind_property(self, prop: AppliedProperty, var_names: List[str]): 
+        return BoundProperty(prop, [var_names[self._positions[v]] for v in prop.vars])
+
+# Constructs all the tests over @param variables (List[StatVar])
+# TODO: Move to a separate file/location
+def construct_all_tests(variables: List[StatVar]): 
+    return construct_bivariate_tests(variables) + construct_mutlivariate_tests(variables)
 
 # The generic StatisticalTests have specific predefined arity.
 # Some multivariate statistical tests, however, have various arities. 
 # Therefore, support the construction of muliple generic StatisticalTests. 
-def construct_mutlivariate_tests(combined_data): 
-    construct_factorial_ANOVA(combined_data)
-    # pass
-
-factorial_ANOVA = None
-def construct_factorial_ANOVA(combined_data: CombinedData): 
-    global factorial_ANOVA
-
-    num_vars = len(combined_data.vars)
-
-    x_vars = []
-    y_vars = []
-    all_vars = []
-    for i in range(num_vars): 
-        name = 'x' + str(i)
-        if (i <= num_vars - 2): # All but the last var
-            x = StatVar(name)
-            x_vars.append(x)
-            all_vars.append(x)
-        else:
-            assert(i == num_vars - 1)
-            y = StatVar(name)
-            y_vars.append(y) # last var
-            all_vars.append(y)
+def construct_mutlivariate_tests(variables: List[StatVar]): 
+    return [construct_factorial_ANOVA(variables)]
+
+def construct_factorial_ANOVA(variables: List[StatVar]): 
+    num_vars = len(variables)
+
+    x_vars = variables[:-1] # All but the last var
+    y_vars = variables[-1:] # last var
+    all_vars = list(variables)
     assert(num_vars == len(x_vars) + len(y_vars))
 
     list_x_vars = [[v] for v in x_vars]
@@ -685,35 +694,15 @@ def construct_factorial_ANOVA(combined_data: CombinedData):
                                 eq_variance: pairs_list # Variable number of factors
                                 }) 
 
+    return factorial_ANOVA
 
-pearson_corr = None
-kendalltau_corr = None
-spearman_corr = None
-pointbiserial_corr_a = None
-pointbiserial_corr_b = None
-students_t = None
-paired_students_t = None
-welchs_t = None 
-mannwhitney_u = None
-chi_square = None
-fishers_exact = None 
-f_test = None    
-rm_one_way_anova = None
-kruskall_wallis = None
-friedman = None
-def construct_bivariate_tests(combined_data: CombinedData): 
-    global pearson_corr, kendalltau_corr, spearman_corr, pointbiserial_corr_a, pointbiserial_corr_b
-    global students_t, paired_students_t, welchs_t, mannwhitney_u
-    global chi_square, fishers_exact
-    global f_test, kruskall_wallis, friedman, rm_one_way_anova
-
+def construct_bivariate_tests(variables: List[StatVar]): 
     # Bivariate analyses only make sense when there are two variables
     # in combined_data
-    if len(combined_data.vars) == 2: 
+    if len(variables) == 2: 
 
         ### CORRELATIONS
-        x0 = StatVar('x0')
-        x1 = StatVar('x1')
+        x0, x1 = variables
 
         pearson_corr = StatisticalTest('pearson_corr', [x0, x1],
                                         test_properties=
@@ -763,8 +752,7 @@ def construct_bivariate_tests(combined_data: CombinedData):
                                         })                                
 
         ### T-TESTS
-        x = StatVar('x')
-        y = StatVar('y')
+        x, y = variables
 
         students_t = StatisticalTest('students_t', [x, y],
                                     test_properties=
@@ -878,6 +866,13 @@ def construct_bivariate_tests(combined_data: CombinedData):
                                 three_or_more_categories: [[x]],
                                 }) 
 
+        return [pearson_corr, kendalltau_corr, spearman_corr, pointbiserial_corr_a, pointbiserial_corr_b,
+                students_t, welchs_t, mannwhitney_u, paired_students_t, wilcoxon_signed_rank, 
+                chi_square, fishers_exact, 
+                f_test, kruskall_wallis, rm_one_way_anova, friedman]
+
+    return []
+
 
 """
 
@@ -892,31 +887,93 @@ chi_square_test = StatisticalTest('chi_square', [x, y],
                                    })
 """
 
-# Verify the property against data
-def verify_prop(dataset: Dataset, combined_data: CombinedData, prop:AppliedProperty):
-    global alpha
-
-    if (len(prop.vars) == len(combined_data.vars)):
-        kwargs = {'dataset': dataset, 'var_data': combined_data, 'alpha': alpha}
-        if __property_to_function__ == {}:
-            prop_val = prop.property.function(**kwargs)
+# Results of verifying properties during one synthesize_tests run. 
+# Many tests share applied properties (e.g., eq_variance(x, y) for students_t, paired_students_t, f_test), 
+# and assumptions are verified too, so without memoizing the same statistical check 
+# (Shapiro-Wilk, Levene, ...) would run once per test that needs it.
+# Entries are keyed by property name, the names of the variables it applies to, the data selected 
+# for them (e.g., a filter such as "score > 5"), whether those are all the variables in the analysis 
+# (the check is then passed the CombinedData), and alpha.
+# @param results can be shared by the memos of several runs against the same dataset and 
+# design (see Session.hypothesize_many), so that each check runs once across all of them.
+class PropertyMemo(object):
+
+    def __init__(self, alpha: float, results: dict=None):
+        self.alpha = alpha # significance level of the statistical checks
+        self.hits = 0
+        self.misses = 0
+        self._results = {} if results is None else results # key -> (value, property_test_results)
+        self._traced = set() # keys in trace
+        self.trace = [] # (AppliedProperty, value) for statistical properties, in the order this run checked them
+
+    def verify(self, dataset: Dataset, combined_data: CombinedData, prop: BoundProperty):
+        key = self._key(combined_data, prop)
+
+        if key in self._results: 
+            self.hits += 1
+            instrumentation.count('property_memo.hit', property=prop.property.name)
+            val, prop.property_test_results = self._results[key]
         else: 
-            prop_val = __property_to_function__[prop.__z3__](**kwargs)    
+            self.misses += 1
+            instrumentation.count('property_memo.miss', property=prop.property.name)
+            val = _verify_prop(dataset, combined_data, prop, self.alpha)
+            self._results[key] = (val, prop.property_test_results)
+
+        if prop.property.statistical and key not in self._traced: 
+            self._traced.add(key)
+            self.trace.append((prop.applied, val))
+
+        return val
+
+    # Sets the test results of @param prop if it has been verified
+    def restore(self, combined_data: CombinedData, prop: BoundProperty):
+        key = self._key(combined_data, prop)
+
+        if key in self._results: 
+            prop.property_test_results = self._results[key][1]
+
+    def __len__(self):
+        return len(self._results)
+
+    def _key(self, combined_data: CombinedData, prop: BoundProperty):
+        queries = {v.metadata[name]: v.metadata.get(query, '') for v in combined_data.vars}
+        selection = tuple(queries.get(var_name, '') for var_name in prop.var_names)
+        return (prop.property.name, tuple(prop.var_names), selection, len(prop.var_names) == len(combined_data.vars), self.alpha)
+
+# Verify the property against data, at the alpha of @param combined_data unless @param memo is given
+def verify_prop(dataset: Dataset, combined_data: CombinedData, prop: BoundProperty, memo: PropertyMemo=None):
+    if memo is not None: 
+        return memo.verify(dataset, combined_data, prop)
+
+    return _verify_prop(dataset, combined_data, prop, combined_data.alpha)
+
+def _verify_prop(dataset: Dataset, combined_data: CombinedData, prop: BoundProperty, alpha: float):
+    with instrumentation.stage('verify_prop', property=prop.property.name, vars=list(prop.var_names)) as attributes: 
+        try: 
+            val = _check_prop(dataset, combined_data, prop, alpha)
+        except FullDataRequired as e: 
+            # e.g., in streaming mode, a property that cannot be checked does not hold
+            log(f"\nCannot check {prop.property.name}: {e}")
+            val = False
+        attributes['value'] = bool(val)
+    return val
+
+def _check_prop(dataset: Dataset, combined_data: CombinedData, prop: BoundProperty, alpha: float):
+    if (len(prop.var_names) == len(combined_data.vars)):
+        kwargs = {'dataset': dataset, 'var_data': combined_data, 'alpha': alpha}
+        prop_val = prop.property.function(**kwargs)
     else: 
-        assert (len(prop.vars) < len(combined_data.vars))
+        assert (len(prop.var_names) < len(combined_data.vars))
         var_data = []
         # For each of the variables for which we are checking the current prop
-        for test_var in prop.vars:
+        for var_name in prop.var_names:
             # For each variable in all variables in combined data
             for var in combined_data.vars:
-                if var.metadata[name] == test_var.name:
+                if var.metadata[name] == var_name:
                     var_data.append(var)
         kwargs = {'dataset': dataset, 'var_data': var_data, 'alpha': alpha}
         # import pdb; pdb.set_trace()
-        if __property_to_function__ == {}:
-            prop_val = prop.property.function(**kwargs)
-        else: 
-            prop_val = __property_to_function__[prop.__z3__](**kwargs)
+        prop_val = prop.property.function(**kwargs)
 
     ret_val = None
     if isinstance(prop_val, tuple):
@@ -929,16 +986,16 @@ def verify_prop(dataset: Dataset, combined_data: CombinedData, prop:AppliedPrope
     return ret_val
 
 # Assumes properties to hold
-def assume_properties(stat_var_map, assumptions: Dict[str,str], solver, dataset, combined_data): 
-    global assumptions_to_properties, alpha
+# @param mode is how failed assumptions are treated ('strict' or 'relaxed')
+# Properties are verified without holding __z3_lock__, which is only taken to create z3 objects.
+def assume_properties(stat_var_map, assumptions: Dict[str,str], solver, dataset, combined_data, memo: PropertyMemo=None, mode: str='strict'): 
+    global assumptions_to_properties
 
     assumed_props = []
 
     # Go through all assumptions
     for a in assumptions: 
-        if a in alpha_keywords:
-            alpha = float(assumptions[a])
-        elif a in assumptions_to_properties:
+        if a in assumptions_to_properties:
             # Apply corresponding properties to all variables for which the property is assumed
             for prop in all_props(): 
                 if prop.name in assumptions_to_properties[a]: 
@@ -950,51 +1007,57 @@ def assume_properties(stat_var_map, assumptions: Dict[str,str], solver, dataset,
                         if isinstance(var, str):
                             assert var in stat_var_map 
                             # stat_vars.append(stat_var_map[var]) 
-                            ap = prop(stat_var_map[var]) 
+                            with __z3_lock__: 
+                                ap = BoundProperty(prop(stat_var_map[var]), [var])
                             assumed_props.append(ap)
 
                             # CHECK ASSUMPTIONS HERE
-                            val = verify_prop(dataset, combined_data, ap)
-                            if MODE == 'strict': 
+                            val = verify_prop(dataset, combined_data, ap, memo)
+                            if mode == 'strict': 
                                 log_debug(f"Running under STRICT mode.")
                                 if val: 
                                     log_debug(f"User asserted property: {prop.name} is supported by statistical checking. Tea agrees with the user.")
                                 else: 
                                     log_debug(f"User asserted property: {prop.name}, but is NOT supported by statistical checking. Tea will override user assertion.") 
-                                solver.add(ap.__z3__ == z3.BoolVal(val))
-                            elif MODE == 'relaxed': 
+                                with __z3_lock__: 
+                                    solver.add(ap.__z3__ == z3.BoolVal(val))
+                            elif mode == 'relaxed': 
                                 log_debug(f"Running under RELAXED mode.")
                                 if val: 
                                     log_debug(f"User asserted property: {prop.name} is supported by statistical checking. Tea agrees with the user.")
                                 else: 
                                     log_debug(f"User asserted property: {prop.name}, but is NOT supported by statistical checking. User assertion will be considered true.")
-                                solver.add(ap.__z3__ == z3.BoolVal(val))
+                                with __z3_lock__: 
+                                    solver.add(ap.__z3__ == z3.BoolVal(val))
                             else: 
-                                raise ValueError(f"Invalid MODE: {MODE}")
+                                raise ValueError(f"Invalid MODE: {mode}")
                         else: 
                             assert isinstance(var, list)
                             stat_vars = [stat_var_map[v] for v in var]
-                            ap = prop(*stat_vars)
+                            with __z3_lock__: 
+                                ap = BoundProperty(prop(*stat_vars), var)
                             assumed_props.append(ap)
 
                             # CHECK ASSUMPTIONS HERE
-                            val = verify_prop(dataset, combined_data, ap)
-                            if MODE == 'strict': 
+                            val = verify_prop(dataset, combined_data, ap, memo)
+                            if mode == 'strict': 
                                 log_debug(f"Running under STRICT mode.")
                                 if val: 
                                     log_debug(f"User asserted property: {prop.name} is supported by statistical checking. Tea agrees with the user.")
                                 else: 
                                     log_debug(f"User asserted property: {prop.name}, but is NOT supported by statistical checking. Tea will override user assertion.")
-                                solver.add(ap.__z3__ == z3.BoolVal(val))
-                            elif MODE == 'relaxed': 
+                                with __z3_lock__: 
+                                    solver.add(ap.__z3__ == z3.BoolVal(val))
+                            elif mode == 'relaxed': 
                                 log_debug(f"Running under RELAXED mode.")
                                 if val: 
                                     log_debug(f"User asserted property: {prop.name} is supported by statistical checking. Tea agrees with the user.")
                                 else: 
                                     log_debug(f"User asserted property: {prop.name}, but is NOT supported by statistical checking. User assertion will be considered true.")
-                                solver.add(ap.__z3__ == z3.BoolVal(val))
+                                with __z3_lock__: 
+                                    solver.add(ap.__z3__ == z3.BoolVal(val))
                             else: 
-                                raise ValueError(f"Invalid MODE: {MODE}")
+                                raise ValueError(f"Invalid MODE: {mode}")
         else:
             pass
     # import pdb; pdb.set_trace()
@@ -1003,144 +1066,177 @@ def assume_properties(stat_var_map, assumptions: Dict[str,str], solver, dataset,
 # Helper for synthesize tests
 def is_assumed_prop(assumed_props, prop):
     for ap in assumed_props:
-        if prop == ap: 
+        if prop.applied == ap.applied: 
             return True
     
     return False
 
 
+# @returns hashable description of everything other than the data values that decides which 
+# tests are valid for combined_data: the declared type, number of categories, and role of each 
+# variable (in catalog order), the study type, whether observations are paired, alpha, the mode, 
+# and the properties the user assumes (by variable position). Variable names are not part of it.
+def synthesis_signature(combined_data: CombinedData, assumptions: Dict[str,str], var_names: List[str], alpha: float, mode: str):
+    vars = []
+    for v in combined_data.vars: 
+        num_categories = len(v.metadata[categories]) if v.is_categorical() and v.metadata[categories] else None
+        vars.append((v.metadata[data_type].name, num_categories, v.role))
+
+    positions = {var_name: i for i, var_name in enumerate(var_names)}
+    assumed = []
+    for a in assumptions: 
+        if a in assumptions_to_properties: 
+            for var in assumptions[a]: 
+                if isinstance(var, str): 
+                    assumed.append((a, (positions.get(var),)))
+                else: 
+                    assumed.append((a, tuple(positions.get(v) for v in var)))
+
+    return (tuple(vars), combined_data.study_type, combined_data.properties.get(paired), alpha, mode, tuple(assumed))
+
 # Problem statement: Given a set of properties, tell me which tests are valid to run
 # This is a concrete (rather than symbolic) problem 
 # @param combined_data CombinedData object
-# @returns list of Property objects that combined_data exhibits
-def synthesize_tests(dataset: Dataset, assumptions: Dict[str,str], combined_data: CombinedData):    
-    construct_all_tests(combined_data)
-
+# @param mode is how failed assumptions are treated ('strict' or 'relaxed')
+# @param cache is the SynthesisCache to look up and store selections in, the process-level cache by default
+# @param property_results is shared by runs that should not repeat property checks (see PropertyMemo)
+# @returns list of BoundTests that are valid for combined_data
+# Alpha (from the assumptions, otherwise combined_data's) and mode are passed along rather than 
+# read from module state, so concurrent analyses with different settings do not interfere.
+# How many property checks the run did and reused is recorded in its synthesize_tests stage.
+def synthesize_tests(dataset: Dataset, assumptions: Dict[str,str], combined_data: CombinedData, mode: str='strict', cache: SynthesisCache=None, property_results: dict=None):    
+    with instrumentation.stage('synthesize_tests', vars=[v.metadata[name] for v in combined_data.vars]) as attributes: 
+        tests, memo = _synthesize_tests(dataset, assumptions, combined_data, mode, cache, property_results)
+        attributes['tests'] = [test.name for test in tests]
+        attributes['property_checks'] = memo.misses
+        attributes['property_checks_reused'] = memo.hits
+    return tests
+
+# @returns the tests to conduct and the PropertyMemo of the run
+def _synthesize_tests(dataset: Dataset, assumptions: Dict[str,str], combined_data: CombinedData, mode: str='strict', cache: SynthesisCache=None, property_results: dict=None):    
     global name
-    stat_var_map = {}
+
+    if cache is None: 
+        cache = synthesis_cache
 
     # Reorder variables so that y var is at the end
     combined_data._update_vars() 
 
-    # Compute unique statisical variable names from the combined data.
-    combined_data_vars = []
-    for v in combined_data.vars:
-        var = StatVar(v.metadata[name])
-        stat_var_map[v.metadata[name]] = var 
-        combined_data_vars.append(var)
+    # Bind the catalog of tests to the variables in combined_data (by position)
+    catalog = test_catalog(len(combined_data.vars))
+    var_names = [v.metadata[name] for v in combined_data.vars]
+    tests = catalog.bind(var_names)
+    stat_var_map = dict(zip(var_names, catalog.variables))
 
+    # Set alpha before checking any property so that checks do not depend on the order of assumptions
+    run_alpha = combined_data.alpha
+    for a in assumptions: 
+        if a in alpha_keywords:
+            run_alpha = float(assumptions[a])
+    memo = PropertyMemo(run_alpha, property_results)
+
+    # Have tests been selected for an analysis with the same signature and property outcomes?
+    signature = synthesis_signature(combined_data, assumptions, var_names, run_alpha, mode)
+    check = lambda prop: verify_prop(dataset, combined_data, catalog.bind_property(prop, var_names), memo)
+    cached = cache.get(signature, check)
+    if cached is not None: 
+        log_debug(f"Tests selected for an analysis with the same signature: {signature}")
+        tests_to_conduct = [tests[i] for i in cached]
+        for test in tests_to_conduct: 
+            for prop in test._properties: 
+                memo.restore(combined_data, prop)
+        return tests_to_conduct, memo
+
+    # Only z3 calls hold __z3_lock__; properties are verified against the data without it
+    with __z3_lock__: 
+        solver = z3.Solver()
+        # s = Tactic('qflia').solver()
     # Assume properties based on user assumptions and mode
-    solver = z3.Solver()
-    # s = Tactic('qflia').solver()
-    assumed_props = assume_properties(stat_var_map, assumptions, solver, dataset, combined_data)
+    assumed_props = assume_properties(stat_var_map, assumptions, solver, dataset, combined_data, memo, mode)
     # import pdb; pdb.set_trace()
 
-    # Update the arity of test-level properties
-    for prop in test_props: 
-        prop._update(len(combined_data.vars))
-
-    # Apply all tests to the variables we are considering now in combined_data
-    for test in all_tests(): 
-        test.apply(*combined_data_vars)
-
-    solver.push() # Create backtracking point
-    model = None # Store model
-
-    # For each test, add it to the solver as a constraint. 
-    # Add the tests and their properties
-    for test in all_tests():
+    # Each test is checked against the same base solver, assuming the tracking literals 
+    # of its properties (see AppliedProperty). Verified property values are added to 
+    # the base solver as facts, so a test is unsat when one of its properties is known 
+    # not to hold. The unsat core names those properties; later tests that need all of 
+    # the properties in a core are pruned without calling the solver.
+    tracked = set() # names of tracking literals defined in the solver
+    unsat_cores = [] # sets of tracking literal names
+    num_checks = 0
+    solved = True
+    tests_to_conduct = []
+    for test in tests:
         log_debug(f"\nCurrently considering {test.name}")
-        solver.add(test.__z3__ == z3.And(*test.query()))
-        solver.add(test.__z3__ == z3.BoolVal(True))
+        names = {prop.applied._track_name for prop in test._properties}
+        if any(core <= names for core in unsat_cores): 
+            log_debug("Test is unsat (pruned).\n")
+            instrumentation.count('z3_check.pruned', test=test.name)
+            continue
 
         # Check the model 
-        result = solver.check()
+        with __z3_lock__: 
+            literals = []
+            for prop in test._properties: 
+                if prop.applied._track_name not in tracked: 
+                    solver.add(prop.applied.__track__ == prop.__z3__)
+                    tracked.add(prop.applied._track_name)
+                literals.append(prop.applied.__track__)
+
+            with instrumentation.stage('z3_check', test=test.name) as attributes: 
+                result = solver.check(*literals)
+                attributes['result'] = str(result)
+            if result == z3.unsat:
+                unsat_cores.append({str(l) for l in solver.unsat_core()})
+        num_checks += 1
         if result == z3.unsat:
-            # import pdb; pdb.set_trace()
             log_debug("Test is unsat.\n")
-            solver.pop() 
         elif result == z3.unknown:
             print("failed to solve")
-            try:
-                pass
-            except z3.Z3Exception:
-                return
+            solved = False
         else:
-            model = solver.model()
             test_invalid = False
-            # Does the test apply?
-            # Would this ever be false??
-            if model and z3.is_true(model.evaluate(test.__z3__)):
-                # Verify the properties for that test
-                for prop in test._properties:
-                    if is_assumed_prop(assumed_props, prop):
-                        log_debug(f"User asserted property: {prop._name}.")
-                    else: 
-                        log_debug(f"Testing assumption: {prop._name}.")
-                    
-                    # Does this property need to hold for the test to be valid?
-                    # If so, verify that the property does hold
-                    if model and z3.is_true(model.evaluate(prop.__z3__)):
-                        val = verify_prop(dataset, combined_data, prop)
-                        if val: 
-                            log_debug(f"Property holds.")
-                        if not val: 
-                            if not test_invalid: # The property does not check
-                                # if not is_assumed_prop(assumed_props, prop): 
-                                #     if MODE == 'strict': 
-                                #         log_debug(f"Running under STRICT mode.")
-                                #         log_debug(f"User asserted ({prop._name}) FAILS. Tea will override user assertion.")
-                                        
-                                #         # Remove the last test
-                                #         solver.pop() 
-                                #         test_invalid = True
-                                #         model = None
-                                #     elif MODE == 'relaxed': 
-                                #         log_debug(f"Running under RELAXED mode.")
-                                #         log_debug(f"User asserted ({prop._name}) FAILS. User assertion will be considered true.")
-                                #     else: 
-                                #         raise ValueError(f"Invalid MODE: {MODE}")
-                                # else: 
-                                    log_debug(f"Property FAILS")
-                                    solver.pop() # remove the last test
-                                    test_invalid = True
-                                    model = None
-                            else: # test is already invalid. Going here just for completeness of logging
-                                log_debug(f"EVER GET HERE?")
-                        solver.add(prop.__z3__ == z3.BoolVal(val))
-        solver.push() # Push latest state as backtracking point
+            # Verify the properties for that test
+            for prop in test._properties:
+                if is_assumed_prop(assumed_props, prop):
+                    log_debug(f"User asserted property: {prop._name}.")
+                else: 
+                    log_debug(f"Testing assumption: {prop._name}.")
+            
+                val = verify_prop(dataset, combined_data, prop, memo)
+                with __z3_lock__: 
+                    solver.add(prop.__z3__ == z3.BoolVal(val))
+                if val: 
+                    log_debug(f"Property holds.")
+                else: 
+                    log_debug(f"Property FAILS")
+                    unsat_cores.append({prop.applied._track_name})
+                    test_invalid = True
+                    break
 
+            if not test_invalid: 
+                tests_to_conduct.append(test)
 
-        
-        
-    solver.check()
-    model = solver.model() # final model
-    # import pdb; pdb.set_trace()
-    tests_to_conduct = []
-    # Could add all the test props first 
-    # Then add all the tests 
-    for test in all_tests():
-        if model and z3.is_true(model.evaluate(test.__z3__)):
-            tests_to_conduct.append(test.name)
-        elif not model: # No test applies
-            pass
+    log_debug(f"Solver checks: {num_checks} for {len(tests)} tests")
+    log_debug(f"Property checks: {memo.misses} run, {memo.hits} reused")
+
+    if solved: 
+        cache.add(signature, memo.trace, [tests.index(test) for test in tests_to_conduct])
 
-    reset_all_tests()
-    return tests_to_conduct
+    return tests_to_conduct, memo
 
 def which_props(tests_names: list, var_names: List[str]):
-    stat_vars: List[StatVar] = []
-    for var_name in var_names:
-        stat_vars.append(StatVar(var_name))
+    with __z3_lock__: 
+        return _which_props(tests_names, var_names)
 
-    axioms = construct_axioms(stat_vars)
+def _which_props(tests_names: list, var_names: List[str]):
+    catalog = test_catalog(len(var_names))
+    axioms = construct_axioms(catalog.variables)
 
-    tests: List[StatisticalTest] = []
+    bound_tests = catalog.bind(var_names)
+    tests: List[BoundTest] = []
     for test_name in tests_names:
-        for test in all_tests():
+        for test in bound_tests:
             if test.name == test_name:
-                test.apply(*stat_vars)
-                test._populate_properties() 
                 tests.append(test)
 
     test_queries = []
@@ -1202,8 +1298,8 @@ def which_props(tests_names: list, var_names: List[str]):
             # TODO: Unprotect test._properties.
             for test_property in test._properties:
                 property_identifier = ""# test_property._name
-                for test_var in test_property.test_vars:
-                    property_identifier += "variable %s : " % test_var.name
+                for var_name in test_property.var_names:
+                    property_identifier += "variable %s : " % var_name
                 property_identifier += test_property._name
                 property_result = bool(model.evaluate(test_property.__z3__))
                 _tests_and_properties[test_name][property_identifier] = property_result
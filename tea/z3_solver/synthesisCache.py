@@ -0,0 +1,70 @@
+import tea.instrumentation as instrumentation
+
+import threading
+
+# Process-level cache of test selection results so that repeated analyses with the
+# same shape (e.g., a two-level nominal variable vs. a continuous variable) skip the z3 search.
+# Which tests are valid depends only on a signature of the analysis (variable types, category
+# counts, roles, study type, paired observations, alpha, mode, assumptions) and on the outcomes
+# of the statistical properties (normality, equal variance, ...) that are checked along the way.
+# For each signature, the cache holds a decision tree: internal nodes are the statistical
+# properties in the order the search checked them, with one child per outcome, and leaves
+# are the tests that were selected.
+class SynthesisCache(object):
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._trees = {} # signature -> _Node
+        self._lock = threading.Lock()
+
+    # @param check is called with the property of each node on the path and returns its outcome
+    # @returns the tests stored for @param signature and the outcomes of check, None on a miss
+    def get(self, signature, check):
+        node = self._trees.get(signature)
+        while node is not None and node.prop is not None:
+            node = node.children.get(bool(check(node.prop)))
+
+        if node is None or node.tests is None:
+            self.misses += 1
+            instrumentation.count('synthesis_cache.miss')
+            return None
+
+        self.hits += 1
+        instrumentation.count('synthesis_cache.hit')
+        return node.tests
+
+    # @param trace is the list of (property, outcome) checked by the search, in order
+    def add(self, signature, trace: list, tests: list):
+        with self._lock:
+            node = self._trees.setdefault(signature, _Node())
+            for prop, val in trace:
+                if node.prop is None:
+                    if node.tests is not None:
+                        return # The search should be deterministic; do not cache otherwise
+                    node.prop = prop
+                elif node.prop is not prop:
+                    return
+                node = node.children.setdefault(bool(val), _Node())
+
+            if node.prop is None:
+                node.tests = list(tests)
+
+    def clear(self):
+        with self._lock:
+            self._trees.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._trees)
+
+class _Node(object):
+
+    def __init__(self):
+        self.prop = None # property checked at this node, None for leaves
+        self.children = {} # outcome -> _Node
+        self.tests = None # tests selected, set for leaves
+
+# Cache shared by all analyses in this process
+synthesis_cache = SynthesisCache()
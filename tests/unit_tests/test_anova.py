@@ -0,0 +1,123 @@
+from tea.build import nominal, ratio
+from tea.global_vals import iv_identifier, dv_identifier, experiment_identifier
+from tea.runtimeDataStructures.dataset import Dataset
+from tea.runtimeDataStructures.varData import VarData
+from tea.runtimeDataStructures.combinedData import CombinedData
+from tea.helpers.evaluateHelperMethods import type2_anova, factorial_ANOVA, rm_one_way_anova, friedman
+
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+import statsmodels.formula.api as smf
+from statsmodels.stats.anova import AnovaRM
+from scipy import stats
+import pytest
+
+variables = [
+    nominal('a', ['p', 'q', 'r']),
+    nominal('b', ['x', 'y']),
+    nominal('c', ['u', 'v', 'w', 'z']),
+    ratio('score')
+]
+
+# Unbalanced design, so that type I and type II sums of squares differ
+def make_dataset(tmp_path, rows=2000):
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({
+        'pid': np.arange(rows),
+        'a': rng.choice(['p', 'q', 'r'], rows, p=[0.5, 0.3, 0.2]),
+        'b': rng.choice(['x', 'y'], rows, p=[0.7, 0.3]),
+        'c': rng.choice(['u', 'v', 'w', 'z'], rows)
+    })
+    data['score'] = rng.normal(size=rows) + (data['a'] == 'p') * 0.3 + (data['b'] == 'x') * (data['c'] == 'u') * 0.5
+    data.loc[::50, 'score'] = np.nan
+    path = tmp_path / 'data.csv'
+    data.to_csv(path, index=False)
+    return Dataset(str(path), variables, 'pid')
+
+def anova_lm(dataset, factors):
+    model = smf.ols('score ~ ' + ' * '.join(f"C({f})" for f in factors), data=dataset.data).fit()
+    return sm.stats.anova_lm(model, typ=2)
+
+def test_cell_statistics(tmp_path):
+    dataset = make_dataset(tmp_path)
+    cells = dataset.cell_statistics('score', ['a', 'b'])
+
+    assert cells is dataset.cell_statistics('score', ['a', 'b'])
+    assert cells.num_levels == [3, 2]
+    assert cells.count() == dataset.data['score'].notna().sum()
+    expected = dataset.data.groupby(['a', 'b'], observed=True)['score']
+    assert np.allclose(np.sort(cells.means), np.sort(expected.mean().to_numpy()))
+    assert np.isclose(cells.within_ss, (expected.var() * (expected.count() - 1)).sum())
+
+def test_type2_anova_equals_anova_lm(tmp_path):
+    dataset = make_dataset(tmp_path)
+
+    for factors in [['a'], ['a', 'b'], ['a', 'b', 'c']]:
+        table = type2_anova(dataset.cell_statistics('score', factors))
+        expected = anova_lm(dataset, factors)
+        assert sorted(table.index) == sorted(expected.index)
+        assert np.allclose(table.to_numpy(dtype=float), expected.loc[table.index, table.columns].to_numpy(dtype=float), equal_nan=True)
+
+def test_factorial_anova(tmp_path):
+    dataset = make_dataset(tmp_path)
+    vars = []
+    for col, role in [('a', iv_identifier), ('b', iv_identifier), ('score', dv_identifier)]:
+        var = dataset.get_variable(col)
+        vars.append(VarData({'var_name': col, 'dtype': var.dtype, 'categories': var.categories, 'query': None}, role=role))
+
+    result = factorial_ANOVA(dataset, None, CombinedData(vars, study_type=experiment_identifier))
+    expected = anova_lm(dataset, ['a', 'b']).loc['C(b)']
+    assert np.isclose(result.test_statistic, expected['F'])
+    assert np.isclose(result.p_value, expected['PR(>F)'])
+    assert result.dof == expected['df']
+
+# Repeated measures: every subject in every condition, rows shuffled and some values repeated
+def make_within_dataset(tmp_path, subjects=40):
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({
+        'sid': np.repeat(np.arange(subjects), 4),
+        'time': np.tile(['t1', 't2', 't3', 't4'], subjects)
+    })
+    data['score'] = np.round(rng.normal(size=len(data)) + np.repeat(rng.normal(size=subjects), 4), 1) # ties
+    data = pd.concat([data, data.iloc[::7].assign(score=lambda d: d['score'] + 1)]).sample(frac=1, random_state=0)
+    path = tmp_path / 'within.csv'
+    data.to_csv(path, index=False)
+    return Dataset(str(path), [nominal('time', ['t1', 't2', 't3', 't4']), ratio('score')], 'sid'), data
+
+def within_data(dataset):
+    vars = []
+    for col, role in [('time', iv_identifier), ('score', dv_identifier)]:
+        var = dataset.get_variable(col)
+        vars.append(VarData({'var_name': col, 'dtype': var.dtype, 'categories': var.categories, 'query': None}, role=role))
+    return CombinedData(vars, study_type=experiment_identifier)
+
+def test_subject_pivot(tmp_path):
+    dataset, data = make_within_dataset(tmp_path)
+    pivot = dataset.subject_pivot('score', 'time')
+
+    assert pivot is dataset.subject_pivot('score', 'time')
+    assert pivot.categories == ['t1', 't2', 't3', 't4']
+    expected = data.pivot_table(index='sid', columns='time', values='score', aggfunc='mean').loc[pivot.subjects]
+    assert np.allclose(pivot.complete(), expected.to_numpy())
+
+def test_repeated_measures_tests(tmp_path):
+    dataset, data = make_within_dataset(tmp_path)
+    design = {'within subjects': 'time'}
+
+    result = rm_one_way_anova(dataset, None, design, within_data(dataset))
+    expected = AnovaRM(data, depvar='score', subject='sid', within=['time'], aggregate_func='mean').fit().anova_table.loc['time']
+    assert np.isclose(result.test_statistic, expected['F Value'])
+    assert np.isclose(result.p_value, expected['Pr > F'])
+    assert result.dof == (expected['Num DF'], expected['Den DF'])
+
+    result = friedman(dataset, None, within_data(dataset))
+    means = data.groupby(['sid', 'time'])['score'].mean().unstack()
+    assert np.allclose([result.test_statistic, result.p_value], stats.friedmanchisquare(*means.to_numpy().T))
+
+def test_missing_cells_are_reported(tmp_path):
+    dataset, data = make_within_dataset(tmp_path)
+    dataset.data = dataset.data[~((dataset.data['sid'] == 3) & (dataset.data['time'] == 't2'))]
+
+    with pytest.raises(ValueError, match='3 in t2'):
+        friedman(dataset, None, within_data(dataset))
@@ -0,0 +1,22 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def test_benchmark_suite_reports_stages(tmp_path): 
+    output = tmp_path / 'results.json'
+    script = os.path.join(ROOT, 'benchmarks', 'run_benchmarks.py')
+    subprocess.run([sys.executable, script, '--rows', '200', '--categories', '2', '--dtypes', 'ratio', '--paired', 'both', '--repeat', '1', '--output', str(output)], check=True, capture_output=True)
+
+    results = json.loads(output.read_text())['results']
+    assert [r['paired'] for r in results] == [False, True]
+    for r in results: 
+        assert r['rows'] == 200
+        assert {'load', 'synthesize_tests', 'z3_check', 'verify_prop', 'execute_test', 'format', 'hypothesize'} <= set(r['stages'])
+        assert r['stages']['hypothesize']['calls'] == r['hypotheses'] == 1
+        assert r['counters']['dataset_cache.miss'] == 1
+        assert r['stages']['execute_test']['calls'] >= 1
+        assert r['failed_tests'] == []
+        assert r['peak_memory_bytes'] > 0
@@ -0,0 +1,45 @@
+import tea
+from tea.helpers.bootstrap import bootstrap, bootstrap_distribution, make_options, DEFAULT_OPTIONS
+
+import numpy as np
+import pytest
+
+values = np.random.default_rng(0).normal(10, 2, 200)
+
+def test_bootstrap_interval():
+    result = bootstrap(values, seed=1)
+
+    assert result.value == np.median(values)
+    assert result.lower_bound < result.value < result.upper_bound
+    assert result.upper_bound - result.lower_bound < 2
+
+def test_bootstrap_reproducible():
+    max_elements = len(values) * 300 # 4 chunks
+    expected = bootstrap_distribution(values, np.median, 1000, seed=1, max_elements=max_elements)
+
+    assert len(expected) == 1000
+    assert np.array_equal(bootstrap_distribution(values, np.median, 1000, seed=1, max_elements=max_elements), expected)
+    assert np.array_equal(bootstrap_distribution(values, np.median, 1000, seed=1, workers=2, max_elements=max_elements), expected)
+    assert not np.array_equal(bootstrap_distribution(values, np.median, 1000, seed=2, max_elements=max_elements), expected)
+
+def test_bootstrap_statistic():
+    result = bootstrap(values, stat_func=np.mean, iterations=500, seed=1)
+
+    assert result.value == pytest.approx(values.mean())
+
+def test_bootstrap_options():
+    options = make_options(iterations=100, seed=3)
+    assert options['iterations'] == 100
+    assert make_options(options, workers=2) == dict(options, workers=2)
+    assert bootstrap(values, **options) == bootstrap(values, **options)
+    with pytest.raises(ValueError):
+        make_options(workers=0)
+    assert DEFAULT_OPTIONS['seed'] is None
+
+def test_sessions_keep_their_options():
+    first, second = tea.Session(), tea.Session()
+    first.set_bootstrap_options(iterations=100, seed=3)
+    second.set_bootstrap_options(seed=4)
+
+    assert (first.bootstrap_options['iterations'], first.bootstrap_options['seed']) == (100, 3)
+    assert (second.bootstrap_options['iterations'], second.bootstrap_options['seed']) == (DEFAULT_OPTIONS['iterations'], 4)
@@ -0,0 +1,121 @@
+import tea
+from tea.build import nominal, ordinal, ratio
+from tea.helpers.evaluateHelperMethods import compare_outcomes
+from tea.runtimeDataStructures.dataset import Dataset
+from tea.runtimeDataStructures.testResult import TestFailure
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+def write_csv(tmp_path, num_groups=2, rows=200):
+    rng = np.random.default_rng(0)
+    group = rng.choice(['a', 'b', 'c'][:num_groups], rows)
+    shift = (group == 'a') * 0.5
+    data = pd.DataFrame({
+        'pid': np.arange(rows),
+        'condition': group,
+        'equal': rng.normal(size=rows) + shift, # normal groups of equal variance
+        'unequal': rng.normal(size=rows) * np.where(group == 'a', 1, 4), # normal groups of unequal variance
+        'skewed': rng.exponential(size=rows) + shift,
+        'level': rng.choice(['low', 'mid', 'high'], rows)
+    })
+    path = tmp_path / 'data.csv'
+    data.to_csv(path, index=False)
+    return str(path)
+
+outcomes = ['equal', 'unequal', 'skewed', 'level']
+
+def make_session(path):
+    session = tea.Session()
+    session.data(path, key='pid')
+    session.define_variables([
+        {'name': 'condition', 'data type': 'nominal', 'categories': ['a', 'b']},
+        {'name': 'equal', 'data type': 'ratio'},
+        {'name': 'unequal', 'data type': 'ratio'},
+        {'name': 'skewed', 'data type': 'ratio'},
+        {'name': 'level', 'data type': 'ordinal', 'categories': ['low', 'mid', 'high']}
+    ])
+    session.define_study_design({
+        'study type': 'experiment',
+        'independent variables': 'condition',
+        'dependent variables': outcomes,
+        'between subjects': 'condition'
+    })
+    session.assume({'Type I (False Positive) Error Rate': 0.05})
+    return session
+
+# Each outcome gets the tests (and results) hypothesize selects for it
+def assert_equal_hypothesize(session, table):
+    for outcome in outcomes:
+        results = session.hypothesize(['condition', outcome], ['condition:a > b']).test_to_results
+        expected = {test: result for test, result in results.items() if not test.startswith('pointbiserial')}
+        rows = table[table['outcome'] == outcome].set_index('test')
+        assert sorted(rows.index) == sorted(expected)
+        for test, result in expected.items():
+            if isinstance(result, TestFailure): # e.g., a TestResult check rejects the result
+                continue
+            assert np.isclose(rows.loc[test, 'test_statistic'], result.test_statistic)
+            assert np.isclose(rows.loc[test, 'p_value'], result.p_value)
+
+def test_tests_equal_hypothesize(tmp_path):
+    session = make_session(write_csv(tmp_path))
+    table = session.relate_outcomes('condition', outcomes)
+    assert list(table['outcome'].unique()) == outcomes
+    assert list(table[table['outcome'] == 'equal']['test']) == ['students_t', 'welchs_t', 'mannwhitney_u', 'f_test', 'factorial_ANOVA', 'kruskall_wallis']
+    assert list(table[table['outcome'] == 'unequal']['test']) == ['welchs_t', 'mannwhitney_u', 'kruskall_wallis']
+    assert list(table[table['outcome'] == 'level']['test']) == ['mannwhitney_u', 'chi_square']
+    assert_equal_hypothesize(session, table)
+
+def test_unknown_normality_equal_hypothesize(tmp_path):
+    # A missing value makes the normality p-value of 'equal' NaN, which does not count as normal
+    path = write_csv(tmp_path)
+    data = pd.read_csv(path)
+    data.loc[3, 'equal'] = np.nan
+    data.to_csv(path, index=False)
+    table = make_session(path).relate_outcomes('condition', outcomes)
+    assert np.isnan(table[table['outcome'] == 'equal']['normality_p_value']).all()
+    assert list(table[table['outcome'] == 'equal']['test']) == ['mannwhitney_u', 'kruskall_wallis']
+    assert_equal_hypothesize(make_session(path), table)
+
+    # So does a group with fewer than 3 values
+    data = pd.read_csv(write_csv(tmp_path))
+    data = pd.concat([data[data['condition'] == 'a'], data[data['condition'] == 'b'].head(2)])
+    data.to_csv(path, index=False)
+    table = make_session(path).relate_outcomes('condition', outcomes)
+    assert not table['groups_normal'].any()
+    assert_equal_hypothesize(make_session(path), table)
+
+def test_many_groups_equal_scipy(tmp_path):
+    variables = [nominal('condition', ['a', 'b', 'c']), ratio('equal'), ratio('unequal'), ratio('skewed'), ordinal('level', ['low', 'mid', 'high'])]
+    dataset = Dataset(write_csv(tmp_path, num_groups=3), variables, 'pid')
+    dataset.data.loc[::9, 'skewed'] = np.nan
+
+    table = compare_outcomes(dataset, 'condition', outcomes, 0.05, correction='holm')
+    assert not table['test'].isin(['students_t', 'welchs_t', 'mannwhitney_u']).any()
+    assert list(table[table['outcome'] == 'level']['test']) == ['chi_square']
+
+    for outcome in ['equal', 'unequal', 'skewed']:
+        groups = [group.dropna() for group in dataset.select_groups(outcome, 'condition').values()]
+        row = table[(table['outcome'] == outcome) & (table['test'] == 'kruskall_wallis')].iloc[0]
+        assert np.allclose([row['test_statistic'], row['p_value']], stats.kruskal(*groups))
+    row = table[(table['outcome'] == 'equal') & (table['test'] == 'f_test')].iloc[0]
+    assert np.allclose([row['test_statistic'], row['p_value']], stats.f_oneway(*dataset.select_groups('equal', 'condition').values()))
+
+    row = table[table['outcome'] == 'level'].iloc[0]
+    assert np.allclose([row['test_statistic'], row['p_value']], stats.chi2_contingency(pd.crosstab(dataset.data['condition'], dataset.data['level']), correction=False)[:2])
+
+    kruskal = table[table['test'] == 'kruskall_wallis']
+    assert (kruskal['adjusted_p_value'] >= kruskal['p_value']).all()
+
+def test_invalid_variables(tmp_path):
+    variables = [nominal('condition', ['a', 'b']), ratio('equal'), ordinal('level', ['low', 'mid', 'high'])]
+    dataset = Dataset(write_csv(tmp_path), variables, 'pid')
+
+    with pytest.raises(ValueError):
+        compare_outcomes(dataset, 'equal', ['level'], 0.05)
+    with pytest.raises(ValueError):
+        compare_outcomes(dataset, 'condition', ['condition'], 0.05)
+    with pytest.raises(ValueError):
+        compare_outcomes(dataset, 'condition', ['equal', 'equal'], 0.05)
@@ -0,0 +1,105 @@
+import tea
+from tea.build import nominal, ordinal, ratio
+from tea.helpers.evaluateHelperMethods import correlation_matrix, adjust_p_values
+from tea.runtimeDataStructures.dataset import Dataset, FullDataRequired
+from tea.runtimeDataStructures.streamingDataset import StreamingDataset
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+from statsmodels.stats.multitest import multipletests
+
+def write_csv(tmp_path, rows=500):
+    rng = np.random.default_rng(0)
+    a = rng.normal(size=rows)
+    data = pd.DataFrame({
+        'pid': np.arange(rows),
+        'a': a,
+        'b': 0.5 * a + rng.normal(size=rows),
+        'c': rng.normal(size=rows),
+        'skewed': np.exp(a + rng.normal(size=rows)),
+        'level': rng.choice(['low', 'mid', 'high'], rows),
+        'condition': rng.choice(['x', 'y'], rows)
+    })
+    data.loc[::13, 'skewed'] = np.nan
+    path = tmp_path / 'data.csv'
+    data.to_csv(path, index=False)
+    return str(path)
+
+variables = [
+    ratio('a'),
+    ratio('b'),
+    ratio('c'),
+    ratio('skewed'),
+    ordinal('level', ['low', 'mid', 'high']),
+    nominal('condition', ['x', 'y'])
+]
+
+def test_pairs_equal_scipy(tmp_path):
+    dataset = Dataset(write_csv(tmp_path), variables, 'pid')
+    names = ['a', 'b', 'c', 'skewed', 'level']
+    matrix = correlation_matrix(dataset, names, 0.01)
+
+    assert list(matrix.coefficients.index) == names
+    assert matrix.normality['level'] is None
+    data = dataset.data.assign(level=dataset.data['level'].cat.codes)
+    for x in names:
+        for y in names:
+            if x == y:
+                continue
+            both = data[[x, y]].dropna()
+            if matrix.tests.loc[x, y] == 'pearson_corr':
+                assert {x, y} <= {'a', 'b', 'c'}
+                expected = stats.pearsonr(both[x], both[y])
+            else:
+                assert {x, y} & {'skewed', 'level'}
+                expected = stats.spearmanr(both[x], both[y])
+            assert np.allclose([matrix.coefficients.loc[x, y], matrix.p_values.loc[x, y]], expected)
+            assert matrix.counts.loc[x, y] == len(both)
+
+    pairs = matrix.pairs()
+    assert len(pairs) == 10
+    assert pairs['adjusted_p_value'].is_monotonic_increasing
+
+@pytest.mark.parametrize('method', ['bonferroni', 'holm', 'fdr_bh'])
+def test_adjust_p_values(method):
+    p_values = np.random.default_rng(0).uniform(0, 0.1, 50)
+    p_values[7] = np.nan
+
+    adjusted = adjust_p_values(p_values, method)
+    assert np.isnan(adjusted[7])
+    valid = ~np.isnan(p_values)
+    assert np.allclose(adjusted[valid], multipletests(p_values[valid], method=method)[1])
+
+def test_relate_all(tmp_path):
+    session = tea.Session()
+    session.data(write_csv(tmp_path), key='pid')
+    session.define_variables([
+        {'name': 'a', 'data type': 'ratio'},
+        {'name': 'b', 'data type': 'ratio'},
+        {'name': 'condition', 'data type': 'nominal', 'categories': ['x', 'y']}
+    ])
+
+    matrix = session.relate_all(['a', 'b'], correction='holm')
+    assert matrix.adjusted_p_values.loc['a', 'b'] == matrix.p_values.loc['a', 'b'] # one pair
+    assert matrix.pairs()['significant'].all()
+    assert 'significant' in str(matrix)
+
+    with pytest.raises(ValueError):
+        session.relate_all(['a', 'condition'])
+    with pytest.raises(ValueError):
+        session.relate_all(['a', 'b'], correction='sidak')
+
+def test_streaming(tmp_path):
+    path = write_csv(tmp_path)
+    dataset = Dataset(path, variables, 'pid')
+    streaming = StreamingDataset(path, variables, 'pid', chunksize=64)
+
+    expected = correlation_matrix(dataset, ['a', 'b'], 0.01)
+    actual = correlation_matrix(streaming, ['a', 'b'], 0.01)
+    assert np.allclose(actual.coefficients, expected.coefficients)
+    assert np.allclose(actual.p_values, expected.p_values, equal_nan=True)
+
+    with pytest.raises(FullDataRequired):
+        correlation_matrix(streaming, ['a', 'skewed'], 0.01)
@@ -0,0 +1,77 @@
+from tea.runtimeDataStructures import dataStore
+from tea.runtimeDataStructures.dataStore import DataStore
+
+import functools
+import hashlib
+import os
+import threading
+import pytest
+import requests
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+CONTENT = b'condition,score\n' + b''.join(b'%s,%d\n' % (b'ab'[i % 2:i % 2 + 1], i) for i in range(1000))
+
+# Local stand-in for a server with datasets, records the status of every response
+@pytest.fixture
+def server(tmp_path):
+    served = tmp_path / 'served'
+    served.mkdir()
+    (served / 'data.csv').write_bytes(CONTENT)
+    statuses = []
+
+    class Handler(SimpleHTTPRequestHandler):
+        def log_request(self, code='-', size='-'):
+            statuses.append(int(code))
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), functools.partial(Handler, directory=str(served)))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}", statuses
+    httpd.shutdown()
+    httpd.server_close()
+
+def stored_objects(root):
+    return sorted(os.listdir(root / dataStore.OBJECTS_DIR))
+
+def test_download_is_streamed_and_not_fetched_again(tmp_path, server, monkeypatch):
+    monkeypatch.setattr(dataStore, 'CHUNK_SIZE', 1024)
+    url, statuses = server
+    store = DataStore(tmp_path / 'store')
+
+    path = store.add(url + '/data.csv', 'data.csv')
+    assert path.read_bytes() == CONTENT
+    assert stored_objects(tmp_path / 'store') == [hashlib.sha256(CONTENT).hexdigest() + '.csv']
+
+    assert store.add(url + '/data.csv', 'data.csv') == path
+    assert statuses == [200, 304]
+
+def test_download_error_is_raised(tmp_path, server):
+    url, _ = server
+    store = DataStore(tmp_path / 'store')
+
+    with pytest.raises(requests.HTTPError):
+        store.add(url + '/missing.csv', 'missing.csv')
+    assert stored_objects(tmp_path / 'store') == []
+
+def test_identical_files_are_stored_once(tmp_path):
+    for name in ['a.csv', 'b.csv']:
+        (tmp_path / name).write_bytes(CONTENT)
+    store = DataStore(tmp_path / 'store')
+
+    a = store.add(str(tmp_path / 'a.csv'), 'a.csv')
+    b = store.add(str(tmp_path / 'b.csv'), 'b.csv')
+
+    assert a.read_bytes() == b.read_bytes() == CONTENT
+    assert len(stored_objects(tmp_path / 'store')) == 1
+
+def test_changed_file_is_stored_again(tmp_path):
+    source = tmp_path / 'a.csv'
+    source.write_bytes(CONTENT)
+    store = DataStore(tmp_path / 'store')
+    store.add(str(source), 'a.csv')
+
+    source.write_bytes(CONTENT + b'a,1000\n')
+    path = store.add(str(source), 'a.csv')
+
+    assert path.read_bytes() == CONTENT + b'a,1000\n'
+    assert len(stored_objects(tmp_path / 'store')) == 2
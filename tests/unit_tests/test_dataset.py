@@ -0,0 +1,182 @@
+from tea.build import load_data, nominal, ordinal, interval, ratio
+from tea.runtimeDataStructures.dataset import Dataset
+
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+def write_csv(tmp_path, name='data.csv'):
+    df = pd.DataFrame({
+        'pid': [1, 2, 3, 4, 5, 6],
+        'condition': ['a', 'b', 'a', 'b', 'a', 'c'],
+        'education': ['college', 'high school', 'PhD', 'college', 'PhD', 'high school'],
+        'flag': [0, 1, 1, 0, 1, 0],
+        'score': [1, 2, 3, 4, 5, 6],
+        'unused': ['x', 'y', 'z', 'x', 'y', 'z']
+    })
+    path = tmp_path / name
+    df.to_csv(path, index=False)
+    return str(path)
+
+variables = [
+    nominal('condition', ['a', 'b']),
+    ordinal('education', ['high school', 'college', 'PhD']),
+    nominal('flag', [0, 1]),
+    ratio('score', drange=[0, 10])
+]
+
+def test_load_declared_columns_only(tmp_path):
+    ds = load_data(write_csv(tmp_path), variables, 'pid')
+
+    assert list(ds.data.columns) == ['pid', 'condition', 'education', 'flag', 'score']
+
+def test_load_categorical_dtypes(tmp_path):
+    ds = load_data(write_csv(tmp_path), variables, 'pid')
+
+    condition = ds.data['condition']
+    assert isinstance(condition.dtype, pd.CategoricalDtype)
+    assert list(condition.cat.categories) == ['a', 'b']
+    assert not condition.cat.ordered
+    # Undeclared categories are missing values
+    assert condition.isna().tolist() == [False, False, False, False, False, True]
+
+    education = ds.data['education']
+    assert education.cat.ordered
+    assert list(education.cat.categories) == ['high school', 'college', 'PhD']
+    assert education.cat.codes.tolist() == [1, 0, 2, 1, 2, 0]
+
+    # Declared categories keep their type
+    assert list(ds.data['flag'].cat.categories) == [0, 1]
+    assert ds.data['flag'].tolist() == [0, 1, 1, 0, 1, 0]
+
+def test_load_numeric_dtypes(tmp_path):
+    path = write_csv(tmp_path)
+
+    ds = load_data(path, variables, 'pid')
+    assert ds.data['score'].dtype == np.float64
+
+    ds = load_data(path, variables, 'pid', float_dtype='float32')
+    assert ds.data['score'].dtype == np.float32
+    assert ds.data['score'].tolist() == [1, 2, 3, 4, 5, 6]
+
+def test_select_categorical(tmp_path):
+    ds = load_data(write_csv(tmp_path), variables, 'pid')
+
+    assert ds.select('score', where=["condition == 'a'"]).tolist() == [1, 3, 5]
+
+def test_group_index(tmp_path):
+    ds = load_data(write_csv(tmp_path), variables, 'pid')
+
+    index = ds.group_index('condition')
+    assert index.categories == ['a', 'b']
+    assert index.codes.tolist() == [0, 1, 0, 1, 0, -1]
+    # Row 5 has an undeclared category and belongs to no group
+    assert index.order.tolist() == [5, 0, 2, 4, 1, 3]
+    assert index.offsets.tolist() == [1, 4, 6]
+    assert ds.group_index('condition') is index
+
+def test_select_group_matches_query(tmp_path):
+    ds = load_data(write_csv(tmp_path), variables, 'pid')
+
+    for var, cats in [('condition', ['a', 'b']), ('education', ['high school', 'college', 'PhD'])]:
+        for c in cats:
+            group = ds.select_group('score', var, c)
+            assert group.equals(ds.select('score', where=[f"{var} == '{c}'"]))
+
+    # Non-string categories are matched too
+    assert ds.select_group('score', 'flag', 1).tolist() == [2, 3, 5]
+    assert list(ds.select_groups('score', 'flag').keys()) == [0, 1]
+
+def test_contingency_table(tmp_path):
+    ds = load_data(write_csv(tmp_path), variables, 'pid')
+
+    table = ds.contingency_table('condition', 'flag')
+    # Row 5 has an undeclared condition and is not counted
+    assert table.tolist() == [[1, 2], [1, 1]]
+    assert ds.contingency_table('condition', 'flag') is table
+    assert ds.contingency_table('flag', 'condition').tolist() == [[1, 1], [2, 1]]
+
+    expected = [[len(ds.select('score', where=[f"condition == '{c}'", f"education == '{e}'"])) for e in ['high school', 'college', 'PhD']] for c in ['a', 'b']]
+    assert ds.contingency_table('condition', 'education').tolist() == expected
+
+def test_filter_matches_mask(tmp_path):
+    ds = load_data(write_csv(tmp_path), variables, 'pid')
+    score = ds.data['score']
+    ranks = ds.data['education'].cat.codes + 1 # -1 (missing) becomes 0
+
+    for op in ['<', '<=', '>', '>=']:
+        mask = score.to_frame().eval(f"score {op} 3")
+        assert sorted(ds.filter('score', op, 3).index) == sorted(score[mask].index)
+
+        expected = ranks[ranks.to_frame('r').eval(f"r {op} 2") & (ranks > 0)].index
+        assert sorted(ds.filter('education', op, 'college').index) == sorted(expected)
+        assert sorted(ds.filter('education', op, 2).index) == sorted(expected)
+
+    assert ds.filter('education', '<', 'high school').empty
+    assert ds.filter('education', '>', 10).empty
+    assert ds.filter('score', '>=', 4).tolist() == [4, 5, 6]
+
+def test_filter_is_a_view(tmp_path):
+    ds = load_data(write_csv(tmp_path), variables, 'pid')
+
+    assert np.shares_memory(ds.filter('score', '>', 2).to_numpy(), ds.filter('score', '>', 4).to_numpy())
+    assert np.shares_memory(ds.filter('score', '<', 3).to_numpy(), ds.filter('score', '<', 2).to_numpy())
+
+def test_group_statistics(tmp_path):
+    ds = load_data(write_csv(tmp_path), variables, 'pid')
+
+    group_stats = ds.group_statistics('score', 'condition')
+    assert ds.group_statistics('score', 'condition') is group_stats
+    for c in ['a', 'b']:
+        group = ds.select_group('score', 'condition', c)
+        assert group_stats.count(c) == len(group)
+        assert np.isclose(group_stats.mean(c), group.mean())
+        assert np.isclose(group_stats.variance(c), group.var())
+        assert group_stats.min(c) == group.min()
+        assert group_stats.max(c) == group.max()
+        assert group_stats.sorted_values(c).tolist() == sorted(group.tolist())
+
+    # Row 5 has an undeclared condition and is not counted
+    assert group_stats.counts.tolist() == [3, 2]
+    assert group_stats.descriptive_statistics('b') == {'mean': 3.0, 'stdev': np.sqrt(2)}
+
+def test_npy_column_store_loads_like_csv(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    csv_path = write_csv(tmp_path)
+    npy_path = Dataset.convert(csv_path, 'npy')
+
+    assert os.path.isdir(npy_path)
+    pd.testing.assert_frame_equal(load_data(str(npy_path), variables, 'pid').data, load_data(csv_path, variables, 'pid').data)
+    # Converted once
+    mtime = os.stat(npy_path / 'score.npy').st_mtime_ns
+    assert Dataset.convert(csv_path, 'npy') == npy_path
+    assert os.stat(npy_path / 'score.npy').st_mtime_ns == mtime
+
+def test_convert_same_named_csvs(tmp_path, monkeypatch):
+    monkeypatch.setenv('HOME', str(tmp_path))
+    paths = []
+    for d, y in [('a', [100, 200]), ('b', [1, 2])]: 
+        os.mkdir(tmp_path / d)
+        paths.append(tmp_path / d / 'results.csv')
+        pd.DataFrame({'pid': [1, 2], 'y': y}).to_csv(paths[-1], index=False)
+    # b's CSV is older than a's converted file
+    os.utime(paths[1], ns=(0, 0))
+
+    for path, y in [(paths[0], [100, 200]), (paths[1], [1, 2]), (paths[0], [100, 200])]: 
+        npy_path = Dataset.convert(str(path), 'npy')
+        assert np.load(npy_path / 'y.npy').tolist() == y
+
+    # Replaced by a copy with an older modification time
+    pd.DataFrame({'pid': [1, 2], 'y': [7, 8]}).to_csv(paths[0], index=False)
+    os.utime(paths[0], ns=(0, 0))
+    assert np.load(Dataset.convert(str(paths[0]), 'npy') / 'y.npy').tolist() == [7, 8]
+
+@pytest.mark.parametrize('format', ['parquet', 'feather'])
+def test_arrow_formats_load_like_csv(tmp_path, monkeypatch, format):
+    pytest.importorskip('pyarrow')
+    monkeypatch.setenv('HOME', str(tmp_path))
+    csv_path = write_csv(tmp_path)
+    columnar_path = Dataset.convert(csv_path, format)
+
+    pd.testing.assert_frame_equal(load_data(str(columnar_path), variables, 'pid').data, load_data(csv_path, variables, 'pid').data)
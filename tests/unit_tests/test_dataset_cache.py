@@ -0,0 +1,104 @@
+from tea.build import nominal, ratio
+from tea.runtimeDataStructures.datasetCache import DatasetCache
+
+import os
+import pandas as pd
+
+variables = [nominal('condition', ['a', 'b']), ratio('score')]
+
+def write_csv(path, rows=4):
+    df = pd.DataFrame({
+        'condition': ['a', 'b'] * (rows // 2),
+        'score': range(rows)
+    })
+    df.to_csv(path, index=False)
+    return str(path)
+
+def test_cache_hit(tmp_path):
+    path = write_csv(tmp_path / 'data.csv')
+    cache = DatasetCache()
+
+    ds = cache.get(path, variables, None)
+    assert cache.get(path, variables, None) is ds
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_cache_keyed_on_declarations(tmp_path):
+    path = write_csv(tmp_path / 'data.csv')
+    cache = DatasetCache()
+
+    ds = cache.get(path, variables, None)
+    assert cache.get(path, [nominal('condition', ['b', 'a']), ratio('score')], None) is not ds
+    assert cache.get(path, variables, None, 'float32') is not ds
+    assert cache.get(path, variables, 'score') is not ds
+    assert len(cache) == 4
+
+def test_cache_invalidated_by_file_change(tmp_path):
+    path = write_csv(tmp_path / 'data.csv')
+    cache = DatasetCache()
+
+    ds = cache.get(path, variables, None)
+    write_csv(path, rows=6)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    reloaded = cache.get(path, variables, None)
+    assert reloaded is not ds
+    assert len(reloaded.data) == 6
+
+def test_cache_lru_eviction(tmp_path):
+    paths = [write_csv(tmp_path / f"data{i}.csv") for i in range(3)]
+    cache = DatasetCache()
+
+    first = cache.get(paths[0], variables, None)
+    one_dataset = cache.size
+    cache.set_budget(2 * one_dataset)
+
+    cache.get(paths[1], variables, None)
+    cache.get(paths[0], variables, None) # paths[1] is now least recently used
+    cache.get(paths[2], variables, None)
+
+    assert len(cache) == 2
+    assert cache.size <= cache.budget
+    assert cache.get(paths[0], variables, None) is first
+    misses = cache.misses
+    cache.get(paths[1], variables, None)
+    assert cache.misses == misses + 1
+
+def test_cache_clear(tmp_path):
+    path = write_csv(tmp_path / 'data.csv')
+    cache = DatasetCache()
+
+    ds = cache.get(path, variables, None)
+    cache.clear()
+    assert len(cache) == 0 and cache.size == 0
+    assert cache.get(path, variables, None) is not ds
+
+def test_cache_disabled(tmp_path):
+    path = write_csv(tmp_path / 'data.csv')
+    cache = DatasetCache(budget=0)
+
+    ds = cache.get(path, variables, None)
+    assert len(cache) == 0
+    assert cache.get(path, variables, None) is not ds
+
+def test_cache_counts_derived_values(tmp_path):
+    paths = [write_csv(tmp_path / f"data{i}.csv", rows=2000) for i in range(2)]
+    cache = DatasetCache()
+
+    first = cache.get(paths[0], variables, None)
+    data_size = cache.size
+    first.select_group('score', 'condition', 'a')
+    first.ranks('score', 'condition')
+    first.group_statistics('score', 'condition')
+    first.filter('score', '>', 10)
+    assert first.memory_usage() > first.memory_usage(derived=False) == data_size
+
+    # Measured again when the cache is used
+    assert cache.get(paths[0], variables, None) is first
+    assert cache.size == first.memory_usage()
+
+    # The budget holds once a second dataset is added, so the first (least recently used) is evicted
+    cache.set_budget(first.memory_usage() + data_size // 2)
+    second = cache.get(paths[1], variables, None)
+    assert len(cache) == 1 and cache.size <= cache.budget
+    assert cache.get(paths[1], variables, None) is second
@@ -0,0 +1,79 @@
+import tea
+import tea.instrumentation as instrumentation
+from tea.runtimeDataStructures.datasetCache import dataset_cache
+from tea.z3_solver.synthesisCache import synthesis_cache
+
+import json
+import pytest
+
+from test_session import write_csv, make_session
+
+def test_stage_without_hooks(): 
+    assert not instrumentation.enabled()
+    with instrumentation.stage('load', source='data.csv') as attributes: 
+        attributes['rows'] = 10
+    assert attributes == {'source': 'data.csv', 'rows': 10}
+
+def test_hooks_receive_stages_and_counters(): 
+    events = []
+    tea.add_hook(events.append)
+    try: 
+        with instrumentation.stage('load', source='data.csv') as attributes: 
+            attributes['rows'] = 10
+        instrumentation.count('dataset_cache.hit', 2)
+    finally: 
+        tea.remove_hook(events.append)
+
+    assert [(e.kind, e.name) for e in events] == [('stage', 'load'), ('counter', 'dataset_cache.hit')]
+    assert events[0].attributes == {'source': 'data.csv', 'rows': 10}
+    assert events[0].seconds >= 0
+    assert events[1].value == 2
+    assert not instrumentation.enabled()
+
+def test_collector_records_a_hypothesis(tmp_path): 
+    dataset_cache.clear()
+    synthesis_cache.clear()
+    session = make_session(write_csv(tmp_path), 0.05)
+
+    with tea.collect() as collector: 
+        session.hypothesize(['condition', 'score'], ['condition:b > a'])
+        session.hypothesize(['condition', 'score'], ['condition:b > a'])
+
+    summary = collector.summary()
+    stages = summary['stages']
+    assert stages['hypothesize']['count'] == 2
+    assert stages['load']['count'] == 2
+    assert stages['z3_check']['count'] >= 1
+    assert stages['verify_prop']['count'] >= 1
+    assert stages['execute_test']['count'] >= 2
+    assert stages['format']['count'] >= 2
+    assert stages['hypothesize']['seconds'] >= stages['execute_test']['max_seconds']
+
+    counters = summary['counters']
+    assert counters['dataset_cache.miss'] == 1
+    assert counters['dataset_cache.hit'] == 1
+    assert counters['synthesis_cache.miss'] == 1
+    assert counters['synthesis_cache.hit'] == 1
+
+    load = next(e for e in collector.events if e.name == 'load')
+    assert load.attributes['rows'] == 40
+
+    exported = json.loads(collector.to_json())
+    assert exported['stages']['hypothesize']['count'] == 2
+    assert len(exported['events']) == len(collector.events)
+
+def test_failing_hook_does_not_affect_analysis(tmp_path): 
+    def fail(event): 
+        raise RuntimeError('hook failed')
+    session = make_session(write_csv(tmp_path), 0.05)
+    expected = str(session.hypothesize(['condition', 'score'], ['condition:b > a']))
+
+    tea.add_hook(fail)
+    try: 
+        assert str(session.hypothesize(['condition', 'score'], ['condition:b > a'])) == expected
+        # The error of a failing stage is not hidden by the hook's
+        with pytest.raises(ValueError): 
+            with instrumentation.stage('load'): 
+                raise ValueError('stage failed')
+    finally: 
+        tea.remove_hook(fail)
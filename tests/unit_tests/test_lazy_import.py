@@ -0,0 +1,17 @@
+from tea.helpers.lazyImport import lazy_import
+
+import subprocess
+import sys
+
+def test_lazy_module_imports_on_first_use(): 
+    module = lazy_import('json')
+    assert 'not imported' in repr(module)
+
+    assert module.dumps([1]) == '[1]'
+    assert 'not imported' not in repr(module)
+
+def test_import_tea_does_not_import_heavy_dependencies(): 
+    script = "import sys, tea; print(' '.join(m for m in ['scipy.stats', 'statsmodels.api', 'sklearn', 'z3', 'tea.z3_solver.solver'] if m in sys.modules))"
+    output = subprocess.run([sys.executable, '-c', script], check=True, capture_output=True, text=True).stdout
+
+    assert output.strip() == ''
@@ -0,0 +1,83 @@
+from tea.build import nominal, ordinal, ratio
+from tea.runtimeDataStructures.dataset import Dataset
+from tea.runtimeDataStructures.varData import VarData
+from tea.runtimeDataStructures.bivariateData import BivariateData
+from tea.global_vals import iv_identifier, dv_identifier, experiment_identifier
+from tea.helpers.evaluateHelperMethods import mannwhitney_u, kruskall_wallis, spearman_corr, kendalltau_corr
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+def make_dataset(tmp_path, rows=300):
+    rng = np.random.default_rng(1)
+    data = pd.DataFrame({
+        'pid': np.arange(rows),
+        'condition': rng.choice(['a', 'b', 'c'], rows),
+        'score': rng.integers(0, 20, rows).astype(float), # many ties
+        'time': rng.gamma(2, 2, rows),
+        'level': rng.choice(['low', 'mid', 'high'], rows),
+        'group': rng.choice(['a', 'b'], rows)
+    })
+    path = tmp_path / 'data.csv'
+    data.to_csv(path, index=False)
+    variables = [
+        nominal('condition', ['a', 'b', 'c']),
+        nominal('group', ['a', 'b']),
+        ratio('score'),
+        ratio('time'),
+        ordinal('level', ['low', 'mid', 'high'])
+    ]
+    return Dataset(str(path), variables, 'pid')
+
+def var_data(dataset, col, role):
+    var = dataset.get_variable(col)
+    metadata = {'var_name': col, 'dtype': var.dtype, 'categories': var.categories, 'query': None}
+    return VarData(metadata, role=role)
+
+def bivariate(dataset, x, y):
+    return BivariateData([var_data(dataset, x, iv_identifier), var_data(dataset, y, dv_identifier)], study_type=experiment_identifier)
+
+def groups(dataset, col, cats, group_var='condition'):
+    return [dataset.select_group(col, group_var, c).to_numpy() for c in cats]
+
+def test_rank_data(tmp_path):
+    dataset = make_dataset(tmp_path)
+    ranks = dataset.ranks('score', 'condition', ['b', 'a'])
+
+    assert ranks is dataset.ranks('score', 'condition', ['a', 'b'])
+    assert ranks.categories == ['a', 'b']
+    a, b = groups(dataset, 'score', ['a', 'b'])
+    u = stats.mannwhitneyu(a, b).statistic
+    assert ranks.u_statistic('a', 'b') == u
+    assert ranks.u_statistic('b', 'a') == len(a) * len(b) - u
+    assert np.isclose(ranks.a12('a', 'b'), u / (len(a) * len(b)))
+
+    with pytest.raises(ValueError):
+        dataset.ranks('condition')
+    with pytest.raises(ValueError):
+        dataset.ranks('score', 'condition', ['a', 'd'])
+
+def test_rank_tests_equal_scipy(tmp_path):
+    dataset = make_dataset(tmp_path)
+
+    result = mannwhitney_u(dataset, None, bivariate(dataset, 'group', 'score'))
+    assert np.allclose([result.test_statistic, result.p_value], stats.mannwhitneyu(*groups(dataset, 'score', ['a', 'b'], 'group')))
+
+    result = kruskall_wallis(dataset, None, bivariate(dataset, 'condition', 'score'))
+    assert np.allclose([result.test_statistic, result.p_value], stats.kruskal(*groups(dataset, 'score', ['a', 'b', 'c'])))
+
+    result = spearman_corr(dataset, None, bivariate(dataset, 'time', 'score'))
+    assert np.allclose([result.test_statistic, result.p_value], stats.spearmanr(dataset.data['time'], dataset.data['score']))
+
+    result = kendalltau_corr(dataset, None, bivariate(dataset, 'time', 'score'))
+    assert np.allclose([result.test_statistic, result.p_value], stats.kendalltau(dataset.data['time'], dataset.data['score']))
+
+def test_ordinal_outcome(tmp_path):
+    dataset = make_dataset(tmp_path)
+    codes = dataset.data['level'].map({'low': 0, 'mid': 1, 'high': 2}).to_numpy()
+    group = dataset.data['group'].to_numpy()
+
+    result = mannwhitney_u(dataset, None, bivariate(dataset, 'group', 'level'))
+    assert np.allclose([result.test_statistic, result.p_value], stats.mannwhitneyu(codes[group == 'a'], codes[group == 'b']))
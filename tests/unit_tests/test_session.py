@@ -0,0 +1,119 @@
+import tea
+from tea.helpers import evaluateHelperMethods
+from tea.runtimeDataStructures import testResult
+from tea.z3_solver.synthesisCache import synthesis_cache
+
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+
+def write_csv(tmp_path):
+    rng = np.random.default_rng(0)
+    path = tmp_path / 'data.csv'
+    pd.DataFrame({
+        'condition': ['a', 'b'] * 20,
+        'score': rng.normal(10, 2, 40)
+    }).to_csv(path, index=False)
+    return str(path)
+
+def make_session(path, alpha):
+    session = tea.Session()
+    session.data(path)
+    session.define_variables([
+        {'name': 'condition', 'data type': 'nominal', 'categories': ['a', 'b']},
+        {'name': 'score', 'data type': 'ratio'}
+    ])
+    session.define_study_design({
+        'study type': 'experiment', 
+        'independent variables': 'condition', 
+        'dependent variables': 'score', 
+        'between subjects': 'condition'
+    })
+    session.assume({'Type I (False Positive) Error Rate': alpha})
+    return session
+
+def test_sessions_are_independent(tmp_path):
+    path = write_csv(tmp_path)
+    strict = make_session(path, 0.05)
+    lenient = make_session(path, 0.1)
+
+    assert strict.alpha == 0.05
+    assert lenient.alpha == 0.1
+    assert tea.api.default_session() is not strict
+
+def test_sessions_run_concurrently(tmp_path):
+    synthesis_cache.clear() # Search for tests in every thread
+    path = write_csv(tmp_path)
+    alphas = [0.05, 0.1] * 4
+    sessions = [make_session(path, alpha) for alpha in alphas]
+
+    with ThreadPoolExecutor(max_workers=4) as executor: 
+        results = list(executor.map(lambda s: s.hypothesize(['condition', 'score'], ['condition:b > a']), sessions))
+
+    for alpha, result in zip(alphas, results): 
+        assert result.test_to_results['students_t'].alpha == alpha
+
+def test_hypothesize_many(tmp_path):
+    synthesis_cache.clear()
+    session = make_session(write_csv(tmp_path), 0.05)
+    hypotheses = [
+        (['condition', 'score'], ['condition:b > a']),
+        (['condition', 'score'], ['condition:a > b'])
+    ]
+
+    with tea.collect() as collector:
+        results = session.hypothesize_many(hypotheses)
+
+    assert len(results) == 2
+    first, second = [r.test_to_results['students_t'] for r in results]
+    assert first.test_statistic == -second.test_statistic
+    # Every property the second hypothesis needs was checked for the first
+    synthesis = [e for e in collector.events if e.name == 'synthesize_tests']
+    assert synthesis[1].attributes['property_checks'] == 0
+
+    single = session.hypothesize(*hypotheses[1])
+    assert single.test_to_results['students_t'].p_value == second.p_value
+
+def summarize(result):
+    return [(test, r.test_statistic, r.p_value) for test, r in result.test_to_results.items()]
+
+def test_executors_keep_results_in_order(tmp_path):
+    session = make_session(write_csv(tmp_path), 0.05)
+    expected = summarize(session.hypothesize(['condition', 'score'], ['condition:b > a']))
+
+    for kind in ['thread', 'process']: 
+        session.set_executor(kind, workers=2)
+        try: 
+            assert summarize(session.hypothesize(['condition', 'score'], ['condition:b > a'])) == expected
+        finally: 
+            session.close()
+
+def test_failing_test_is_isolated(tmp_path, monkeypatch):
+    def fail(dataset, predictions, combined_data): 
+        raise ZeroDivisionError('division by zero')
+    monkeypatch.setitem(evaluateHelperMethods.__stat_test_to_function__, 'welchs_t', fail)
+    session = make_session(write_csv(tmp_path), 0.05)
+
+    for kind in [None, 'thread']: 
+        session.set_executor(kind)
+        result = session.hypothesize(['condition', 'score'], ['condition:b > a'])
+        session.close()
+
+        failure = result.test_to_results['welchs_t']
+        assert isinstance(failure, testResult.TestFailure)
+        assert isinstance(failure.error, ZeroDivisionError)
+        assert 'students_t' in result.test_to_results
+        assert 'welchs_t failed' in str(result)
+
+def test_process_workers_report_events(tmp_path):
+    session = make_session(write_csv(tmp_path), 0.05)
+    session.set_executor('process', workers=1)
+    try: 
+        with tea.collect() as collector: 
+            result = session.hypothesize(['condition', 'score'], ['condition:b > a'])
+    finally: 
+        session.close()
+
+    assert collector.summary()['stages']['execute_test']['count'] == len(result.test_to_results)
+    # The worker loaded the dataset once for all the tests
+    assert collector.summary()['counters'].get('dataset_cache.miss') == 1
@@ -0,0 +1,120 @@
+import tea
+from tea.build import nominal, ordinal, ratio, interval
+from tea.helpers.evaluateHelperMethods import compute_normal_distribution_from_moments, compute_eq_variance_from_statistics
+from tea.runtimeDataStructures import testResult
+from tea.runtimeDataStructures.dataset import Dataset, FullDataRequired
+from tea.runtimeDataStructures.streamingDataset import StreamingDataset, GroupMoments
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+def write_csv(tmp_path, rows=1000):
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({
+        'pid': np.arange(rows),
+        'condition': rng.choice(['a', 'b', 'c'], rows),
+        'level': rng.choice(['low', 'high'], rows),
+        'score': rng.normal(10, 2, rows),
+        'time': rng.gamma(2, 2, rows),
+        'weight': rng.normal(70, 10, rows)
+    })
+    data.loc[::17, 'score'] = np.nan
+    path = tmp_path / 'data.csv'
+    data.to_csv(path, index=False)
+    return str(path)
+
+variables = [
+    nominal('condition', ['a', 'b', 'c']),
+    ordinal('level', ['low', 'high']),
+    ratio('score'),
+    interval('time')
+]
+
+def test_merged_moments_equal_moments_of_all_values():
+    rng = np.random.default_rng(0)
+    codes = rng.integers(0, 3, 1000)
+    values = rng.gamma(2, 2, 1000)
+
+    merged = GroupMoments.from_values(codes[:1], values[:1], 3)
+    for start in range(1, 1000, 97):
+        merged = merged.merge(GroupMoments.from_values(codes[start:start + 97], values[start:start + 97], 3))
+    whole = GroupMoments.from_values(codes, values, 3)
+
+    for field in ['counts', 'means', 'm2', 'm3', 'm4', 'mins', 'maxs']:
+        assert np.allclose(getattr(merged, field), getattr(whole, field))
+
+def test_summaries_equal_in_memory_summaries(tmp_path):
+    path = write_csv(tmp_path)
+    dataset = Dataset(path, variables, 'pid')
+    streaming = StreamingDataset(path, variables, 'pid', chunksize=64)
+
+    assert streaming.num_rows() is None
+    expected = dataset.group_statistics('score', 'condition')
+    actual = streaming.group_statistics('score', 'condition')
+    assert streaming.num_rows() == 1000
+    for c in ['a', 'b', 'c']:
+        assert actual.count(c) == expected.count(c)
+        assert np.isclose(actual.mean(c), expected.mean(c))
+        assert np.isclose(actual.variance(c), expected.variance(c))
+        assert actual.min(c) == expected.min(c)
+
+    assert (streaming.contingency_table('condition', 'level') == dataset.contingency_table('condition', 'level')).all()
+    assert (streaming.contingency_table('level', 'condition') == dataset.contingency_table('level', 'condition')).all()
+
+    valid = dataset.data['score'].notna()
+    r = np.corrcoef(dataset.data['score'][valid], dataset.data['time'][valid])[0, 1]
+    assert np.isclose(streaming.co_moments('time', 'score').correlation(), r)
+
+def test_tests_from_summaries_equal_scipy(tmp_path):
+    path = write_csv(tmp_path)
+    dataset = Dataset(path, variables, 'pid')
+    streaming = StreamingDataset(path, variables, 'pid', chunksize=64)
+    groups = [dataset.select_group('time', 'condition', c).to_numpy() for c in ['a', 'b', 'c']]
+
+    moments = streaming.group_moments('time', 'condition')
+    for i, group in enumerate(groups):
+        assert np.allclose(compute_normal_distribution_from_moments(moments, i), stats.normaltest(group))
+
+    assert np.allclose(compute_eq_variance_from_statistics(streaming.deviation_statistics('time', 'condition')), stats.levene(*groups, center='mean'))
+
+def test_rows_are_not_available(tmp_path):
+    streaming = StreamingDataset(write_csv(tmp_path), variables, 'pid')
+
+    with pytest.raises(FullDataRequired):
+        streaming.select_group('score', 'condition', 'a')
+    with pytest.raises(FullDataRequired):
+        streaming.group_statistics('score', 'condition').sorted_values('a')
+
+def test_streaming_session(tmp_path):
+    path = write_csv(tmp_path)
+
+    def hypothesize(streaming):
+        session = tea.Session()
+        session.data(path, key='pid', streaming=streaming, chunksize=100 if streaming else None)
+        session.define_variables([
+            {'name': 'level', 'data type': 'nominal', 'categories': ['low', 'high']},
+            {'name': 'weight', 'data type': 'ratio'}
+        ])
+        session.define_study_design({
+            'study type': 'experiment',
+            'independent variables': 'level',
+            'dependent variables': 'weight',
+            'between subjects': 'level'
+        })
+        session.assume({'Type I (False Positive) Error Rate': 0.05})
+        return session.hypothesize(['level', 'weight'], ['level:high > low']).test_to_results
+
+    in_memory = hypothesize(False)
+    streaming = hypothesize(True)
+
+    assert list(streaming) == list(in_memory)
+    assert 'students_t' in streaming
+    for test, result in streaming.items():
+        if test in ['students_t', 'welchs_t', 'f_test']:
+            assert np.isclose(result.test_statistic, in_memory[test].test_statistic)
+            assert np.isclose(result.p_value, in_memory[test].p_value)
+        else:
+            assert isinstance(result, testResult.TestFailure)
+            assert isinstance(result.error, FullDataRequired)
@@ -0,0 +1,100 @@
+import tea
+from tea.z3_solver import solver
+from tea.z3_solver.synthesisCache import synthesis_cache
+
+import numpy as np
+import pandas as pd
+import z3
+from types import SimpleNamespace
+
+def hypothesize_ttest(tmp_path):
+    rng = np.random.default_rng(0)
+    path = tmp_path / 'data.csv'
+    pd.DataFrame({
+        'condition': ['a', 'b'] * 20,
+        'score': rng.normal(10, 2, 40)
+    }).to_csv(path, index=False)
+
+    tea.data(str(path))
+    tea.define_variables([
+        {'name': 'condition', 'data type': 'nominal', 'categories': ['a', 'b']},
+        {'name': 'score', 'data type': 'ratio'}
+    ])
+    tea.define_study_design({
+        'study type': 'experiment', 
+        'independent variables': 'condition', 
+        'dependent variables': 'score', 
+        'between subjects': 'condition'
+    })
+    tea.assume({'groups normally distributed': [['condition', 'score']], 'Type I (False Positive) Error Rate': 0.05})
+    return tea.hypothesize(['condition', 'score'], ['condition:b > a'])
+
+def test_property_checks_run_once(tmp_path):
+    synthesis_cache.clear()
+    with tea.collect() as collector:
+        hypothesize_ttest(tmp_path)
+
+    synthesis = [e for e in collector.events if e.name == 'synthesize_tests'][-1]
+    checks = [(e.attributes['property'], tuple(e.attributes['vars'])) for e in collector.events if e.name == 'verify_prop']
+    # e.g., groups normal(condition, score) is assumed and needed by students_t and welchs_t
+    assert synthesis.attributes['property_checks_reused'] > 0
+    assert synthesis.attributes['property_checks'] == len(checks) == len(set(checks))
+
+def test_unsat_tests_pruned(tmp_path, monkeypatch):
+    synthesis_cache.clear()
+    checks = []
+    check = z3.Solver.check
+    def counting_check(self, *assumptions):
+        checks.append(assumptions)
+        return check(self, *assumptions)
+    monkeypatch.setattr(z3.Solver, 'check', counting_check)
+
+    results = hypothesize_ttest(tmp_path)
+
+    # e.g., all the correlations need continuous(x0), which fails on the first one
+    assert len(checks) < len(solver.test_catalog(2).tests)
+    assert 'students_t' in results.test_to_results
+
+def test_synthesis_cached_by_signature(tmp_path, monkeypatch):
+    synthesis_cache.clear()
+    first = hypothesize_ttest(tmp_path)
+    assert synthesis_cache.misses == 1
+
+    checks = []
+    check = z3.Solver.check
+    def counting_check(self, *assumptions):
+        checks.append(assumptions)
+        return check(self, *assumptions)
+    monkeypatch.setattr(z3.Solver, 'check', counting_check)
+
+    second = hypothesize_ttest(tmp_path)
+    assert synthesis_cache.hits == 1
+    assert not checks
+    assert list(second.test_to_results) == list(first.test_to_results)
+    assert second.test_to_assumptions == first.test_to_assumptions
+
+def test_properties_verified_outside_z3_lock(tmp_path, monkeypatch):
+    synthesis_cache.clear()
+    locked = []
+    check_prop = solver._check_prop
+    def recording_check_prop(*args):
+        locked.append(solver.__z3_lock__._is_owned())
+        return check_prop(*args)
+    monkeypatch.setattr(solver, '_check_prop', recording_check_prop)
+
+    hypothesize_ttest(tmp_path)
+    assert locked and not any(locked)
+
+def test_property_results_keyed_by_data_selection(monkeypatch):
+    checks = []
+    monkeypatch.setattr(solver, '_verify_prop', lambda dataset, combined_data, prop, alpha: checks.append(prop) or True)
+    def analysis(score_query):
+        vars = [SimpleNamespace(metadata={'var_name': 'condition', 'query': ''}), SimpleNamespace(metadata={'var_name': 'score', 'query': score_query})]
+        return SimpleNamespace(vars=vars)
+    prop = SimpleNamespace(property=SimpleNamespace(name='groups_normal', statistical=True), applied=None, var_names=['condition', 'score'], property_test_results=None)
+
+    results = {}
+    for score_query in ['', " > '5'", '']:
+        solver.PropertyMemo(0.05, results).verify(None, analysis(score_query), prop)
+    # The filtered score is checked separately, the unfiltered one once
+    assert len(checks) == 2
@@ -0,0 +1,37 @@
+from tea.z3_solver import solver
+
+def test_catalog_built_once():
+    catalog = solver.test_catalog(2)
+
+    assert solver.test_catalog(2) is catalog
+    assert solver.test_catalog(3) is not catalog
+    assert [t.name for t in solver.test_catalog(3).tests] == ['factorial_ANOVA']
+
+def test_catalog_bind():
+    catalog = solver.test_catalog(2)
+    first = catalog.bind(['condition', 'score'])
+    second = catalog.bind(['group', 'time'])
+
+    students_t = [t for t in first if t.name == 'students_t'][0]
+    eq_variance = [p for p in students_t._properties if p.property.name == 'has_equal_variance'][0]
+    assert eq_variance.var_names == ['condition', 'score']
+
+    # Binding shares the tests and their z3 expressions, but not per-analysis results
+    for a, b in zip(first, second):
+        assert a.test is b.test
+        assert a.query() is b.query()
+        for pa, pb in zip(a._properties, b._properties):
+            assert pa.applied is pb.applied
+            assert pa is not pb
+    assert [p.var_names for p in second[5]._properties][-1] == ['group', 'time']
+
+def test_catalogs_do_not_change_shared_properties():
+    two = solver.test_catalog(2)
+    three = solver.test_catalog(3)
+    assert all(prop.arity is None for prop in solver.test_props)
+
+    for catalog, num_vars in [(two, 2), (three, 3)]:
+        for test in catalog.tests:
+            for prop in test._properties:
+                if prop.property in solver.test_props:
+                    assert prop.__z3__.num_args() == num_vars